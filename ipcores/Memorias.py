@@ -9,19 +9,122 @@ Memorias
 
 from myhdl import *
 from Contadores import CB_RE
+from imagen_mem import tipo_array, cargar, mapear_bin
+from array import array
 
 Hi = True        # Definicion de los niveles logicos
 Lo = False
 
 ############################################################
 
+def buffer_ram(n, m, init_file = None, dump_file = None) :
+    """Contenido de una RAM de 2**n posiciones de m bits en un unico
+    ``array`` (una lista de enteros si m > 32). Solo para simulacion
+
+    :Parametros:
+        - `init_file` : imagen inicial, binario crudo o ``$readmemh`` (``.mem``).
+                        Si es mas corta que la RAM se completa con ceros
+        - `dump_file` : binario crudo mapeado en memoria (``imagen_mem.mapear_bin``)
+                        que se usa como buffer, por lo que el archivo refleja el
+                        contenido de la RAM en todo momento
+    """
+
+    if init_file is not None :
+        datos = cargar(init_file, m)
+        if len(datos) > 2**n :
+            raise ValueError("%s : %d palabras en una RAM de %d" % (init_file, len(datos), 2**n))
+
+    if dump_file is not None :
+        import numpy
+        ram = mapear_bin(dump_file, 2**n, m)
+        ram[:] = 0
+        if init_file is not None :
+            ram[:len(datos)] = numpy.frombuffer(datos, dtype = datos.typecode)
+        return ram
+
+    if m > 32 :
+        return [0] * 2**n
+
+    ram = array(tipo_array(m), [0]) * 2**n
+    if init_file is not None :
+        ram[:len(datos)] = datos
+    return ram
+
+
+def ram_signals(n, m, init_file = None) :
+    """Lista de 2**n Signals de m bits, con los valores iniciales de
+    `init_file` (se convierten a HDL con ``toVHDL.initial_values = True``
+    o ``toVerilog.initial_values = True``)
+    """
+
+    if init_file is None :
+        valores = [0] * 2**n
+    else :
+        valores = buffer_ram(n, m, init_file)
+
+    if m == 1 :
+        return [Signal(bool(v)) for v in valores]
+    return [Signal(intbv(v)[m:]) for v in valores]
+
+
+def puerto_ram_sim(clk_i,
+                   ena_i,
+                   rst_i,
+                   we_i,
+                   addr_i,
+                   d_i,
+                   d_o,
+                   ram,
+                   write_first) :
+    """Puerto de una RAM sincronica con el contenido en un buffer (solo simulacion)
+
+    La escritura en ``ram`` se difiere un delta, con la Signal ``commit``, para
+    que se comporte como la asignacion a ``.next`` de la version con Signals :
+    los puertos que leen en el mismo flanco ven el dato anterior.
+
+    :Parametros:
+        - `ram`         : buffer con el contenido, ver ``buffer_ram``
+        - `write_first` : si se escribe, ``d_o`` toma el dato escrito (``RAM_SP``)
+                          o el dato anterior (``RAM_DP``)
+    """
+
+    pendientes = []
+    commit = Signal(Lo)
+
+    @always(clk_i.posedge)
+    def puerto() :
+        if ena_i :
+            addr = int(addr_i)
+            if rst_i :
+                d_o.next = 0
+            elif we_i and write_first :
+                d_o.next = d_i
+            else :
+                d_o.next = int(ram[addr])
+            if we_i :
+                pendientes.append((addr, int(d_i)))
+                commit.next = not commit
+
+    @always(commit)
+    def escritura() :
+        for addr, d in pendientes :
+            ram[addr] = d
+        del pendientes[:]
+
+    return instances()
+
+############################################################
+
 def RAM_SP(clk_i, 
            ena_i, 
            rst_i, 
            we_i, 
            addr_i, 
            d_i, 
-           d_o) :
+           d_o,
+           sim_array = False,
+           init_file = None,
+           dump_file = None) :
     """Memoria RAM Single Port sincronica de n posiciones y
     m bits::
 
@@ -67,16 +170,27 @@ def RAM_SP(clk_i,
         - `addr_i` :  direccion (n bits)
         - `d_i`    :  data in (m bits)
         - `d_o`    :  data out (m bits)
+        - `sim_array` : (solo simulacion) guarda el contenido en un unico ``array``
+                        en lugar de una Signal por posicion, con la misma temporizacion.
+                        Para convertir a HDL dejar en ``False``
+        - `init_file` : contenido inicial, binario crudo o ``$readmemh`` (``.mem``),
+                        ver ``buffer_ram`` y ``ram_signals``
+        - `dump_file` : (solo con `sim_array`) binario crudo donde queda el contenido
 
     """    
 
     n = len(addr_i)
     m = len(d_i)
- 
-    if m == 1 :
-        ram = [Signal(Lo) for i in range(2**n)]
-    else :
-        ram = [Signal(intbv(0)[m:]) for i in range(2**n)]
+
+    if sim_array :
+        return puerto_ram_sim(clk_i, ena_i, rst_i, we_i, addr_i, d_i, d_o,
+                              ram = buffer_ram(n, m, init_file, dump_file),
+                              write_first = True)
+
+    if dump_file is not None :
+        raise ValueError("dump_file necesita sim_array = True")
+
+    ram = ram_signals(n, m, init_file)
 
     @always(clk_i.posedge)
     def RAM_SP_hdl() :
@@ -111,7 +225,10 @@ def RAM_DP(clkA_i,
            weB_i, 
            addrB_i, 
            dB_i, 
-           dB_o) :
+           dB_o,
+           sim_array = False,
+           init_file = None,
+           dump_file = None) :
     """Memoria RAM Dual Port sincronica de n posiciones y
     m bits::
 
@@ -176,6 +293,12 @@ def RAM_DP(clkA_i,
         - `addrB_i`  :  direccion (n bits)
         - `dB_i`     :  data in (m bits)
         - `dB_o`     :  data out (m bits)
+        - `sim_array` : (solo simulacion) guarda el contenido en un unico ``array``
+                        en lugar de una Signal por posicion, con la misma temporizacion.
+                        Para convertir a HDL dejar en ``False``
+        - `init_file` : contenido inicial, binario crudo o ``$readmemh`` (``.mem``),
+                        ver ``buffer_ram`` y ``ram_signals``
+        - `dump_file` : (solo con `sim_array`) binario crudo donde queda el contenido
 
 
     """    
@@ -183,10 +306,20 @@ def RAM_DP(clkA_i,
     n = len(addrA_i)
     m = len(dA_i)
 
-    if m == 1 :
-        ram = [Signal(Lo) for i in range(2**n)]
-    else :
-        ram = [Signal(intbv(0)[m:]) for i in range(2**n)]
+    if sim_array :
+        ram = buffer_ram(n, m, init_file, dump_file)
+        puerto_A = puerto_ram_sim(clkA_i, enaA_i, rstA_i, weA_i, addrA_i, dA_i, dA_o,
+                                  ram = ram,
+                                  write_first = False)
+        puerto_B = puerto_ram_sim(clkB_i, enaB_i, rstB_i, weB_i, addrB_i, dB_i, dB_o,
+                                  ram = ram,
+                                  write_first = False)
+        return puerto_A, puerto_B
+
+    if dump_file is not None :
+        raise ValueError("dump_file necesita sim_array = True")
+
+    ram = ram_signals(n, m, init_file)
  
     @always(clkA_i.posedge)
     def RAM_DP_A_hdl() :
@@ -295,3 +428,409 @@ def FIFO(clk_i,
     return instances()
 
 ############################################################
+
+def FIFO_sinc(clk_i,
+              rst_i,
+              push_i,
+              pop_i,
+              d_i,
+              q_o,
+              full_o,
+              empty_o,
+              count_o,
+              almost_full_o,
+              almost_empty_o,
+              k,
+              umbral_af = None,
+              umbral_ae = 1,
+              sim_array = False) :
+    """FIFO sincronica de k posiciones y n bits de datos, con push y pop
+    independientes y flags de nivel
+    ::
+
+            ____________________________
+       ____|                            |____
+       ____| d_i                    q_o |____
+           |                            |
+       ----|> clk_i              full_o |----
+           |                    empty_o |----
+       ----| rst_i                      |____
+           |                    count_o |____
+       ----| push_i                     |
+           |              almost_full_o |----
+       ----| pop_i       almost_empty_o |----
+           |____________________________|
+
+    El almacenamiento es un ``RAM_DP`` (puerto A escritura, puerto B lectura
+    sincronica), por lo que se infiere como block RAM.
+
+    * Con ``push_i`` se escribe ``d_i`` si la FIFO no esta llena.
+    * Con ``pop_i`` se lee el dato mas antiguo si la FIFO no esta vacia; el dato
+      esta en ``q_o`` en el clock siguiente y se mantiene hasta el proximo pop.
+    * Si se pide push y pop en el mismo clock se hacen los dos (salvo que la FIFO
+      este llena o vacia) y la cuenta no cambia.
+    * Un push con la FIFO llena o un pop con la FIFO vacia se ignoran.
+    * ``rst_i`` (sincronico) vacia la FIFO y pone ``q_o`` a 0.
+
+    :Parametros:
+        - `clk_i`          :  entrada de clock
+        - `rst_i`          :  reset sincronico
+        - `push_i`         :  escribe d_i
+        - `pop_i`          :  lee el dato mas antiguo
+        - `d_i`            :  data in (n bits)
+        - `q_o`            :  data out (n bits)
+        - `full_o`         :  la FIFO tiene k datos
+        - `empty_o`        :  la FIFO no tiene datos
+        - `count_o`        :  cantidad de datos (0 a k)
+        - `almost_full_o`  :  count_o >= umbral_af
+        - `almost_empty_o` :  count_o <= umbral_ae
+        - `k`              :  cantidad de posiciones
+        - `umbral_af`      :  umbral de almost full (por defecto k - 1)
+        - `umbral_ae`      :  umbral de almost empty (por defecto 1)
+        - `sim_array`      :  ver ``RAM_DP``
+
+    """
+
+    n = len(d_i)
+
+    if umbral_af is None :
+        umbral_af = k - 1
+
+    w_addr = Signal(intbv(0, 0, k))   # Puntero de escritura
+    r_addr = Signal(intbv(0, 0, k))   # Puntero de lectura
+    cuenta = Signal(intbv(0, 0, k + 1))
+
+    escribe = Signal(Lo)
+    lee = Signal(Lo)
+    ena_b = Signal(Lo)
+    bajo = Signal(Lo)                 # Reset del puerto A y write enable del B
+
+    p = len(w_addr)
+    addr_a = Signal(intbv(0)[p:])
+    addr_b = Signal(intbv(0)[p:])
+
+    if n == 1 :
+        d_a_o = Signal(Lo)
+        d_b_i = Signal(Lo)
+    else :
+        d_a_o = Signal(intbv(0)[n:])
+        d_b_i = Signal(intbv(0)[n:])
+
+    ###############################################
+
+    ram = RAM_DP(clkA_i = clk_i,
+                 enaA_i = escribe,
+                 rstA_i = bajo,
+                 weA_i = escribe,
+                 addrA_i = addr_a,
+                 dA_i = d_i,
+                 dA_o = d_a_o,
+                 clkB_i = clk_i,
+                 enaB_i = ena_b,
+                 rstB_i = rst_i,
+                 weB_i = bajo,
+                 addrB_i = addr_b,
+                 dB_i = d_b_i,
+                 dB_o = q_o,
+                 sim_array = sim_array)
+
+    @always_comb
+    def habilitaciones() :
+        escribe.next = push_i and cuenta != k and not rst_i
+        lee.next = pop_i and cuenta != 0 and not rst_i
+        ena_b.next = (pop_i and cuenta != 0) or rst_i
+        addr_a.next = w_addr
+        addr_b.next = r_addr
+
+    @always(clk_i.posedge)
+    def punteros() :
+        if rst_i :
+            w_addr.next = 0
+            r_addr.next = 0
+            cuenta.next = 0
+        else :
+            if escribe :
+                if w_addr == k - 1 :
+                    w_addr.next = 0
+                else :
+                    w_addr.next = w_addr + 1
+            if lee :
+                if r_addr == k - 1 :
+                    r_addr.next = 0
+                else :
+                    r_addr.next = r_addr + 1
+            if escribe and not lee :
+                cuenta.next = cuenta + 1
+            elif lee and not escribe :
+                cuenta.next = cuenta - 1
+
+    @always_comb
+    def flags() :
+        full_o.next = cuenta == k
+        empty_o.next = cuenta == 0
+        count_o.next = cuenta
+        almost_full_o.next = cuenta >= umbral_af
+        almost_empty_o.next = cuenta <= umbral_ae
+
+    return instances()
+
+############################################################
+
+def FIFO_asinc(clkW_i,
+               rstW_i,
+               push_i,
+               d_i,
+               full_o,
+               clkR_i,
+               rstR_i,
+               pop_i,
+               q_o,
+               empty_o,
+               k,
+               sim_array = False) :
+    """FIFO asincronica (dos clocks) de k posiciones y n bits de datos, para
+    cruzar datos entre dominios de clock
+    ::
+
+            ________________________
+       ____|                        |____
+       ____| d_i                q_o |____
+           |                        |
+       ----|> clkW_i        clkR_i <|----
+           |                        |
+       ----| rstW_i          rstR_i |----
+           |                        |
+       ----| push_i           pop_i |----
+           |                        |
+       ----| full_o         empty_o |----
+           |________________________|
+
+            escritura        lectura
+
+    Los punteros son de log2(k) + 1 bits y cruzan de dominio en codigo Gray,
+    con un sincronizador de dos flip flops : en cada clock cambia un solo bit,
+    por lo que el valor sincronizado es el anterior o el nuevo, nunca uno
+    intermedio. ``full_o`` se calcula en el dominio de escritura y ``empty_o``
+    en el de lectura, y son conservadores (pueden tardar dos o tres clocks en
+    reflejar una operacion del otro dominio, nunca anticiparla).
+
+    El almacenamiento es un ``RAM_DP`` con el puerto A en el dominio de
+    escritura y el B en el de lectura. Como en ``FIFO_sinc`` el dato leido
+    esta en ``q_o`` en el clock de lectura siguiente al pop. Cada reset
+    (sincronico) inicializa los registros de su dominio; se deben activar
+    juntos.
+
+    :Parametros:
+        - `clkW_i`  :  clock del dominio de escritura
+        - `rstW_i`  :  reset sincronico del dominio de escritura
+        - `push_i`  :  escribe d_i (se ignora si la FIFO esta llena)
+        - `d_i`     :  data in (n bits)
+        - `full_o`  :  FIFO llena
+        - `clkR_i`  :  clock del dominio de lectura
+        - `rstR_i`  :  reset sincronico del dominio de lectura
+        - `pop_i`   :  lee el dato mas antiguo (se ignora si la FIFO esta vacia)
+        - `q_o`     :  data out (n bits)
+        - `empty_o` :  FIFO vacia
+        - `k`       :  cantidad de posiciones (potencia de 2, al menos 2)
+        - `sim_array` : ver ``RAM_DP``
+
+    """
+
+    n = len(d_i)
+    p = len(intbv(0, 0, k))          # Bits de direccion
+
+    if k < 2 or k != 2**p :
+        raise ValueError("k debe ser una potencia de 2 mayor que 1")
+
+    MOD = 2**(p + 1)
+    MSB = 3 << (p - 1)               # Los dos bits mas significativos del puntero
+
+    # Dominio de escritura
+    w_bin = Signal(intbv(0)[p+1:])
+    w_gray = Signal(intbv(0)[p+1:])
+    w_bin_sig = Signal(intbv(0)[p+1:])
+    w_gray_sig = Signal(intbv(0)[p+1:])
+    wq1_r_gray = Signal(intbv(0)[p+1:])
+    wq2_r_gray = Signal(intbv(0)[p+1:])
+    full = Signal(Lo)
+    escribe = Signal(Lo)
+    addr_a = Signal(intbv(0)[p:])
+
+    # Dominio de lectura
+    r_bin = Signal(intbv(0)[p+1:])
+    r_gray = Signal(intbv(0)[p+1:])
+    r_bin_sig = Signal(intbv(0)[p+1:])
+    r_gray_sig = Signal(intbv(0)[p+1:])
+    rq1_w_gray = Signal(intbv(0)[p+1:])
+    rq2_w_gray = Signal(intbv(0)[p+1:])
+    empty = Signal(Hi)
+    lee = Signal(Lo)
+    ena_b = Signal(Lo)
+    addr_b = Signal(intbv(0)[p:])
+
+    bajo = Signal(Lo)                # Reset del puerto A y write enable del B
+
+    if n == 1 :
+        d_a_o = Signal(Lo)
+        d_b_i = Signal(Lo)
+    else :
+        d_a_o = Signal(intbv(0)[n:])
+        d_b_i = Signal(intbv(0)[n:])
+
+    ###############################################
+
+    ram = RAM_DP(clkA_i = clkW_i,
+                 enaA_i = escribe,
+                 rstA_i = bajo,
+                 weA_i = escribe,
+                 addrA_i = addr_a,
+                 dA_i = d_i,
+                 dA_o = d_a_o,
+                 clkB_i = clkR_i,
+                 enaB_i = ena_b,
+                 rstB_i = rstR_i,
+                 weB_i = bajo,
+                 addrB_i = addr_b,
+                 dB_i = d_b_i,
+                 dB_o = q_o,
+                 sim_array = sim_array)
+
+    ###############################################
+    # Escritura
+
+    @always_comb
+    def w_siguiente() :
+        escribe.next = push_i and not full and not rstW_i
+        addr_a.next = w_bin[p:]
+        if push_i and not full :
+            w_bin_sig.next = (w_bin + 1) % MOD
+        else :
+            w_bin_sig.next = w_bin
+
+    @always_comb
+    def w_a_gray() :
+        w_gray_sig.next = (w_bin_sig >> 1) ^ w_bin_sig
+
+    @always(clkW_i.posedge)
+    def w_registros() :
+        if rstW_i :
+            w_bin.next = 0
+            w_gray.next = 0
+            wq1_r_gray.next = 0
+            wq2_r_gray.next = 0
+            full.next = Lo
+        else :
+            w_bin.next = w_bin_sig
+            w_gray.next = w_gray_sig
+            wq1_r_gray.next = r_gray             # Sincronizador
+            wq2_r_gray.next = wq1_r_gray
+            # Llena : el puntero de escritura dio una vuelta mas que el de lectura
+            full.next = w_gray_sig == (wq2_r_gray ^ MSB)
+
+    ###############################################
+    # Lectura
+
+    @always_comb
+    def r_siguiente() :
+        lee.next = pop_i and not empty and not rstR_i
+        ena_b.next = (pop_i and not empty) or rstR_i
+        addr_b.next = r_bin[p:]
+        if pop_i and not empty :
+            r_bin_sig.next = (r_bin + 1) % MOD
+        else :
+            r_bin_sig.next = r_bin
+
+    @always_comb
+    def r_a_gray() :
+        r_gray_sig.next = (r_bin_sig >> 1) ^ r_bin_sig
+
+    @always(clkR_i.posedge)
+    def r_registros() :
+        if rstR_i :
+            r_bin.next = 0
+            r_gray.next = 0
+            rq1_w_gray.next = 0
+            rq2_w_gray.next = 0
+            empty.next = Hi
+        else :
+            r_bin.next = r_bin_sig
+            r_gray.next = r_gray_sig
+            rq1_w_gray.next = w_gray             # Sincronizador
+            rq2_w_gray.next = rq1_w_gray
+            empty.next = r_gray_sig == rq2_w_gray
+
+    @always_comb
+    def flags() :
+        full_o.next = full
+        empty_o.next = empty
+
+    return instances()
+
+############################################################
+
+def FILO(clk_i, 
+         push_i, 
+         pop_i, 
+         d_i, 
+         q_o, 
+         k) :
+    """Estructura FILO (stack) de k posiciones y n bits de datos
+    ::
+
+            ________________________
+       ____|                        |____
+       ____| d_i                q_o |____
+           |                        |
+       ----|> clk_i                 |
+           |                        |
+       ----| push_i                 |
+           |                        |
+       ----| pop_i                  |
+           |________________________|
+ 
+    La salida q_o muestra siempre el tope del stack. El puntero es circular,
+    si se hacen mas de k push se sobreescriben los datos mas viejos.
+
+    :Parametros:
+        - `clk_i`  :  entrada de clock
+        - `push_i` :  guarda d_i en el stack
+        - `pop_i`  :  descarta el tope del stack
+        - `d_i`    :  data in (n bits)
+        - `q_o`    :  tope del stack (n bits)
+        - `k`      :  cantidad de posiciones del stack
+
+    """    
+
+    n = len(d_i)
+
+    sp = Signal(intbv(0, 0, k))        # Puntero a la proxima posicion libre
+    tope = Signal(intbv(k - 1, 0, k))  # Puntero al tope del stack 
+
+    if n == 1 :
+        ram = [Signal(Lo) for i in range(k)]
+    else :
+        ram = [Signal(intbv(0)[n:]) for i in range(k)]
+
+    @always(clk_i.posedge)
+    def FILO_hdl() :
+        if push_i :
+            ram[int(sp)].next = d_i
+            tope.next = sp
+            if sp == k - 1 :
+                sp.next = 0
+            else :
+                sp.next = sp + 1
+        elif pop_i :
+            sp.next = tope
+            if tope == 0 :
+                tope.next = k - 1
+            else :
+                tope.next = tope - 1
+
+    @always_comb
+    def read_tope() :
+        q_o.next = ram[int(tope)]
+
+    return instances()
+
+############################################################
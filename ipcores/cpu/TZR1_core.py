@@ -13,6 +13,7 @@ from reg_file import RegFile
 from inst_deco import inst_deco
 from pc import pc
 from FlipFlops import FD_E
+from imagen_mem import cargar
 
 Hi = True       # Definicion de niveles logicos
 Lo = False      
@@ -24,7 +25,10 @@ def TZR1(clk_i,
          data_o,
          write_o,
          read_o,
-         program) :
+         program,
+         sondas = None,
+         deco_tabla = False,
+         init_file = None) :
 
     """ Nucleo del micro
         ::
@@ -76,8 +80,22 @@ def TZR1(clk_i,
                                                                                             ^
                                                                                             |
                                                                                     ctrl_mux_alu_mem
+
+    :Parametros:
+        - `program` : tupla con el programa (ver ``asm.py``). Para simulacion tambien sirve el
+                      ``array('H')`` que devuelve ``imagen_mem.cargar_bin``
+        - `sondas`  : (opcional) dict donde se publican las senales internas (``pc``, ``status``, ``ir`` y ``regs``)
+                      para poder observarlas desde un testbench. No tiene efecto en la conversion.
+        - `deco_tabla` : (solo simulacion) usa el decodificador por tabla precalculada, mas rapido
+                         en simulaciones largas. Para convertir a HDL dejar en ``False``
+        - `init_file` : (opcional) carga el programa de un binario crudo (mapeado con mmap) o de
+                        un ``$readmemh`` (``.mem``), como los que genera ``asm.py -f bin|mem``.
+                        En ese caso `program` se ignora
     """
 
+    if init_file is not None :
+        program = tuple(cargar(init_file))     # La conversion de la ROM necesita una tupla
+
     ####### Senales #######
 
     ########################
@@ -142,7 +160,8 @@ def TZR1(clk_i,
                           jmp_o = jmp,
                           call_o = call,
                           ret_o = ret,
-                          pck_o = pck) 
+                          pck_o = pck,
+                          tabla = deco_tabla) 
 
 
     PROG_COUNTER = pc(clk_i = clk_i,
@@ -167,7 +186,8 @@ def TZR1(clk_i,
                        a_i = a_i,
                        a_o = a_o,
                        addr_b_i = addr_b,
-                       b_o = b_o)
+                       b_o = b_o,
+                       sondas = sondas)
 
     ALU = alu(op_A_i = a_o,
               op_B_i = mux_reg_k_o,
@@ -192,6 +212,11 @@ def TZR1(clk_i,
         addr_o.next = mux_reg_k_o
         data_o.next = ALU_resul
 
+    if sondas is not None :
+        sondas["pc"] = pc_q
+        sondas["status"] = status_reg_q
+        sondas["ir"] = ir
+
 
     return instances()
 
@@ -0,0 +1,311 @@
+"""
+Nucleo del TZR1 con pipeline
+============================
+
+:Autor: Hugo Arboleas <harboleas@citedef.gob.ar>
+------------------------------------------------
+
+Variante del ``TZR1`` con un pipeline de 3 etapas (fetch, decode y execute),
+compatible a nivel binario con el set de instrucciones de ``instruction_set.py``.
+
+"""
+
+from myhdl import *
+from alu import alu, alu_fun
+from inst_deco import inst_deco
+from Memorias import FILO
+from imagen_mem import cargar
+
+Hi = True       # Definicion de niveles logicos
+Lo = False
+
+def TZR1_pipe(clk_i,
+              rst_i,
+              addr_o,
+              data_i,
+              data_o,
+              write_o,
+              read_o,
+              program,
+              sondas = None,
+              deco_tabla = False,
+              init_file = None) :
+
+    """ Nucleo del micro con pipeline de 3 etapas
+        ::
+
+                   FETCH            |          DECODE           |          EXECUTE
+                                    |                           |
+                   .-----.    .-----.     .-----------.   .-----.     .-----.
+         next_pc ->| ROM |--->| ir  |---->| inst_deco |-->| ctrl|---->| ALU |---> data_o
+            ^      '-----'    '-----'     '-----------'   '-----'     '-----'
+            |                       |     .-----------.   .-----.        |
+            |                       '---->| Reg File  |-->| a,b |--------'
+            |                             '-----------'   '-----'        |
+            |                                   ^    ^                   |
+            |                                   |    '--- forwarding ----'
+            |                                   '------ write back ------'
+            |                                                            |
+            '------------------- saltos ( jmp, jc, jz, call, ret ) ------'
+
+        * Fetch   : la ROM de programa es sincronica, se direcciona con ``next_pc`` y la
+                    instruccion queda registrada en ``ir_d`` (apta para block RAM).
+        * Decode  : ``inst_deco`` y lectura del reg file. Los operandos y los flags se toman
+                    del resultado de la etapa execute si esta escribe el mismo registro o el
+                    status (forwarding), por lo que no hay stalls por dependencias de datos.
+        * Execute : ALU, acceso a la memoria de datos, escritura del reg file y del status.
+                    Los saltos se resuelven aca, y si se toman se descarta la instruccion en
+                    decode (flush) y se busca la del destino : una burbuja por salto tomado.
+
+        El reset (sincronico) solo reinicia el PC y vacia el pipeline, como en ``TZR1``.
+        Un opcode invalido detiene el micro, que vuelve a buscarlo indefinidamente.
+
+    :Parametros:
+        - `program` : tupla con el programa (ver ``asm.py``). Para simulacion tambien sirve el
+                      ``array('H')`` que devuelve ``imagen_mem.cargar_bin``
+        - `sondas`  : (opcional) dict donde se publican las senales internas para simulacion :
+                      ``pc`` (direccion de la proxima instruccion a ejecutar), ``status``, ``regs``
+                      y los contadores ``ciclos``, ``instrucciones`` y ``burbujas``, con los que
+                      se calcula el CPI. Los contadores solo se agregan si se pasa `sondas`.
+        - `deco_tabla` : (solo simulacion) usa el decodificador por tabla precalculada
+        - `init_file` : (opcional) carga el programa de un binario crudo (mapeado con mmap) o de
+                        un ``$readmemh`` (``.mem``), como los que genera ``asm.py -f bin|mem``.
+                        En ese caso `program` se ignora
+    """
+
+    if init_file is not None :
+        program = tuple(cargar(init_file))     # La conversion de la ROM necesita una tupla
+
+    ####### Senales #######
+
+    ########################
+    # Fetch
+    next_pc = Signal(intbv(0)[11:])
+
+    ########################
+    # Decode
+    ir_d = Signal(intbv(0)[16:])
+    pc_d = Signal(intbv(0)[11:])
+    valid_d = Signal(Lo)
+
+    addr_a = Signal(intbv(0)[3:])
+    addr_b = Signal(intbv(0)[3:])
+    a_fwd = Signal(intbv(0)[8:])
+    b_fwd = Signal(intbv(0)[8:])
+    status_fwd = Signal(intbv(0)[2:])
+
+    ALU_fun = Signal(alu_fun.ALU_OPA)
+    ctrl_mux_reg_k = Signal(Lo)
+    ctrl_mux_alu_mem = Signal(Lo)
+    we_reg_file = Signal(Lo)
+    ce_status_reg = Signal(Lo)
+    wr_mem = Signal(Lo)
+    rd_mem = Signal(Lo)
+    k = Signal(intbv(0)[8:])
+    inc_pc = Signal(Lo)
+    jmp = Signal(Lo)
+    call = Signal(Lo)
+    ret = Signal(Lo)
+    pck = Signal(intbv(0)[11:])
+
+    ########################
+    # Execute
+    pc_e = Signal(intbv(0)[11:])
+    valid_e = Signal(Lo)
+    a_e = Signal(intbv(0)[8:])
+    b_e = Signal(intbv(0)[8:])
+    k_e = Signal(intbv(0)[8:])
+    pck_e = Signal(intbv(0)[11:])
+    addr_a_e = Signal(intbv(0)[3:])
+    ALU_fun_e = Signal(alu_fun.ALU_OPA)
+    ctrl_mux_reg_k_e = Signal(Lo)
+    ctrl_mux_alu_mem_e = Signal(Lo)
+    we_reg_file_e = Signal(Lo)
+    ce_status_reg_e = Signal(Lo)
+    wr_mem_e = Signal(Lo)
+    rd_mem_e = Signal(Lo)
+    inc_pc_e = Signal(Lo)
+    jmp_e = Signal(Lo)
+    call_e = Signal(Lo)
+    ret_e = Signal(Lo)
+
+    mux_reg_k_o = Signal(intbv(0)[8:])
+    ALU_resul = Signal(intbv(0)[8:])
+    ALU_status = Signal(intbv(0)[2:])
+    a_i = Signal(intbv(0)[8:])               # Dato a escribir en el reg file
+    we = Signal(Lo)
+    ce_status = Signal(Lo)
+    push = Signal(Lo)
+    pop = Signal(Lo)
+    salto = Signal(Lo)
+    ret_addr = Signal(intbv(0)[11:])
+    stack_out = Signal(intbv(0)[11:])
+
+    status_reg_q = Signal(intbv(0)[2:])
+
+    reg_file_mem = [Signal(intbv(0)[8:]) for i in range(8)]
+
+    # El fetch especulativo de la instruccion que sigue a un salto puede leer una
+    # posicion despues del final del programa (se descarta con el flush)
+    rom = tuple(program) + (0,)
+
+    ###############################
+    ## Fetch
+
+    @always_comb
+    def calc_next_pc() :
+        if salto :
+            if ret_e :
+                next_pc.next = stack_out
+            elif jmp_e or call_e :
+                next_pc.next = pck_e
+            else :                      # opcode invalido, se queda en la misma instruccion
+                next_pc.next = pc_e
+        elif valid_d :
+            next_pc.next = pc_d + 1
+        else :
+            next_pc.next = pc_d
+
+    @always(clk_i.posedge)
+    def ROM_read() :
+        if rst_i :
+            ir_d.next = rom[0]
+            pc_d.next = 0
+        else :
+            ir_d.next = rom[int(next_pc)]
+            pc_d.next = next_pc
+        valid_d.next = Hi
+
+    ###############################
+    ## Decode
+
+    INST_DECO = inst_deco(ir_i = ir_d,
+                          status_reg_i = status_fwd,
+                          ce_status_reg_o = ce_status_reg,
+                          alu_fun_o = ALU_fun,
+                          addr_a_o = addr_a,
+                          addr_b_o = addr_b,
+                          we_reg_file_o = we_reg_file,
+                          ctrl_mux_reg_k_o = ctrl_mux_reg_k,
+                          k_o = k,
+                          wr_mem_o = wr_mem,
+                          rd_mem_o = rd_mem,
+                          ctrl_mux_alu_mem_o = ctrl_mux_alu_mem,
+                          inc_pc_o = inc_pc,
+                          jmp_o = jmp,
+                          call_o = call,
+                          ret_o = ret,
+                          pck_o = pck,
+                          tabla = deco_tabla)
+
+    @always_comb
+    def forwarding() :
+        if we and addr_a_e == addr_a :
+            a_fwd.next = a_i
+        else :
+            a_fwd.next = reg_file_mem[int(addr_a)]
+
+        if we and addr_a_e == addr_b :
+            b_fwd.next = a_i
+        else :
+            b_fwd.next = reg_file_mem[int(addr_b)]
+
+        if ce_status :
+            status_fwd.next = ALU_status
+        else :
+            status_fwd.next = status_reg_q
+
+    @always(clk_i.posedge)
+    def reg_execute() :
+        valid_e.next = valid_d and not salto and not rst_i
+        pc_e.next = pc_d
+        a_e.next = a_fwd
+        b_e.next = b_fwd
+        k_e.next = k
+        pck_e.next = pck
+        addr_a_e.next = addr_a
+        ALU_fun_e.next = ALU_fun
+        ctrl_mux_reg_k_e.next = ctrl_mux_reg_k
+        ctrl_mux_alu_mem_e.next = ctrl_mux_alu_mem
+        we_reg_file_e.next = we_reg_file
+        ce_status_reg_e.next = ce_status_reg
+        wr_mem_e.next = wr_mem
+        rd_mem_e.next = rd_mem
+        inc_pc_e.next = inc_pc
+        jmp_e.next = jmp
+        call_e.next = call
+        ret_e.next = ret
+
+    ###############################
+    ## Execute
+
+    ALU = alu(op_A_i = a_e,
+              op_B_i = mux_reg_k_o,
+              fun_i = ALU_fun_e,
+              resul_o = ALU_resul,
+              status_o = ALU_status)
+
+    @always_comb
+    def control_execute() :
+        we.next = valid_e and we_reg_file_e
+        ce_status.next = valid_e and ce_status_reg_e
+        write_o.next = valid_e and wr_mem_e
+        read_o.next = valid_e and rd_mem_e
+        push.next = valid_e and call_e
+        pop.next = valid_e and ret_e
+        salto.next = valid_e and (jmp_e or call_e or ret_e or not inc_pc_e)
+        ret_addr.next = (pc_e + 1) % 2**11
+
+    @always_comb
+    def MUXES() :
+        mux_reg_k_o.next = k_e if ctrl_mux_reg_k_e else b_e
+        a_i.next = data_i if ctrl_mux_alu_mem_e else ALU_resul
+
+    @always_comb
+    def conex() :
+        addr_o.next = mux_reg_k_o
+        data_o.next = ALU_resul
+
+    @always(clk_i.posedge)
+    def write_back() :
+        if we :
+            reg_file_mem[int(addr_a_e)].next = a_i
+        if ce_status :
+            status_reg_q.next = ALU_status
+
+    STACK = FILO(clk_i = clk_i,
+                 push_i = push,
+                 pop_i = pop,
+                 d_i = ret_addr,
+                 q_o = stack_out,
+                 k = 16)
+
+    if sondas is not None :
+        pc_arq = Signal(intbv(0)[11:])
+        ciclos = Signal(intbv(0)[32:])
+        instrucciones = Signal(intbv(0)[32:])
+        burbujas = Signal(intbv(0)[32:])
+
+        @always_comb
+        def calc_pc_arq() :
+            pc_arq.next = pc_e if valid_e else pc_d
+
+        @always(clk_i.posedge)
+        def contadores() :
+            ciclos.next = ciclos + 1
+            if valid_e :
+                instrucciones.next = instrucciones + 1
+            else :
+                burbujas.next = burbujas + 1
+
+        sondas["pc"] = pc_arq
+        sondas["status"] = status_reg_q
+        sondas["regs"] = reg_file_mem
+        sondas["ir"] = ir_d
+        sondas["valid"] = valid_e
+        sondas["ciclos"] = ciclos
+        sondas["instrucciones"] = instrucciones
+        sondas["burbujas"] = burbujas
+
+    return instances()
+
@@ -47,7 +47,7 @@ def alu(op_A_i,
 
     n = len(op_A_i)
 
-    resul_temp = Signal(intbv(0, -2**n, 2**n - 1 ))
+    resul_temp = Signal(intbv(0, -2**n, 2**(n+1)))   # n bits + carry (2**n - 1 + 2**n - 1 como maximo)
     carry = Signal(Lo)
     zero = Signal(Lo)
 
@@ -1,251 +1,358 @@
 """
-Assembler TZR1 
+Assembler TZR1
 ==============
 
 :Autor: Hugo Arboleas <harboleas@citedef.gob.ar>
 -------------------------------------------------
-"""    
+
+Uso como biblioteca::
+
+    from asm import assemble, ErrorAsm
+    program = assemble(open("fibo.asm").read())
+
+Uso desde la linea de comandos (genera un ``.py`` por cada ``.asm``)::
+
+    python asm.py fibo.asm contador.asm ...
+
+Con ``-f`` se elige el formato de salida : ``py`` (``program = (...)``),
+``bin`` (binario little-endian), ``hex`` (Intel HEX) o ``mem`` (``$readmemh``)::
+
+    python asm.py -f bin -f mem fibo.asm
+
+Con ``-O`` se aplica la optimizacion peephole (ver ``peephole``).
+
+"""
 
 import sys
 import re
+import argparse
+
+from instruction_set import *
+from imagen_mem import escribir_bin, escribir_ihex, escribir_readmemh
+
+
+class ErrorAsm(Exception) :
+    """Error de ensamblado
+
+    :Atributos:
+        - `linea`   : linea del archivo fuente donde se detecto el error (o None)
+        - `mensaje` : descripcion del error
+    """
+
+    def __init__(self, mensaje, linea = None) :
+        Exception.__init__(self, mensaje, linea)
+        self.mensaje = mensaje
+        self.linea = linea
+
+    def __str__(self) :
+        if self.linea is None :
+            return "Error : %s" % self.mensaje
+        return "Error : %s en la linea %d" % (self.mensaje, self.linea)
 
-p = open(sys.argv[1])
-pr = p.read()
-p.close()
 
 ################ Analizador lexico #################
 
-def_tokens = [("label", " *([a-z_A-Z][0-9a-z_A-Z]*) *:"),                        
-              ("op", "(add|and|call|cmp|jc|jmp|jz|mov|nop|not|or|ret|shl|shr|sub)"),
-              ("reg", "(r[0-9]+)"), 
-              ("addr_reg", "(\[r[0-9]+\])"), 
-              ("addr_ent", "(\[(?:0x[0-9a-fA-F]+|0b[01]+|[0-9]+)\])"),
-              ("entero", "(0x[0-9a-fA-F]+|0b[01]+|[0-9]+)"),
-              ("id", "([a-z_A-Z][0-9a-z_A-Z]*)"),
-              ("comen", "(#.*)"),
-              ("fin_linea", "(\n)")]
+# Cada token es un grupo con nombre, el tipo se obtiene de ``lastgroup``
+# sin recorrer todos los grupos de cada coincidencia
+def_tokens = [("label", r"(?P<label>[a-z_A-Z][0-9a-z_A-Z]*) *:"),
+              ("op", r"(?P<op>add|and|call|cmp|jc|jmp|jz|mov|nop|not|or|ret|shl|shr|sub)"),
+              ("reg", r"(?P<reg>r[0-9]+)"),
+              ("addr_reg", r"(?P<addr_reg>\[r[0-9]+\])"),
+              ("addr_ent", r"(?P<addr_ent>\[(?:0x[0-9a-fA-F]+|0b[01]+|[0-9]+)\])"),
+              ("entero", r"(?P<entero>0x[0-9a-fA-F]+|0b[01]+|[0-9]+)"),
+              ("id", r"(?P<id>[a-z_A-Z][0-9a-z_A-Z]*)"),
+              ("comen", r"(?P<comen>#.*)"),
+              ("fin_linea", r"(?P<fin_linea>\n)")]
 
-lex = "|".join(t[1] for t in def_tokens)
+lex = re.compile("|".join(t[1] for t in def_tokens))
 
-tok_find = re.findall(lex, pr)
+def tokenizar(texto) :
+    """Generador de tokens ``(tipo, token)`` del texto fuente.
 
-tokens = []
-for t in tok_find :
-    for i, tok in enumerate(t) :
-        if tok :
-            tokens.append((def_tokens[i][0], tok))
+    Los tokens se producen a medida que el analizador sintactico los
+    consume, sin armar la lista completa.
+    """
 
+    for m in lex.finditer(texto) :
+        tipo = m.lastgroup
+        yield tipo, m.group(tipo)
 
-################ Analizador sintactico #################
 
+def entero(token) :
+    """Convierte un literal (decimal, 0x hexa o 0b binario) a int"""
+    base = token[0:2]
+    return int(token, 16 if base == "0x" else 2 if base == "0b" else 10)
 
-estado = "ESPERA_INI_INST"
-etiquetas = {}
-nro_instr = 0
-nro_linea = 1
-program_asm = []
 
-#### Forma de una instruccion
-## [label :] op [arg1, arg2] [# Comentario] 
+################ Analizador sintactico #################
 
-# FSM que reconoce la sintaxis
-for tipo, token in tokens :
+def analizar(tokens) :
+    """FSM que reconoce la sintaxis del programa
 
-    if estado == "ESPERA_INI_INST" :                                 # Inicio de instruccion
-        if tipo in ("fin_linea", "comen", "label") :
-            if tipo == "label" :
-                etiquetas[token] = nro_instr      # Guarda la direccion de la instruccion a la que hace ref el label
+    Forma de una instruccion::
 
-            elif tipo == "fin_linea" :
-                nro_linea += 1         # Para indicar errores de sintaxis en el archivo fuente
-
-        elif tipo == "op" :
-            op = token                 # Voy armando el tipo de instruccion para luego convertirla con la tabla 
-            if token in ("nop", "ret") :            # Operaciones sin argumentos  
-                arg1 = None
-                arg2 = None
-                program_asm.append((op, arg1, arg2)) 
-                estado = "ESPERA_FIN_INST"
+        [label :] op [arg1, arg2] [# Comentario]
 
-            elif token in ("call", "jc", "jmp", "jz", "not", "shl", "shr") :    # Operaciones con un solo argumento  
-                estado = "OP_1_ARG"                       
+    :Retorna: ``(program_asm, etiquetas, lineas)``
+        - `program_asm` : lista de ``(op, arg1, arg2)``, los saltos pueden tener
+                          una etiqueta como arg1
+        - `etiquetas`   : dict etiqueta -> direccion de la instruccion
+        - `lineas`      : linea del fuente de cada instruccion de program_asm
+    """
 
-            else :                                        # Operaciones con dos argumentos  
-                estado = "OP_2_ARG"                       
-        else :
-            print "Error de sintaxis en la linea %d" % nro_linea 
-            sys.exit()
+    estado = "ESPERA_INI_INST"
+    etiquetas = {}
+    nro_instr = 0
+    nro_linea = 1
+    program_asm = []
+    lineas = []
 
-        continue      # va por el siguiente token
-    
-    elif estado == "OP_1_ARG" :     # Espera solo un argumento
+    for tipo, token in tokens :
 
-        if op in ("not", "shl", "shr") :     # solo operan sobre registros
-            if tipo == "reg" :
-                op = op + "_ra"         
-                arg1 = int(token[1:])
-                arg2 = None
-                program_asm.append((op, arg1, arg2)) 
-                estado = "ESPERA_FIN_INST"
-            else : 
-                print "Error de sintaxis en la linea %d" % nro_linea 
-                sys.exit()
-
-        else :   #La operacion es de salto o call
-            if tipo == "entero" :
-                op = op + "_pck"
-                try :
-                    base = token[0:2]
-                except :
-                    base = 10                    
-                arg1 = int(token, 16 if base == "0x" else 2 if base == "0b" else 10)
-                arg2 = None
-                program_asm.append((op, arg1, arg2)) 
-                estado = "ESPERA_FIN_INST"
+        if estado == "ESPERA_INI_INST" :                                 # Inicio de instruccion
+            if tipo in ("fin_linea", "comen", "label") :
+                if tipo == "label" :
+                    etiquetas[token] = nro_instr      # Guarda la direccion de la instruccion a la que hace ref el label
 
-            elif tipo == "id" :
-                op = op + "_pck"
-                arg1 = token        # Luego se debe conviertir a entero una vez que se hayan obtenido todas las etiquetas
-                arg2 = None
-                program_asm.append((op, arg1, arg2)) 
-                estado = "ESPERA_FIN_INST"
+                elif tipo == "fin_linea" :
+                    nro_linea += 1         # Para indicar errores de sintaxis en el archivo fuente
 
+            elif tipo == "op" :
+                op = token                 # Voy armando el tipo de instruccion para luego convertirla con la tabla
+                if token in ("nop", "ret") :            # Operaciones sin argumentos
+                    program_asm.append((op, None, None))
+                    lineas.append(nro_linea)
+                    estado = "ESPERA_FIN_INST"
+
+                elif token in ("call", "jc", "jmp", "jz", "not", "shl", "shr") :    # Operaciones con un solo argumento
+                    estado = "OP_1_ARG"
+
+                else :                                        # Operaciones con dos argumentos
+                    estado = "OP_2_ARG"
             else :
-                print "Error de sintaxis en la linea %d" % nro_linea 
-                sys.exit()
+                raise ErrorAsm("sintaxis", nro_linea)
+
+        elif estado == "OP_1_ARG" :     # Espera solo un argumento
+
+            if op in ("not", "shl", "shr") :     # solo operan sobre registros
+                if tipo == "reg" :
+                    program_asm.append((op + "_ra", int(token[1:]), None))
+                    lineas.append(nro_linea)
+                    estado = "ESPERA_FIN_INST"
+                else :
+                    raise ErrorAsm("sintaxis", nro_linea)
+
+            else :   #La operacion es de salto o call
+                if tipo == "entero" :
+                    program_asm.append((op + "_pck", entero(token), None))
+                    lineas.append(nro_linea)
+                    estado = "ESPERA_FIN_INST"
+
+                elif tipo == "id" :
+                    # La etiqueta se convierte a entero una vez que se hayan obtenido todas
+                    program_asm.append((op + "_pck", token, None))
+                    lineas.append(nro_linea)
+                    estado = "ESPERA_FIN_INST"
 
-        continue        # siguiente token
+                else :
+                    raise ErrorAsm("sintaxis", nro_linea)
 
-    elif estado == "OP_2_ARG" :   # Espera 1er argumento
+        elif estado == "OP_2_ARG" :   # Espera 1er argumento
 
-        if tipo == "reg" :
-            op = op + "_ra"
-            arg1 = int(token[1:])
-            estado = "ESPERA_2_ARG"
+            if tipo == "reg" :
+                op = op + "_ra"
+                arg1 = int(token[1:])
+                estado = "ESPERA_2_ARG"
 
-        elif tipo == "addr_reg" :
-            if op == "mov" :
+            elif tipo == "addr_reg" and op == "mov" :
                 op = op + "_addr_rb"
-                arg1 = int(token[2:-1])    
+                arg1 = int(token[2:-1])
                 estado = "ESPERA_2_ARG_REG"
-            else :
-                print "Error de sintaxis en la linea %d" % nro_linea 
-                sys.exit()
 
-        elif tipo == "addr_ent" :
-            if op == "mov" :
+            elif tipo == "addr_ent" and op == "mov" :
                 op = op + "_addr_k"
-                aux = token[1:-1]
-                try :
-                    base = aux[0:2]
-                except :
-                    base = 10                    
-                arg1 = int(aux, 16 if base == "0x" else 2 if base == "0b" else 10)
+                arg1 = entero(token[1:-1])
                 estado = "ESPERA_2_ARG_REG"
 
             else :
-                print "Error de sintaxis en la linea %d" % nro_linea 
-                sys.exit()
+                raise ErrorAsm("sintaxis", nro_linea)
 
-        else :
-            print "Error de sintaxis en la linea %d" % nro_linea 
-            sys.exit()
-            
-        continue
+        elif estado == "ESPERA_2_ARG" :
+
+            if tipo == "reg" :
+                program_asm.append((op + "_rb", arg1, int(token[1:])))
+                lineas.append(nro_linea)
+                estado = "ESPERA_FIN_INST"
 
-    elif estado == "ESPERA_2_ARG" :   
+            elif tipo == "entero" :
+                program_asm.append((op + "_k", arg1, entero(token)))
+                lineas.append(nro_linea)
+                estado = "ESPERA_FIN_INST"
 
-        if tipo == "reg" :
-            op = op + "_rb"
-            arg2 = int(token[1:])
-            program_asm.append((op, arg1, arg2)) 
-            estado = "ESPERA_FIN_INST"
+            elif tipo == "addr_reg" and op == "mov_ra" :
+                program_asm.append((op + "_addr_rb", arg1, int(token[2:-1])))
+                lineas.append(nro_linea)
+                estado = "ESPERA_FIN_INST"
 
-        elif tipo == "entero" :
-            op = op + "_k"
-            try :
-                base = token[0:2]
-            except :
-                base = 10                    
-            arg2 = int(token, 16 if base == "0x" else 2 if base == "0b" else 10)
-            program_asm.append((op, arg1, arg2)) 
-            estado = "ESPERA_FIN_INST"
-
-        elif tipo == "addr_reg" :
-            if op == "mov_ra" :
-                op = op + "_addr_rb"
-                arg2 = int(token[2:-1])    
-                program_asm.append((op, arg1, arg2)) 
+            elif tipo == "addr_ent" and op == "mov_ra" :
+                program_asm.append((op + "_addr_k", arg1, entero(token[1:-1])))
+                lineas.append(nro_linea)
                 estado = "ESPERA_FIN_INST"
+
             else :
-                print "Error de sintaxis en la linea %d" % nro_linea 
-                sys.exit()
+                raise ErrorAsm("sintaxis", nro_linea)
 
-        elif tipo == "addr_ent" :
-            if op == "mov_ra" :
-                op = op + "_addr_k"
-                aux = token[1:-1]
-                try :
-                    base = aux[0:2]
-                except :
-                    base = 10                    
-                arg2 = int(aux, 16 if base == "0x" else 2 if base == "0b" else 10)
-                program_asm.append((op, arg1, arg2)) 
+        elif estado == "ESPERA_2_ARG_REG" :
+            if tipo == "reg" :
+                program_asm.append((op + "_ra", arg1, int(token[1:])))
+                lineas.append(nro_linea)
                 estado = "ESPERA_FIN_INST"
 
             else :
-                print "Error de sintaxis en la linea %d" % nro_linea 
-                sys.exit()
-
- 
-        else :
-            print "Error de sintaxis en la linea %d" % nro_linea 
-            sys.exit()
-
-        continue
-
-    elif estado == "ESPERA_2_ARG_REG" :
-        if tipo == "reg" :
-            op = op + "_ra"
-            arg2 = int(token[1:])
-            program_asm.append((op, arg1, arg2)) 
-            estado = "ESPERA_FIN_INST"
-
-        else :
-            print "Error de sintaxis en la linea %d" % nro_linea 
-            sys.exit()
-
-        continue           
-
-    elif estado == "ESPERA_FIN_INST" :
-        if tipo == "comen" :
-            pass   # ingora los comentarios        
-        elif tipo == "fin_linea" :
-            nro_instr += 1
-            nro_linea += 1
-            estado = "ESPERA_INI_INST"
-        else :
-            print "Error de sintaxis en la linea %d" % nro_linea 
-            sys.exit()
-
-# Resuelve las direcciones de las etiquetas
-program_asm_2 = []
-
-for op, arg1, arg2 in program_asm :
-    arg1_aux = arg1
-    if op in ("call_pck", "jc_pck", "jmp_pck", "jz_pck") and type(arg1) == str :
-        try :
-            arg1_aux = etiquetas[arg1]
-        except :
-            print "Error : etiqueta no definida"  
-            sys.exit()           
-    program_asm_2.append((op, arg1_aux, arg2))
+                raise ErrorAsm("sintaxis", nro_linea)
 
-program_asm = program_asm_2
+        elif estado == "ESPERA_FIN_INST" :
+            if tipo == "comen" :
+                pass   # ignora los comentarios
+            elif tipo == "fin_linea" :
+                nro_instr += 1
+                nro_linea += 1
+                estado = "ESPERA_INI_INST"
+            else :
+                raise ErrorAsm("sintaxis", nro_linea)
 
-############### Conversion ###############
+    return program_asm, etiquetas, lineas
 
-from instruction_set import *
+
+def resolver_etiquetas(program_asm, etiquetas, lineas) :
+    """Reemplaza las etiquetas de los saltos por su direccion"""
+
+    program_res = []
+
+    for (op, arg1, arg2), linea in zip(program_asm, lineas) :
+        if op in ("call_pck", "jc_pck", "jmp_pck", "jz_pck") and isinstance(arg1, str) :
+            try :
+                arg1 = etiquetas[arg1]
+            except KeyError :
+                raise ErrorAsm("etiqueta '%s' no definida" % arg1, linea)
+        program_res.append((op, arg1, arg2))
+
+    return program_res
+
+
+############### Optimizacion ###############
+
+SALTOS = ("call_pck", "jc_pck", "jmp_pck", "jz_pck")
+
+# Instrucciones que escriben los flags sin leerlos (todas las de la ALU)
+ESCRIBEN_FLAGS = ("add_ra_k", "add_ra_rb", "and_ra_k", "and_ra_rb", "cmp_ra_k", "cmp_ra_rb",
+                  "mov_ra_k", "mov_ra_rb", "not_ra", "or_ra_k", "or_ra_rb", "shl_ra", "shr_ra",
+                  "sub_ra_k", "sub_ra_rb")
+
+
+def flags_vivos(program_asm, i) :
+    """True si los flags que deja la instruccion `i` pueden ser leidos por un
+    ``jc``/``jz`` antes de que otra instruccion los vuelva a escribir
+
+    Se sigue el flujo a partir de ``i + 1`` atravesando los ``jmp``. Ante un
+    ``call``, un ``ret`` o el final del programa se asume que estan vivos.
+    """
+
+    visitadas = set()
+    j = i + 1
+    while j < len(program_asm) :
+        if j in visitadas :          # Lazo sin lecturas ni escrituras de flags
+            return False
+        visitadas.add(j)
+        op, arg1, arg2 = program_asm[j]
+        if op in ESCRIBEN_FLAGS :
+            return False
+        elif op == "jmp_pck" :
+            j = arg1
+        elif op in ("jc_pck", "jz_pck", "call_pck", "ret") :
+            return True
+        else :                       # nop y accesos a memoria no tocan los flags
+            j += 1
+    return True
+
+
+def sin_efecto(program_asm, i) :
+    """True si la instruccion `i` se puede eliminar sin cambiar el programa"""
+
+    op, arg1, arg2 = program_asm[i]
+
+    if op in ("jmp_pck", "jc_pck", "jz_pck") :
+        return arg1 == i + 1                                        # Salto a la siguiente
+    if op == "mov_ra_rb" and arg1 == arg2 :                         # mov rX, rX
+        return not flags_vivos(program_asm, i)
+    if op in ("add_ra_k", "sub_ra_k", "or_ra_k") and arg2 == 0 :    # add rX, 0
+        return not flags_vivos(program_asm, i)
+    if op in ("cmp_ra_k", "cmp_ra_rb") :                            # cmp con resultado muerto
+        return not flags_vivos(program_asm, i)
+    return False
+
+
+def destino_final(program_asm, destino) :
+    """Sigue una cadena de ``jmp`` a partir de `destino`"""
+
+    visitados = set()
+    while (destino < len(program_asm) and program_asm[destino][0] == "jmp_pck"
+           and destino not in visitados) :
+        visitados.add(destino)
+        destino = program_asm[destino][1]
+    return destino
+
+
+def peephole(program_asm, etiquetas, lineas) :
+    """Optimizacion peephole sobre el programa con las etiquetas resueltas
+
+    * Los saltos (y ``call``) a un ``jmp`` se redirigen al destino final.
+    * Se eliminan los saltos a la instruccion siguiente y, si los flags que
+      escriben no se leen despues (ver ``flags_vivos``), ``mov rX, rX``,
+      ``add``/``sub``/``or rX, 0`` y los ``cmp``.
+
+    Al eliminar instrucciones se renumeran los destinos de los saltos y las
+    etiquetas : las que apuntaban a una instruccion eliminada pasan a la
+    siguiente. Se repite hasta que no haya cambios.
+
+    :Retorna: ``(program_asm, etiquetas, lineas)`` optimizados
+    """
+
+    program_asm = list(program_asm)
+    etiquetas = dict(etiquetas)
+    lineas = list(lineas)
+
+    while True :
+
+        for i, (op, arg1, arg2) in enumerate(program_asm) :
+            if op in SALTOS :
+                program_asm[i] = (op, destino_final(program_asm, arg1), arg2)
+
+        # Se decide sobre el programa de esta pasada, las eliminaciones que
+        # quedan habilitadas por las de esta se detectan en la siguiente
+        borrar = [sin_efecto(program_asm, i) for i in range(len(program_asm))]
+        if not any(borrar) :
+            return program_asm, etiquetas, lineas
+
+        # Nueva direccion de cada instruccion (y de las posiciones siguientes al final)
+        mapa = []
+        n = 0
+        for b in borrar :
+            mapa.append(n)
+            if not b :
+                n += 1
+        eliminadas = len(program_asm) - n
+
+        def nueva(dir) :
+            return mapa[dir] if dir < len(mapa) else dir - eliminadas
+
+        program_asm = [(op, nueva(arg1) if op in SALTOS else arg1, arg2)
+                       for (op, arg1, arg2), b in zip(program_asm, borrar) if not b]
+        lineas = [l for l, b in zip(lineas, borrar) if not b]
+        etiquetas = dict((e, nueva(d)) for e, d in etiquetas.items())
+
+
+############### Conversion ###############
 
 ### Tabla para la conversion
 TABLA = { "add_ra_k"       : lambda arg1, arg2 : (ADD_RA_K << 11) + (arg1 << 8) + arg2,
@@ -264,21 +371,93 @@ TABLA = { "add_ra_k"       : lambda arg1, arg2 : (ADD_RA_K << 11) + (arg1 << 8)
           "mov_ra_addr_rb" : lambda arg1, arg2 : (MOV_RA_Addr_RB << 11) + (arg1 << 8) + (arg2 << 5),
           "mov_addr_k_ra"  : lambda arg1, arg2 : (MOV_Addr_K_RA << 11) + (arg2<<8) + arg1,
           "mov_addr_rb_ra" : lambda arg1, arg2 : (MOV_Addr_RB_RA << 11) + (arg2 << 8) + (arg1 << 5),
-          "nop"            : lambda arg1, arg2 : (NOP << 11),  
+          "nop"            : lambda arg1, arg2 : (NOP << 11),
           "or_ra_k"        : lambda arg1, arg2 : (OR_RA_K << 11) + (arg1 << 8) + arg2,
           "or_ra_rb"       : lambda arg1, arg2 : (OR_RA_RB << 11) + (arg1 << 8) + (arg2 << 5),
-          "ret"            : lambda arg1, arg2 : (RET << 11),  
+          "ret"            : lambda arg1, arg2 : (RET << 11),
           "sub_ra_k"       : lambda arg1, arg2 : (SUB_RA_K << 11) + (arg1 << 8) + arg2,
           "sub_ra_rb"      : lambda arg1, arg2 : (SUB_RA_RB << 11) + (arg1 << 8) + (arg2 << 5),
           "shl_ra"         : lambda arg1, arg2 : (SHL_RA << 11) + (arg1 << 8),
           "shr_ra"         : lambda arg1, arg2 : (SHR_RA << 11) + (arg1 << 8) }
 
 
-program_hex = [ TABLA[inst](arg1, arg2) for inst, arg1, arg2 in program_asm ]  
+def codificar(program_asm) :
+    """Convierte las instrucciones ``(op, arg1, arg2)`` a codigo de maquina"""
+    return tuple(TABLA[inst](arg1, arg2) for inst, arg1, arg2 in program_asm)
+
+
+def assemble(source, optimizar = False) :
+    """Ensambla el texto fuente `source`
+
+    :Parametros:
+        - `optimizar` : aplica ``peephole`` antes de codificar
+
+    :Retorna: tupla con el programa, lista para ``TZR1(program = ...)``
+    :Excepciones: ``ErrorAsm`` con la linea del error
+    """
+
+    program_asm, etiquetas, lineas = analizar(tokenizar(source))
+    program_asm = resolver_etiquetas(program_asm, etiquetas, lineas)
+
+    if optimizar :
+        program_asm, etiquetas, lineas = peephole(program_asm, etiquetas, lineas)
+
+    return codificar(program_asm)
+
+
+############### Salida ###############
+
+def escribir_py(program, nombre) :
+    """Escribe el programa como modulo de Python (``program = (...)``)"""
+    f = open(nombre, "w")
+    f.write("program = " + str(program))
+    f.close()
+
+
+# Formatos de salida : extension y funcion que escribe el archivo
+FORMATOS = {"py"  : (".py", escribir_py),
+            "bin" : (".bin", escribir_bin),
+            "hex" : (".hex", escribir_ihex),
+            "mem" : (".mem", escribir_readmemh)}
+
+
+def main(argv) :
+    """Ensambla cada archivo ``.asm`` de la linea de comandos generando un
+    archivo por cada formato pedido (``-f``, por defecto ``py``). Un error en
+    un archivo no detiene a los demas.
+
+    :Retorna: cantidad de archivos con errores
+    """
+
+    parser = argparse.ArgumentParser(description = "Assembler TZR1")
+    parser.add_argument("-f", "--formato", action = "append", choices = sorted(FORMATOS),
+                        help = "formato de salida (se puede repetir)")
+    parser.add_argument("-O", "--optimizar", action = "store_true",
+                        help = "aplica la optimizacion peephole")
+    parser.add_argument("archivos", nargs = "+")
+    args = parser.parse_args(argv)
+
+    formatos = args.formato or ["py"]
+    errores = 0
+
+    for archivo in args.archivos :
+        f = open(archivo)
+        source = f.read()
+        f.close()
+
+        try :
+            program = assemble(source, args.optimizar)
+        except ErrorAsm as e :
+            sys.stderr.write("%s: %s\n" % (archivo, e))
+            errores += 1
+            continue
+
+        for formato in formatos :
+            ext, escribir = FORMATOS[formato]
+            escribir(program, archivo[:-4] + ext)
 
-program_hex = tuple(program_hex)
+    return errores
 
-f = open(sys.argv[1][:-4]+".py", "w")
-f.write("program = " + str(program_hex))
-f.close()
 
+if __name__ == "__main__" :
+    sys.exit(1 if main(sys.argv[1:]) else 0)
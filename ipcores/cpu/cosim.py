@@ -0,0 +1,221 @@
+"""
+Co-simulacion del TZR1
+======================
+
+:Autor: Hugo Arboleas <harboleas@citedef.gob.ar>
+------------------------------------------------
+
+Ejecuta en paralelo el nucleo ``TZR1`` (RTL) y un modelo de referencia (por
+defecto ``TZR1_ISS``) sobre el mismo programa, y compara el estado de ambos
+solo en puntos de control cada ``paso`` clocks. Entre puntos de control no se
+traza ni se compara nada, por lo que se pueden correr programas largos.
+
+Para el nucleo con pipeline (``TZR1_pipe``) los ciclos no coinciden con los
+del ISS, por lo que ``cosim_pipe`` avanza la referencia una instruccion por
+cada instruccion que completa la etapa execute, y compara el estado
+arquitectonico (pc, status, registros y memoria).
+
+"""
+
+from myhdl import *
+from TZR1_core import TZR1
+from TZR1_pipe import TZR1_pipe
+from iss import TZR1_ISS
+
+T_CLK = 4    # Periodo del clock de la simulacion
+
+def compara(sondas, bus_rtl, mem_rtl, ref) :
+    """Compara el estado del RTL con el de la referencia
+
+    :Retorna: ``None`` si coinciden o ``(nombre, valor_rtl, valor_ref)``
+              para el primer campo distinto
+    """
+
+    campos = (("pc", int(sondas["pc"]), ref.pc),
+              ("status", int(sondas["status"]), ref.status),
+              ("regs", [int(r) for r in sondas["regs"]], list(ref.regs)),
+              ("bus", bus_rtl, tuple(ref.bus())),
+              ("mem", list(mem_rtl), list(ref.mem)))
+
+    for nombre, valor_rtl, valor_ref in campos :
+        if valor_rtl != valor_ref :
+            return (nombre, valor_rtl, valor_ref)
+
+    return None
+
+
+def cosim(program,
+          ciclos,
+          paso = 1000,
+          mem = None,
+          ref = None,
+          deco_tabla = False) :
+    """Co-simulacion en lockstep del TZR1 contra un modelo de referencia
+
+    :Parametros:
+        - `program` : tupla con el programa
+        - `ciclos`  : cantidad de clocks a simular
+        - `paso`    : clocks entre puntos de control. Un paso mas chico detecta
+                      antes la divergencia, uno mas grande simula mas rapido
+        - `mem`     : contenido inicial de la memoria de datos (256 bytes)
+        - `ref`     : modelo de referencia con la interfaz de ``TZR1_ISS``
+                      (``run``, ``bus``, ``pc``, ``status``, ``regs``, ``mem``).
+                      Por defecto un ``TZR1_ISS`` con el mismo programa
+        - `deco_tabla` : simula el RTL con el decodificador por tabla (ver ``inst_deco``)
+
+    :Retorna: ``None`` si no hubo diferencias o
+              ``(ciclo, nombre, valor_rtl, valor_ref)`` con la primer divergencia
+    """
+
+    mem_rtl = bytearray(256) if mem is None else bytearray(mem)
+
+    if ref is None :
+        ref = TZR1_ISS(program, mem = bytearray(mem_rtl))
+
+    clk = Signal(False)
+    rst = Signal(False)
+    wr = Signal(False)
+    rd = Signal(False)
+    addr = Signal(intbv(0)[8:])
+    data_i = Signal(intbv(0)[8:])
+    data_o = Signal(intbv(0)[8:])
+
+    sondas = {}
+    divergencia = []
+
+    micro = TZR1(clk_i = clk,
+                 rst_i = rst,
+                 addr_o = addr,
+                 data_i = data_i,
+                 data_o = data_o,
+                 write_o = wr,
+                 read_o = rd,
+                 program = program,
+                 sondas = sondas,
+                 deco_tabla = deco_tabla)
+
+    @always(delay(T_CLK // 2))
+    def gen_clk() :
+        clk.next = not clk
+
+    # Memoria de datos : lectura asincronica y escritura sincronica
+    @always(clk.posedge)
+    def mem_escritura() :
+        if wr :
+            mem_rtl[int(addr)] = int(data_o)
+
+    @always(addr, clk.negedge)
+    def mem_lectura() :
+        data_i.next = mem_rtl[int(addr)]
+
+    @instance
+    def checker() :
+        # Los flancos positivos caen en T_CLK/2 + k * T_CLK, se muestrea
+        # a 1/4 de periodo del flanco negativo, con las senales estables
+        yield delay(T_CLK // 4)
+        ciclo = 0
+        while ciclo < ciclos :
+            n = min(paso, ciclos - ciclo)
+            yield delay(n * T_CLK)
+            ciclo += n
+            ref.run(n)
+            bus_rtl = (int(addr), int(data_o), bool(wr), bool(rd))
+            dif = compara(sondas, bus_rtl, mem_rtl, ref)
+            if dif is not None :
+                divergencia.append((ciclo,) + dif)
+                break
+        raise StopSimulation
+
+    Simulation(micro, gen_clk, mem_escritura, mem_lectura, checker).run()
+
+    return divergencia[0] if divergencia else None
+
+
+def cosim_pipe(program,
+               ciclos,
+               mem = None,
+               ref = None,
+               deco_tabla = False) :
+    """Co-simulacion del TZR1 con pipeline contra un modelo de referencia
+
+    Compara despues de cada clock en el que el pipeline completa una
+    instruccion. Los parametros son los de ``cosim``.
+
+    :Retorna: ``(divergencia, contadores)``, con ``divergencia`` igual a ``None``
+              si no hubo diferencias o ``(ciclo, nombre, valor_rtl, valor_ref)``,
+              y ``contadores`` un dict con los ``ciclos``, ``instrucciones`` y
+              ``burbujas`` al final de la simulacion (CPI = ciclos / instrucciones)
+    """
+
+    mem_rtl = bytearray(256) if mem is None else bytearray(mem)
+
+    if ref is None :
+        ref = TZR1_ISS(program, mem = bytearray(mem_rtl))
+
+    clk = Signal(False)
+    rst = Signal(False)
+    wr = Signal(False)
+    rd = Signal(False)
+    addr = Signal(intbv(0)[8:])
+    data_i = Signal(intbv(0)[8:])
+    data_o = Signal(intbv(0)[8:])
+
+    sondas = {}
+    divergencia = []
+    contadores = {}
+
+    micro = TZR1_pipe(clk_i = clk,
+                      rst_i = rst,
+                      addr_o = addr,
+                      data_i = data_i,
+                      data_o = data_o,
+                      write_o = wr,
+                      read_o = rd,
+                      program = program,
+                      sondas = sondas,
+                      deco_tabla = deco_tabla)
+
+    @always(delay(T_CLK // 2))
+    def gen_clk() :
+        clk.next = not clk
+
+    @always(clk.posedge)
+    def mem_escritura() :
+        if wr :
+            mem_rtl[int(addr)] = int(data_o)
+
+    @always(addr, clk.negedge)
+    def mem_lectura() :
+        data_i.next = mem_rtl[int(addr)]
+
+    def compara_pipe(ciclo) :
+        campos = (("pc", int(sondas["pc"]), ref.pc),
+                  ("status", int(sondas["status"]), ref.status),
+                  ("regs", [int(r) for r in sondas["regs"]], list(ref.regs)),
+                  ("mem", list(mem_rtl), list(ref.mem)))
+        for nombre, valor_rtl, valor_ref in campos :
+            if valor_rtl != valor_ref :
+                divergencia.append((ciclo, nombre, valor_rtl, valor_ref))
+                return False
+        return True
+
+    @instance
+    def checker() :
+        yield delay(T_CLK // 4)
+        ejecutadas = 0
+        for ciclo in range(1, ciclos + 1) :
+            yield delay(T_CLK)
+            n = int(sondas["instrucciones"]) - ejecutadas
+            if n :
+                ejecutadas += n
+                ref.run(n)
+                if not compara_pipe(ciclo) :
+                    break
+        # Al terminar la simulacion las senales vuelven a su valor inicial
+        for nombre in ("ciclos", "instrucciones", "burbujas") :
+            contadores[nombre] = int(sondas[nombre])
+        raise StopSimulation
+
+    Simulation(micro, gen_clk, mem_escritura, mem_lectura, checker).run()
+
+    return (divergencia[0] if divergencia else None), contadores
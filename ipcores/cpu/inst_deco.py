@@ -13,6 +13,65 @@ from alu import alu_fun
 Hi = True       # Definicion de niveles logicos
 Lo = False      
 
+def tabla_deco() :
+    """Tabla de decodificacion para simulacion, equivalente a ``deco``
+
+    Cada entrada es la palabra de control ``(ctrl_mux_reg_k, alu_fun,
+    ctrl_mux_alu_mem, we_reg_file, ce_status_reg, inc_pc, wr_mem, rd_mem,
+    jmp, call, ret)`` y el indice es ``opcode * 4 + status``
+    """
+
+    f = alu_fun
+
+    #                  mux_k  alu_fun  mux_mem we  ce  inc  wr  rd
+    control = { ADD_RA_K       : (Hi, f.ALU_ADD, Lo, Hi, Hi, Hi, Lo, Lo),
+                ADD_RA_RB      : (Lo, f.ALU_ADD, Lo, Hi, Hi, Hi, Lo, Lo),
+                AND_RA_K       : (Hi, f.ALU_AND, Lo, Hi, Hi, Hi, Lo, Lo),
+                AND_RA_RB      : (Lo, f.ALU_AND, Lo, Hi, Hi, Hi, Lo, Lo),
+                CMP_RA_K       : (Hi, f.ALU_SUB, Lo, Lo, Hi, Hi, Lo, Lo),
+                CMP_RA_RB      : (Lo, f.ALU_AND, Lo, Lo, Hi, Hi, Lo, Lo),
+                MOV_RA_K       : (Hi, f.ALU_OPB, Lo, Hi, Hi, Hi, Lo, Lo),
+                MOV_RA_RB      : (Lo, f.ALU_OPB, Lo, Hi, Hi, Hi, Lo, Lo),
+                MOV_RA_Addr_K  : (Hi, f.ALU_OPA, Hi, Hi, Lo, Hi, Lo, Hi),
+                MOV_RA_Addr_RB : (Lo, f.ALU_OPA, Hi, Hi, Lo, Hi, Lo, Hi),
+                MOV_Addr_K_RA  : (Hi, f.ALU_OPA, Lo, Lo, Lo, Hi, Hi, Lo),
+                MOV_Addr_RB_RA : (Lo, f.ALU_OPA, Lo, Lo, Lo, Hi, Hi, Lo),
+                NOP            : (Lo, f.ALU_OPA, Lo, Lo, Lo, Hi, Lo, Lo),
+                NOT_RA         : (Lo, f.ALU_NOT, Lo, Hi, Hi, Hi, Lo, Lo),
+                OR_RA_K        : (Hi, f.ALU_OR,  Lo, Hi, Hi, Hi, Lo, Lo),
+                OR_RA_RB       : (Lo, f.ALU_OR,  Lo, Hi, Hi, Hi, Lo, Lo),
+                SHL_RA         : (Lo, f.ALU_SHL, Lo, Hi, Hi, Hi, Lo, Lo),
+                SHR_RA         : (Lo, f.ALU_SHR, Lo, Hi, Hi, Hi, Lo, Lo),
+                SUB_RA_K       : (Hi, f.ALU_SUB, Lo, Hi, Hi, Hi, Lo, Lo),
+                SUB_RA_RB      : (Lo, f.ALU_SUB, Lo, Hi, Hi, Hi, Lo, Lo) }
+
+    SALTO = (Lo, f.ALU_OPA, Lo, Lo, Lo)    # mux_k, alu_fun, mux_mem, we, ce de los saltos
+
+    tabla = []
+    for opcode in range(32) :
+        for status in range(4) :
+            carry = bool(status & 2)
+            zero = bool(status & 1)
+            #                                         inc      wr  rd  jmp    call ret
+            if opcode in control :
+                palabra = control[opcode] + (Lo, Lo, Lo)
+            elif opcode == CALL_PCK :
+                palabra = SALTO + (Lo,       Lo, Lo, Lo,    Hi, Lo)
+            elif opcode == JC_PCK :
+                palabra = SALTO + (not carry, Lo, Lo, carry, Lo, Lo)
+            elif opcode == JMP_PCK :
+                palabra = SALTO + (Lo,       Lo, Lo, Hi,    Lo, Lo)
+            elif opcode == JZ_PCK :
+                palabra = SALTO + (not zero, Lo, Lo, zero,  Lo, Lo)
+            elif opcode == RET :
+                palabra = SALTO + (Lo,       Lo, Lo, Lo,    Lo, Hi)
+            else :                              # opcode invalido
+                palabra = SALTO + (Lo,       Lo, Lo, Lo,    Lo, Lo)
+            tabla.append(palabra)
+
+    return tuple(tabla)
+
+
 def inst_deco(ir_i,              
               status_reg_i,
 
@@ -31,7 +90,8 @@ def inst_deco(ir_i,
               rd_mem_o,
               jmp_o,
               call_o,
-              ret_o) :
+              ret_o,
+              tabla = False) :
 
     """Decodifica la instruccion que se encuentra en la direccion apuntada por el Program Counter y genera las senales de control para ejecutarla
 
@@ -59,6 +119,11 @@ def inst_deco(ir_i,
                                                   |-  call_o
                                                   |-  ret_o
 
+    :Parametros:
+        - `tabla` : (solo simulacion) decodifica con una tabla precalculada por
+                    opcode y status, en lugar de la cadena de if/elif. La
+                    conversion a HDL debe hacerse con el valor por defecto.
+
     """
 
        
@@ -74,6 +139,27 @@ def inst_deco(ir_i,
         pck_o.next = ir_i[11:]         # Direccion de memoria de prog
 
 
+    if tabla :
+        TABLA = tabla_deco()
+
+        @always(ir_i, status_reg_i)
+        def deco_tabla() :
+            # Indice : opcode (5 bits) y status (carry, zero)
+            (ctrl_mux_reg_k_o.next,
+             alu_fun_o.next,
+             ctrl_mux_alu_mem_o.next,
+             we_reg_file_o.next,
+             ce_status_reg_o.next,
+             inc_pc_o.next,
+             wr_mem_o.next,
+             rd_mem_o.next,
+             jmp_o.next,
+             call_o.next,
+             ret_o.next) = TABLA[((int(ir_i) >> 11) << 2) | int(status_reg_i)]
+
+        return buses, deco_tabla
+
+
     @always_comb
     def deco() :
 
@@ -0,0 +1,292 @@
+"""
+Simulador del set de instrucciones del TZR1
+===========================================
+
+:Autor: Hugo Arboleas <harboleas@citedef.gob.ar>
+------------------------------------------------
+
+Modelo en Python puro del nucleo TZR1 (ISS). Ejecuta directamente la tupla
+``program`` generada por ``asm.py`` sobre un banco de registros plano y una
+memoria de datos, sin pasar por el scheduler de MyHDL.
+
+Cada llamada a ``step`` equivale a un flanco de clock del nucleo ``TZR1``:
+se respeta la misma semantica de la ALU (carry y zero), del stack de
+retorno circular y de los strobes de lectura/escritura de memoria.
+
+"""
+
+from instruction_set import *
+
+N_REGS = 8          # Cantidad de registros del reg file
+MASK_PC = 0x7FF     # El program counter es de 11 bits
+
+def deco_inst(inst) :
+    """Separa los campos de una instruccion de 16 bits
+
+    :Retorna: ``(opcode, ra, rb, k, pck)``
+    """
+    return ((inst >> 11) & 0x1F,     # Codigo de operacion
+            (inst >> 8) & 0x7,       # Ra
+            (inst >> 5) & 0x7,       # Rb
+            inst & 0xFF,             # Literal
+            inst & MASK_PC)          # Direccion de memoria de prog
+
+
+class TZR1_ISS(object) :
+    """ISS del TZR1
+
+    :Parametros:
+        - `program`    : tupla con las instrucciones (salida de ``asm.py``)
+        - `mem`        : memoria de datos/IO. Cualquier objeto indexable de
+                         256 posiciones de 8 bits (por defecto un ``bytearray``)
+        - `stack_size` : profundidad del stack de retorno (igual que en ``pc``)
+        - `perfil`     : (opcional) ``perfil.Perfil`` donde se registra cada
+                         instruccion ejecutada. Con perfil se simula mas lento
+
+    :Estado:
+        - `pc`     : program counter
+        - `regs`   : lista con los 8 registros
+        - `status` : registro de estado, ``concat(carry, zero)``
+        - `stack`  : memoria del stack (circular, como la FILO del ``pc``)
+        - `sp`     : puntero del stack
+        - `ciclos` : cantidad de clocks ejecutados
+
+    """
+
+    def __init__(self, program, mem = None, stack_size = 16, perfil = None) :
+
+        self.program = program
+        self.mem = bytearray(256) if mem is None else mem
+        self.stack_size = stack_size
+
+        self.regs = [0] * N_REGS
+        self.status = 0
+        self.stack = [0] * stack_size
+        self.sp = 0
+        self.pc = 0
+        self.ciclos = 0
+        self.perfil = perfil
+
+        # Se decodifica el programa una sola vez
+        self._prog = [deco_inst(int(inst)) for inst in program]
+
+    ########################################
+
+    def reset(self) :
+        """Equivalente a ``rst_i`` : solo se reinicia el program counter"""
+        self.pc = 0
+
+    @property
+    def carry(self) :
+        return (self.status >> 1) & 1
+
+    @property
+    def zero(self) :
+        return self.status & 1
+
+    ########################################
+
+    def bus(self) :
+        """Valores de las salidas combinacionales del nucleo para la
+        instruccion apuntada por el pc (antes del flanco de clock)
+
+        :Retorna: ``(addr_o, data_o, write_o, read_o)``
+        """
+
+        op, a, b, k, pck = self._prog[self.pc]
+        regs = self.regs
+        ra = regs[a]
+        rb = regs[b]
+
+        write = op in (MOV_Addr_K_RA, MOV_Addr_RB_RA)
+        read = op in (MOV_RA_Addr_K, MOV_RA_Addr_RB)
+
+        # Mux reg/K (addr_o)
+        if op in (ADD_RA_K, AND_RA_K, CMP_RA_K, MOV_RA_K, MOV_RA_Addr_K,
+                  MOV_Addr_K_RA, OR_RA_K, SUB_RA_K) :
+            op_b = k
+        else :
+            op_b = rb
+
+        # Salida de la ALU (data_o)
+        if op in (ADD_RA_K, ADD_RA_RB) :
+            t = ra + op_b
+        elif op in (AND_RA_K, AND_RA_RB, CMP_RA_RB) :   # CMP Ra, Rb usa ALU_AND en inst_deco
+            t = ra & op_b
+        elif op in (CMP_RA_K, SUB_RA_K, SUB_RA_RB) :
+            t = ra - op_b
+        elif op in (MOV_RA_K, MOV_RA_RB) :
+            t = op_b
+        elif op in (OR_RA_K, OR_RA_RB) :
+            t = ra | op_b
+        elif op == NOT_RA :
+            t = ~ra
+        elif op == SHL_RA :
+            t = ra << 1
+        elif op == SHR_RA :
+            t = ra >> 1
+        else :
+            t = ra
+
+        return (op_b, t & 0xFF, write, read)
+
+    ########################################
+
+    def step(self) :
+        """Ejecuta una instruccion (un clock)"""
+        self.run(1)
+
+    def run(self, ciclos) :
+        """Ejecuta `ciclos` clocks del nucleo
+
+        Las instrucciones que modifican la ALU calculan el resultado con un
+        bit extra: el bit 8 es el carry y zero indica resultado nulo, igual
+        que ``alu.carry_zero``.
+        """
+
+        if self.perfil is not None :
+            for _ in xrange(ciclos) :
+                addr, data, write, read = self.bus()
+                self.perfil.registrar(self.pc, self.status, addr, write, read)
+                self._ejecutar(1)
+        else :
+            self._ejecutar(ciclos)
+
+    def _ejecutar(self, ciclos) :
+        """Lazo principal del ISS"""
+
+        # Variables locales para acelerar el lazo principal
+        prog = self._prog
+        regs = self.regs
+        mem = self.mem
+        stack = self.stack
+        stack_size = self.stack_size
+        pc = self.pc
+        st = self.status
+        sp = self.sp
+
+        for _ in xrange(ciclos) :
+
+            op, a, b, k, pck = prog[pc]
+
+            ##############################
+            # Movimientos
+            if op == MOV_RA_K :
+                regs[a] = k
+                st = 0 if k else 1
+                pc += 1
+            elif op == MOV_RA_RB :
+                t = regs[b]
+                regs[a] = t
+                st = 0 if t else 1
+                pc += 1
+
+            ##############################
+            # Aritmetico - logicas
+            elif op == ADD_RA_K :
+                t = regs[a] + k
+                regs[a] = t & 0xFF
+                st = ((t >> 7) & 2) | (t == 0)
+                pc += 1
+            elif op == ADD_RA_RB :
+                t = regs[a] + regs[b]
+                regs[a] = t & 0xFF
+                st = ((t >> 7) & 2) | (t == 0)
+                pc += 1
+            elif op == SUB_RA_K :
+                t = regs[a] - k
+                regs[a] = t & 0xFF
+                st = ((t >> 7) & 2) | (t == 0)
+                pc += 1
+            elif op == SUB_RA_RB :
+                t = regs[a] - regs[b]
+                regs[a] = t & 0xFF
+                st = ((t >> 7) & 2) | (t == 0)
+                pc += 1
+            elif op == CMP_RA_K :
+                t = regs[a] - k
+                st = ((t >> 7) & 2) | (t == 0)
+                pc += 1
+            elif op == CMP_RA_RB :         # inst_deco selecciona ALU_AND para esta instruccion
+                st = 0 if regs[a] & regs[b] else 1
+                pc += 1
+            elif op == AND_RA_K :
+                t = regs[a] & k
+                regs[a] = t
+                st = 0 if t else 1
+                pc += 1
+            elif op == AND_RA_RB :
+                t = regs[a] & regs[b]
+                regs[a] = t
+                st = 0 if t else 1
+                pc += 1
+            elif op == OR_RA_K :
+                t = regs[a] | k
+                regs[a] = t
+                st = 0 if t else 1
+                pc += 1
+            elif op == OR_RA_RB :
+                t = regs[a] | regs[b]
+                regs[a] = t
+                st = 0 if t else 1
+                pc += 1
+            elif op == NOT_RA :
+                t = ~regs[a] & 0xFF
+                regs[a] = t
+                st = 0 if t else 1
+                pc += 1
+            elif op == SHL_RA :
+                t = regs[a] << 1
+                regs[a] = t & 0xFF
+                st = ((t >> 7) & 2) | (t == 0)
+                pc += 1
+            elif op == SHR_RA :
+                t = regs[a] >> 1
+                regs[a] = t
+                st = 0 if t else 1
+                pc += 1
+
+            ##############################
+            # Saltos
+            elif op == JZ_PCK :
+                pc = pck if st & 1 else pc + 1
+            elif op == JC_PCK :
+                pc = pck if st & 2 else pc + 1
+            elif op == JMP_PCK :
+                pc = pck
+            elif op == CALL_PCK :
+                stack[sp] = (pc + 1) & MASK_PC     # Direccion de retorno
+                sp = (sp + 1) % stack_size
+                pc = pck
+            elif op == RET :
+                sp = (sp - 1) % stack_size
+                pc = stack[sp]
+
+            ##############################
+            # Memoria de datos
+            elif op == MOV_RA_Addr_K :
+                regs[a] = mem[k]
+                pc += 1
+            elif op == MOV_RA_Addr_RB :
+                regs[a] = mem[regs[b]]
+                pc += 1
+            elif op == MOV_Addr_K_RA :
+                mem[k] = regs[a]
+                pc += 1
+            elif op == MOV_Addr_RB_RA :
+                mem[regs[b]] = regs[a]
+                pc += 1
+
+            elif op == NOP :
+                pc += 1
+
+            # Opcode invalido : el decodificador deja todas las salidas en bajo
+            # y el pc no avanza
+
+            pc &= MASK_PC
+
+        self.pc = pc
+        self.status = st
+        self.sp = sp
+        self.ciclos += ciclos
+
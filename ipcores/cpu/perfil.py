@@ -0,0 +1,258 @@
+"""
+Profiler del TZR1
+=================
+
+:Autor: Hugo Arboleas <harboleas@citedef.gob.ar>
+------------------------------------------------
+
+Estadisticas de ejecucion de un programa del TZR1, para encontrar los lazos
+del firmware que vale la pena optimizar:
+
+    * ejecuciones por direccion de programa y mezcla de instrucciones
+    * saltos condicionales tomados y no tomados
+    * maxima profundidad de llamadas, comparada con ``stack_size``
+    * lecturas y escrituras por direccion de la memoria de datos
+
+Se usa con el ISS::
+
+    perfil = Perfil(program)
+    iss = TZR1_ISS(program, perfil = perfil)
+    iss.run(100000)
+    print perfil.reporte(open("fibo.asm").read())
+
+o con el RTL, agregando ``sonda_perfil`` a la simulacion junto con el nucleo
+(``TZR1`` o ``TZR1_pipe``) instanciado con ``sondas``.
+
+"""
+
+import instruction_set
+from myhdl import *
+from instruction_set import *
+from iss import deco_inst
+from asm import tokenizar, analizar, resolver_etiquetas, peephole
+
+# Nombre de cada opcode, para la mezcla de instrucciones
+NOMBRES = dict((valor, nombre) for nombre, valor in vars(instruction_set).items()
+               if isinstance(valor, int) and not nombre.startswith("_"))
+
+
+class Perfil(object) :
+    """Acumula las estadisticas de ejecucion de un programa
+
+    :Parametros:
+        - `program`    : tupla con el programa
+        - `stack_size` : profundidad del stack de retorno del nucleo
+
+    :Estadisticas:
+        - `ejecuciones` : lista con la cantidad de ejecuciones de cada direccion
+        - `tomados`     : dict direccion -> saltos condicionales tomados
+        - `no_tomados`  : dict direccion -> saltos condicionales no tomados
+        - `prof`        : profundidad de llamadas actual
+        - `prof_max`    : maxima profundidad de llamadas alcanzada
+        - `lecturas`    : lista con las lecturas de cada direccion de la memoria de datos
+        - `escrituras`  : lista con las escrituras de cada direccion de la memoria de datos
+
+    """
+
+    def __init__(self, program, stack_size = 16) :
+
+        self.stack_size = stack_size
+        self._ops = [deco_inst(int(inst))[0] for inst in program]
+        self.limpiar()
+
+    def limpiar(self) :
+        """Pone a cero todas las estadisticas"""
+
+        self.ejecuciones = [0] * len(self._ops)
+        self.tomados = {}
+        self.no_tomados = {}
+        self.prof = 0
+        self.prof_max = 0
+        self.lecturas = [0] * 256
+        self.escrituras = [0] * 256
+
+    ########################################
+
+    def registrar(self, pc, status, addr, write, read) :
+        """Registra la ejecucion de la instruccion en `pc`
+
+        :Parametros:
+            - `pc`     : direccion de la instruccion
+            - `status` : registro de estado antes de ejecutarla
+            - `addr`, `write`, `read` : bus de la memoria de datos durante la instruccion
+        """
+
+        self.ejecuciones[pc] += 1
+        op = self._ops[pc]
+
+        if op == JC_PCK or op == JZ_PCK :
+            if status & (2 if op == JC_PCK else 1) :
+                self.tomados[pc] = self.tomados.get(pc, 0) + 1
+            else :
+                self.no_tomados[pc] = self.no_tomados.get(pc, 0) + 1
+        elif op == CALL_PCK :
+            self.prof += 1
+            if self.prof > self.prof_max :
+                self.prof_max = self.prof
+        elif op == RET :
+            self.prof -= 1
+        elif write :
+            self.escrituras[addr] += 1
+        elif read :
+            self.lecturas[addr] += 1
+
+    ########################################
+
+    @property
+    def ciclos(self) :
+        """Cantidad total de instrucciones ejecutadas"""
+        return sum(self.ejecuciones)
+
+    def mezcla(self) :
+        """Mezcla de instrucciones
+
+        :Retorna: dict nombre del opcode -> cantidad de ejecuciones
+        """
+
+        mezcla = {}
+        for op, n in zip(self._ops, self.ejecuciones) :
+            if n :
+                nombre = NOMBRES.get(op, "INVALIDO")
+                mezcla[nombre] = mezcla.get(nombre, 0) + n
+        return mezcla
+
+    def desborde_stack(self) :
+        """True si la profundidad de llamadas supero al stack (se pisaron direcciones de retorno)"""
+        return self.prof_max > self.stack_size
+
+    ########################################
+
+    def reporte(self, fuente = None, n = 10, optimizar = False) :
+        """Reporte de puntos calientes
+
+        :Parametros:
+            - `fuente` : texto fuente del programa. Si se da, cada direccion se
+                         relaciona con su linea, su instruccion y la etiqueta
+                         que la precede (``etiqueta+desplazamiento``)
+            - `n`      : cantidad de direcciones a listar en cada tabla
+            - `optimizar` : el programa se ensamblo con ``optimizar = True``
+
+        :Retorna: el reporte como texto
+        """
+
+        lineas_fuente = []
+        lineas = [None] * len(self._ops)
+        etiquetas = {}
+        if fuente is not None :
+            lineas_fuente = fuente.splitlines()
+            program_asm, etiquetas, lineas = analizar(tokenizar(fuente))
+            if optimizar :
+                program_asm = resolver_etiquetas(program_asm, etiquetas, lineas)
+                program_asm, etiquetas, lineas = peephole(program_asm, etiquetas, lineas)
+
+        por_dir = sorted((d, e) for e, d in etiquetas.items())
+
+        def ubicacion(pc) :
+            base = None
+            for d, e in por_dir :
+                if d > pc :
+                    break
+                base = (d, e)
+            if base is None :
+                return ""
+            return base[1] if base[0] == pc else "%s+%d" % (base[1], pc - base[0])
+
+        def texto(pc) :
+            if lineas[pc] is None :
+                return (0, "")
+            linea = lineas[pc]
+            return (linea, lineas_fuente[linea - 1].split("#")[0].strip())
+
+        total = self.ciclos or 1
+        rep = []
+
+        rep.append("Instrucciones ejecutadas : %d" % self.ciclos)
+        rep.append("")
+        rep.append("Direcciones mas ejecutadas")
+        rep.append("  %5s %10s %7s %6s  %-22s %s" % ("Dir", "Ejec", "%", "Linea", "Etiqueta", "Fuente"))
+        calientes = sorted(range(len(self._ops)), key = lambda pc : -self.ejecuciones[pc])
+        for pc in calientes[:n] :
+            e = self.ejecuciones[pc]
+            if e == 0 :
+                break
+            linea, inst = texto(pc)
+            rep.append("  %5d %10d %6.2f%% %6s  %-22s %s" %
+                       (pc, e, 100.0 * e / total, linea or "", ubicacion(pc), inst))
+
+        if por_dir :
+            rep.append("")
+            rep.append("Ejecuciones por etiqueta")
+            limites = [d for d, e in por_dir] + [len(self._ops)]
+            bloques = []
+            for (d, e), fin in zip(por_dir, limites[1:]) :
+                bloques.append((sum(self.ejecuciones[d : fin]), e, d))
+            for suma, e, d in sorted(bloques, reverse = True)[:n] :
+                if suma == 0 :
+                    break
+                rep.append("  %-22s %5d %10d %6.2f%%" % (e, d, suma, 100.0 * suma / total))
+
+        rep.append("")
+        rep.append("Mezcla de instrucciones")
+        for nombre, cant in sorted(self.mezcla().items(), key = lambda x : -x[1]) :
+            rep.append("  %-22s %10d %6.2f%%" % (nombre, cant, 100.0 * cant / total))
+
+        saltos = sorted(set(self.tomados) | set(self.no_tomados))
+        if saltos :
+            rep.append("")
+            rep.append("Saltos condicionales")
+            rep.append("  %5s %10s %10s  %-22s %s" % ("Dir", "Tomados", "No tomados", "Etiqueta", "Fuente"))
+            for pc in saltos :
+                rep.append("  %5d %10d %10d  %-22s %s" % (pc, self.tomados.get(pc, 0),
+                           self.no_tomados.get(pc, 0), ubicacion(pc), texto(pc)[1]))
+
+        rep.append("")
+        rep.append("Profundidad maxima de llamadas : %d (stack_size = %d)%s" %
+                   (self.prof_max, self.stack_size,
+                    " DESBORDE" if self.desborde_stack() else ""))
+
+        accesos = [d for d in range(256) if self.lecturas[d] or self.escrituras[d]]
+        if accesos :
+            rep.append("")
+            rep.append("Memoria de datos")
+            rep.append("  %5s %10s %10s" % ("Dir", "Lecturas", "Escrituras"))
+            accesos.sort(key = lambda d : -(self.lecturas[d] + self.escrituras[d]))
+            for d in accesos[:n] :
+                rep.append("  0x%02X %11d %10d" % (d, self.lecturas[d], self.escrituras[d]))
+
+        return "\n".join(rep) + "\n"
+
+
+def sonda_perfil(clk_i,
+                 sondas,
+                 addr_o,
+                 write_o,
+                 read_o,
+                 perfil) :
+    """Registra en `perfil` la ejecucion del RTL en cada flanco de clock
+
+    :Parametros:
+        - `clk_i`   : clock del nucleo
+        - `sondas`  : dict de sondas del nucleo (``TZR1`` o ``TZR1_pipe``)
+        - `addr_o`, `write_o`, `read_o` : bus de la memoria de datos del nucleo
+        - `perfil`  : instancia de ``Perfil``
+
+    En ``TZR1_pipe`` solo se registran los ciclos en los que la etapa
+    execute tiene una instruccion valida. Es solo para simulacion.
+    """
+
+    pc = sondas["pc"]
+    status = sondas["status"]
+    valido = sondas.get("valid", Signal(True))
+
+    @always(clk_i.posedge)
+    def registro() :
+        if valido :
+            perfil.registrar(int(pc), int(status), int(addr_o), bool(write_o), bool(read_o))
+
+    return registro
+
@@ -15,7 +15,8 @@ def RegFile(clk_i,
             a_i,
             a_o,
             addr_b_i,
-            b_o) :
+            b_o,
+            sondas = None) :
 
     """Register File de m registros de n bits 
     ::                          
@@ -41,6 +42,7 @@ def RegFile(clk_i,
         - `a_o`      :  data out canal A (n bits)
         - `addr_b_i` :  direccion de lectura canal B (log_2 m bits)
         - `b_o`      :  data out canal B (n bits)
+        - `sondas`   :  (opcional) dict donde se publica la memoria del reg file para simulacion
 
     """
     
@@ -51,6 +53,9 @@ def RegFile(clk_i,
     
     reg_file_mem = [Signal(intbv(0)[n:]) for i in range(m)]    # RAM ( Dual Port ) de m registros de n bits
 
+    if sondas is not None :
+        sondas["regs"] = reg_file_mem
+
 
     ################################  
 
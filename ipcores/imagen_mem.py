@@ -0,0 +1,163 @@
+"""
+Imagenes de memoria
+===================
+
+:Autor: Hugo Arboleas <harboleas@citedef.gob.ar>
+------------------------------------------------
+
+Lectura y escritura del contenido de memorias (ROM de programa, tablas, etc)
+en archivos:
+
+    * binario crudo, palabras little-endian
+    * Intel HEX (direccionado por bytes, little-endian)
+    * texto para ``$readmemh`` (una palabra en hexa por linea)
+
+``cargar`` elige el formato segun la extension (``.mem`` para ``$readmemh``,
+cualquier otra para binario crudo) y ``mapear_bin`` mapea un binario crudo
+en memoria para que una simulacion escriba directamente sobre el archivo.
+
+"""
+
+import sys
+import mmap
+from array import array
+
+TIPOS = {8 : "B", 16 : "H", 32 : "I"}   # Tipo de array segun el ancho de palabra
+
+def tipo_array(ancho) :
+    """Codigo de tipo de ``array`` para palabras de `ancho` bits"""
+    for bits in sorted(TIPOS) :
+        if ancho <= bits :
+            return TIPOS[bits]
+    raise ValueError("Ancho de palabra no soportado : %d" % ancho)
+
+########################################################################
+
+def escribir_bin(datos, nombre, ancho = 16) :
+    """Escribe `datos` como binario crudo little-endian"""
+
+    a = array(tipo_array(ancho), datos)
+    if sys.byteorder == "big" :
+        a.byteswap()
+    f = open(nombre, "wb")
+    a.tofile(f)
+    f.close()
+
+
+def cargar_bin(nombre, ancho = 16) :
+    """Carga un binario crudo little-endian con mmap
+
+    :Retorna: ``array`` de palabras de `ancho` bits (por defecto ``array('H')``),
+              sirve directamente como ``program`` del TZR1 o del ISS
+    """
+
+    a = array(tipo_array(ancho))
+    f = open(nombre, "rb")
+    try :
+        mm = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+    except ValueError :         # archivo vacio
+        f.close()
+        return a
+    a.fromstring(mm)
+    mm.close()
+    f.close()
+    if sys.byteorder == "big" :
+        a.byteswap()
+    return a
+
+
+def mapear_bin(nombre, palabras, ancho = 16) :
+    """Mapea en memoria (lectura/escritura) un binario crudo de `palabras`
+    palabras, creandolo o agrandandolo con ceros si hace falta. Lo escrito en
+    el array se ve en el archivo sin volcarlo explicitamente. Necesita NumPy.
+
+    :Retorna: ``numpy.memmap`` de palabras little-endian
+    """
+
+    import numpy
+
+    dtype = numpy.dtype("<u%d" % array(tipo_array(ancho)).itemsize)
+    f = open(nombre, "ab")
+    if f.tell() < palabras * dtype.itemsize :
+        f.truncate(palabras * dtype.itemsize)
+    f.close()
+
+    return numpy.memmap(nombre, dtype = dtype, mode = "r+", shape = (palabras,))
+
+########################################################################
+
+def registro_ihex(direccion, tipo, datos) :
+    """Arma un registro Intel HEX ``:LLAAAATT<datos>CC``"""
+
+    reg = [len(datos), (direccion >> 8) & 0xFF, direccion & 0xFF, tipo] + list(datos)
+    checksum = (-sum(reg)) & 0xFF
+    return ":" + "".join("%02X" % b for b in reg) + "%02X\n" % checksum
+
+
+def escribir_ihex(datos, nombre, ancho = 16, bytes_x_registro = 16) :
+    """Escribe `datos` en formato Intel HEX (palabras little-endian)"""
+
+    n_bytes = array(tipo_array(ancho)).itemsize
+    mem = bytearray()
+    for d in datos :
+        for i in range(n_bytes) :
+            mem.append((int(d) >> (8 * i)) & 0xFF)
+
+    f = open(nombre, "w")
+    segmento = 0
+    for direccion in range(0, len(mem), bytes_x_registro) :
+        if direccion >> 16 != segmento :          # Extended linear address
+            segmento = direccion >> 16
+            f.write(registro_ihex(0, 0x04, [(segmento >> 8) & 0xFF, segmento & 0xFF]))
+        f.write(registro_ihex(direccion & 0xFFFF, 0x00, mem[direccion : direccion + bytes_x_registro]))
+    f.write(registro_ihex(0, 0x01, []))     # End of file
+    f.close()
+
+########################################################################
+
+def escribir_readmemh(datos, nombre, ancho = 16) :
+    """Escribe `datos` como texto para ``$readmemh`` (una palabra por linea)"""
+
+    fmt = "%%0%dx\n" % ((ancho + 3) // 4)
+    f = open(nombre, "w")
+    f.write("".join(fmt % int(d) for d in datos))
+    f.close()
+
+
+def cargar_readmemh(nombre, ancho = 16) :
+    """Carga un archivo de texto de ``$readmemh``
+
+    Acepta palabras en hexa separadas por blancos, comentarios ``//`` y
+    directivas de direccion ``@addr`` (las posiciones salteadas quedan en 0).
+
+    :Retorna: ``array`` de palabras de `ancho` bits
+    """
+
+    a = array(tipo_array(ancho))
+    direccion = 0
+    f = open(nombre)
+    for linea in f :
+        for token in linea.split("//")[0].split() :
+            if token[0] == "@" :
+                direccion = int(token[1:], 16)
+                continue
+            if direccion > len(a) :
+                a.extend([0] * (direccion - len(a)))
+            if direccion == len(a) :
+                a.append(int(token.replace("_", ""), 16))
+            else :
+                a[direccion] = int(token.replace("_", ""), 16)
+            direccion += 1
+    f.close()
+    return a
+
+########################################################################
+
+def cargar(nombre, ancho = 16) :
+    """Carga una imagen de memoria : ``$readmemh`` si la extension es
+    ``.mem``, binario crudo en cualquier otro caso"""
+
+    if nombre.endswith(".mem") :
+        return cargar_readmemh(nombre, ancho)
+    return cargar_bin(nombre, ancho)
+
@@ -383,6 +383,246 @@ def MULT_Sec(clk_i,
 
 #############################################################
 
+def MULT_Booth(clk_i, 
+               rst_i, 
+               ini_i, 
+               a_i, 
+               b_i, 
+               fin_o, 
+               resul_o) :  
+    """Multiplicador secuencial Booth radix 4, con reset y comienzo 
+    sincronico. Cada factor puede ser con o sin signo (segun su intbv, 
+    min < 0 es con signo)::
+
+                        a_i                            b_i
+                        | |                            | |
+                    ----V----                      -----V-----
+                   |  reg_A  |<< 2                | reg_B,b-1 |>> 2
+                    ----V----                      -----V-----
+                        | |    ___________            | |  3 bits
+                        | |__|            |       ------V------
+                        |____| 0,+-A,+-2A |<-----| recodificador|
+                             |___________|        -------------
+                                 | |                                 _______
+                              ---V---                       ini_i-->|       |-->
+                             |  acc  |                              |  U/C  |
+                              ---V---                            -->|_______|-->fin_o
+                                | |
+                                 V
+                              resul_o
+
+    En cada ciclo se toman 3 bits de b (b[2i+1], b[2i], b[2i-1]) y se suma
+    al acumulador 0, +-A o +-2A, con A = a * 4**i. Con b sin signo y m par
+    el bit mas significativo de b se compensa cargando el acumulador con
+    a * 2**m al comienzo, asi la multiplicacion siempre tarda ceil(m/2) ciclos.
+
+    Diagrama de estados de la unidad de control
+
+    .. graphviz ::
+        digraph { node [color=lightblue2, style=filled];
+                  INI -> INI; 
+                  INI -> ACUM_DESPL [ label = "ini" ];
+                  ACUM_DESPL -> FIN [ label = "ultimo digito" ];
+                  ACUM_DESPL -> ACUM_DESPL ;
+                  FIN -> INI; }
+
+    :Parametros:
+        - `clk_i`   : clock
+        - `rst_i`   : reset sincronico
+        - `ini_i`   : comienzo
+        - `a_i`     : 1er factor (n bits, con o sin signo)
+        - `b_i`     : 2do factor (m bits, con o sin signo)
+        - `fin_o`   : indica la finalizacion de la multiplicacion, ceil(m/2) 
+                      clocks despues del flanco que toma ini_i
+        - `resul_o` : resultado de la multiplicacion (n+m bits, con signo si
+                      alguno de los factores lo es)
+  
+    """
+   
+    n = len(a_i)             
+    m = len(b_i)
+    D = (m + 1) // 2            # digitos de Booth (ciclos)
+    W = n + m + 3               # bits del acumulador y del multiplicando desplazado
+
+    b_con_signo = b_i.min < 0
+    corrige_b = (not b_con_signo) and (m % 2 == 0)   # el msb de b no es signo
+
+    A = Signal(intbv(0, -2**(W-1), 2**(W-1)))       # a * 4**i
+    acc = Signal(intbv(0, -2**(W-1), 2**(W-1)))     # acumulador
+    b = Signal(modbv(0)[2*D+1:])                    # b extendido a 2D bits (complemento a 2) y b[-1]
+    i = Signal(intbv(0, 0, D))                      # digito actual
+
+    suma = intbv(0, -2**(W-1), 2**(W-1))
+
+    e = enum("INI", "ACUM_DESPL", "FIN")
+    estado = Signal(e.INI) 
+
+    @always(clk_i.posedge)       
+    def FSM() :       
+        "Unidad de control y datapath del multiplicador"
+        if rst_i :              # reset sincronico de la maquina
+            estado.next = e.INI   
+        else :
+            ####################
+            if estado == e.INI :
+                if ini_i :
+                    A.next = a_i
+                    i.next = 0
+                    b.next = b_i << 1       # b[-1] = 0
+                    if corrige_b and b_i[m-1] :
+                        acc.next = a_i << m
+                    else :
+                        acc.next = 0
+                    estado.next = e.ACUM_DESPL
+            ####################
+            elif estado == e.ACUM_DESPL :
+                # Recodificacion de Booth de b[2i+1], b[2i], b[2i-1]
+                suma[:] = acc
+                if b[3:0] == 1 or b[3:0] == 2 :
+                    suma[:] = acc + A
+                elif b[3:0] == 3 :
+                    suma[:] = acc + (A << 1)
+                elif b[3:0] == 4 :
+                    suma[:] = acc - (A << 1)
+                elif b[3:0] == 5 or b[3:0] == 6 :
+                    suma[:] = acc - A
+                acc.next = suma
+                A.next = A << 2
+                b.next = b >> 2
+
+                if i == D - 1 :
+                    resul_o.next = suma
+                    estado.next = e.FIN
+                else :
+                    i.next = i + 1
+            ####################
+            elif estado == e.FIN :
+                estado.next = e.INI
+
+            else :
+                estado.next = e.INI
+
+    @always_comb
+    def FSM_salidas() :
+        fin_o.next = estado == e.FIN
+
+    return instances()
+
+#############################################################
+
+def MULT_Pipe(clk_i, 
+              rst_i, 
+              a_i, 
+              b_i, 
+              valid_i, 
+              tag_i, 
+              resul_o, 
+              valid_o, 
+              tag_o, 
+              etapas = 2) :  
+    """Multiplicador con pipeline, acepta un par de factores nuevo en 
+    cada clock. Los factores pueden ser con o sin signo (segun su intbv)::
+
+                  a_i    b_i
+                  | |    | |
+                ---V--  --V---
+               | reg  || reg  |     (etapas >= 2)
+                ---V--  --V---
+                  | |____| |
+                 ___V______V___
+                |       *      |
+                 ------V-------
+                      | |
+                 -----V-----
+                |  reg  x   |    etapas - 1 registros (los absorbe el
+                 -----V-----     bloque DSP o se redistribuyen con retiming)
+                      | |
+                       V
+                    resul_o
+
+    El valid y el tag de cada par recorren las mismas etapas que el 
+    producto, asi se puede seguir la muestra en un datapath con latencia.
+
+    :Parametros:
+        - `clk_i`   : clock
+        - `rst_i`   : reset sincronico (solo de los valid)
+        - `a_i`     : 1er factor (n bits)
+        - `b_i`     : 2do factor (m bits)
+        - `valid_i` : par de factores valido
+        - `tag_i`   : dato del usuario que acompana al par
+        - `resul_o` : resultado de la multiplicacion (n+m bits), `etapas` 
+                      clocks despues de tomar los factores
+        - `valid_o` : resultado valido
+        - `tag_o`   : tag_i del par
+        - `etapas`  : cantidad de registros del pipeline (1 o mas). Con 1 
+                      solo se registra la salida del multiplicador
+  
+    """
+
+    if etapas < 1 :
+        raise ValueError("etapas debe ser 1 o mas")
+
+    extremos = [a_i.min * b_i.min, a_i.min * (b_i.max - 1), 
+                (a_i.max - 1) * b_i.min, (a_i.max - 1) * (b_i.max - 1)]
+    P_MIN = min(extremos)
+    P_MAX = max(extremos) + 1
+
+    t = len(tag_i)
+
+    v = [Signal(Lo) for j in range(etapas)]                         # valid en cada etapa
+    tg = [Signal(intbv(0)[t:]) for j in range(etapas)]              # tag en cada etapa
+
+    if etapas == 1 :
+
+        p = [Signal(intbv(0, P_MIN, P_MAX))]        # producto registrado
+
+        @always(clk_i.posedge)
+        def mult() :
+            p[0].next = a_i * b_i
+            tg[0].next = tag_i
+            if rst_i :
+                v[0].next = Lo
+            else :
+                v[0].next = valid_i
+
+    else :
+
+        a = Signal(intbv(0, a_i.min, a_i.max))
+        b = Signal(intbv(0, b_i.min, b_i.max))
+        p = [Signal(intbv(0, P_MIN, P_MAX)) for j in range(etapas - 1)]     # producto en cada etapa
+
+        @always(clk_i.posedge)
+        def mult() :
+            a.next = a_i
+            b.next = b_i
+            p[0].next = a * b
+            for j in range(1, etapas - 1) :
+                p[j].next = p[j-1]
+
+            tg[0].next = tag_i
+            for j in range(1, etapas) :
+                tg[j].next = tg[j-1]
+
+            if rst_i :
+                for j in range(etapas) :
+                    v[j].next = Lo
+            else :
+                v[0].next = valid_i
+                for j in range(1, etapas) :
+                    v[j].next = v[j-1]
+
+    ULT = len(p) - 1
+
+    @always_comb
+    def salidas() :
+        resul_o.next = p[ULT]
+        valid_o.next = v[etapas-1]
+        tag_o.next = tg[etapas-1]
+
+    return instances()
+
+#############################################################
+
 def nucleo_division(clk_i, 
                     rst_i, 
                     ini_i, 
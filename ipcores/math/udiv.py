@@ -35,7 +35,8 @@ def udiv(clk_i,
          q_o,
          r_o,
          done_o,
-         div0_o) :
+         div0_o,
+         radix = 2) :
 
     """ 
     Unsigned Divider
@@ -58,27 +59,44 @@ def udiv(clk_i,
     *   done_o - Fin de la operacion (1 clk)
     *   div0_o - Error de division por 0 
     
+    Parametros
 
-    Nota : La operacion se efectua en n + 1 ciclos de clock.
-           Donde n es la cantidad de bits del cociente.
+    *   radix  - 2, 4 o 16 : bits del cociente (1, 2 o 4) que se calculan por
+                 ciclo de clock. Con radix > 2 se precalculan al comenzar los
+                 multiplos del divisor (j * b, 0 < j < radix) y en cada ciclo se
+                 elige el mayor que no supera al resto parcial, con radix - 1
+                 comparadores en paralelo.
+
+    Nota : La operacion se efectua en ceil(n / log2(radix)) + 1 ciclos de clock.
+           Donde n es la cantidad de bits del cociente (n + 1 con radix 2).
     """
 
+    if radix not in (2, 4, 16) :
+        raise ValueError("radix debe ser 2, 4 o 16")
+
     # Estados de la FSM
     t_state = enum("ESPERA_START", "DIVIDE") 
     state = Signal(t_state.ESPERA_START)
 
     n_bits = len(a_i)    
     m_bits = len(b_i)
+
+    k = {2 : 1, 4 : 2, 16 : 4}[radix]   # bits del cociente por iteracion
+    ITER = (n_bits + k - 1) // k        # iteraciones
+    N = ITER * k                        # bits del dividendo completado con ceros
    
-    q_par = Signal(intbv(0)[n_bits:])    # cociente parcial 
-    r_par = Signal(intbv(0)[n_bits+1:])  # resto parcial (un bit mas para la ultima iteracion) 
-    a_par = Signal(intbv(0)[n_bits:])    # dividendo parcial 
+    q_par = Signal(modbv(0)[N:])        # cociente parcial 
+    r_par = Signal(intbv(0)[m_bits:])   # resto parcial (menor que el divisor)
+    a_par = Signal(modbv(0)[N:])        # dividendo parcial 
 
-    b = Signal(intbv(0)[m_bits:])  # divisor registrado
+    # Multiplos del divisor registrados : mult[j - 1] = j * b (con radix 2 solo b, de m bits)
+    MAX_MULT = (radix - 1) * (2**m_bits - 1)
+    mult = [Signal(intbv(0, 0, MAX_MULT + 1)) for j in range(1, radix)]
 
-    i = Signal(intbv(0, 0, n_bits + 1)) # contador de las iteraciones del algoritmo de division 
+    i = Signal(intbv(0, 0, ITER + 1)) # contador de las iteraciones del algoritmo de division 
 
-    r_aux = intbv(0)[n_bits:] # resto auxiliar   
+    r_aux = intbv(0)[m_bits+k:]   # resto auxiliar   
+    digito = intbv(0, 0, radix)   # digito del cociente de la iteracion
 
     @always(clk_i.posedge, rst_i.posedge)
     def fsm() :
@@ -104,39 +122,180 @@ def udiv(clk_i,
                         done_o.next = True
                     else :                  
                         i.next = 0
-                        b.next = b_i
-                        a_par.next = concat(a_i[n_bits-1:], False)  
-                        r_aux[:] = 0
-                        r_par.next = concat(r_aux, a_i[n_bits-1])
+                        for j in range(1, radix) :
+                            mult[j-1].next = j * b_i
+                        a_par.next = a_i
+                        r_par.next = 0
                         q_par.next = 0
                         state.next = t_state.DIVIDE  
 
             ##############################    
             elif state == t_state.DIVIDE :
 
-                if i < n_bits : 
-                    # Calcula el i-esimo bit del cociente (contando desde el mas significativo)
-                    if r_par[n_bits:] >= b :
-                        q_par.next = concat(q_par[n_bits-1:], True)   
-                        r_aux[:] = r_par[n_bits:] - b
-                    else :
-                        q_par.next = concat(q_par[n_bits-1:], False) 
-                        r_aux[:] = r_par[n_bits:]
-
-                    # Calcula el resto parcial para la siguiente iteracion
-                    r_par.next = concat(r_aux, a_par[n_bits-1]) 
-                    a_par.next = concat(a_par[n_bits-1:], False)  
+                if i < ITER : 
+                    # Resto parcial con los k bits siguientes del dividendo
+                    r_aux[:] = concat(r_par, a_par[N:N-k])
+
+                    # Calcula el i-esimo digito del cociente (contando desde el mas significativo)
+                    digito[:] = 0
+                    for j in range(1, radix) :
+                        if r_aux >= mult[j-1] :
+                            digito[:] = j
+
+                    if digito != 0 :
+                        r_aux[:] = r_aux - mult[int(digito) - 1]
+                    r_par.next = r_aux[m_bits:]
+                    q_par.next = (q_par << k) | digito
+                    a_par.next = a_par << k
                     
                     i.next = i + 1  # siguiente iteracion
                 
                 else :
                     done_o.next = True
-                    q_o.next = q_par
-                    # El resto quedo desplazado  
-                    r_o.next = r_par[n_bits+1 : 1]
+                    q_o.next = q_par[n_bits:]
+                    r_o.next = r_par
                     state.next = t_state.ESPERA_START
             
 
     return instances()
 
+def etapa_udiv(clk_i,
+               rst_i,
+               r_i,
+               a_i,
+               q_i,
+               b_i,
+               valid_i,
+               tag_i,
+               div0_i,
+               r_o,
+               a_o,
+               q_o,
+               b_o,
+               valid_o,
+               tag_o,
+               div0_o) :
+
+    """
+    Etapa de udiv_pipe : un paso de la division con restauracion, registrado.
+    Toma el bit mas significativo del dividendo parcial a_i, calcula un bit
+    del cociente y pasa a la etapa siguiente el resto, el dividendo desplazado
+    y el divisor, el valid, el tag y el div0 de la muestra.
+    """
+
+    n_bits = len(a_i)
+    m_bits = len(b_i)
+
+    r_aux = intbv(0)[m_bits+1:]   # resto auxiliar   
+
+    @always(clk_i.posedge, rst_i.posedge)
+    def etapa() :
+
+        if rst_i :
+            valid_o.next = False
+
+        else : # rising clk
+            valid_o.next = valid_i
+
+            r_aux[:] = concat(r_i, a_i[n_bits-1])
+            if r_aux >= b_i :
+                r_aux[:] = r_aux - b_i
+                q_o.next = (q_i << 1) | 1
+            else :
+                q_o.next = q_i << 1
+            r_o.next = r_aux[m_bits:]   # con div0 el resto se trunca
+
+            a_o.next = a_i << 1
+            b_o.next = b_i
+            tag_o.next = tag_i
+            div0_o.next = div0_i
+
+    return instances()
+
+
+def udiv_pipe(clk_i,
+              rst_i,
+              a_i,
+              b_i,
+              valid_i,
+              tag_i,
+              q_o,
+              r_o,
+              valid_o,
+              tag_o,
+              div0_o) :
+
+    """ 
+    Pipelined Unsigned Divider
+    ==========================
+
+    Divisor de enteros sin signo de n bits con un pipeline de n etapas (una
+    por bit del cociente). Acepta un par (a, b) nuevo en cada ciclo de clock
+    
+    Inputs 
+    
+    *   clk_i   - Clock 
+    *   rst_i   - Reset (solo de los valid)
+    *   a_i     - Dividendo de n bits
+    *   b_i     - Divisor de m bits
+    *   valid_i - Muestra valida en a_i y b_i
+    *   tag_i   - Dato del usuario que acompana a la muestra (p.ej. x, y del pixel)
+    
+    Outputs
+           
+    *   q_o     - Cociente de n bits
+    *   r_o     - Resto (m bits o mas)
+    *   valid_o - Resultado valido en q_o y r_o
+    *   tag_o   - tag_i de la muestra
+    *   div0_o  - Division por 0 de la muestra (q_o y r_o no son validos)
+    
+    Nota : Latencia de n ciclos de clock, con un resultado por ciclo.
+           Usa n restadores de m + 1 bits y n juegos de registros.
+    """
+
+    n_bits = len(a_i)    
+    m_bits = len(b_i)
+    t_bits = len(tag_i)
+
+    # Senales entre etapas (la etapa j toma las de indice j y maneja las de j + 1)
+    r = [Signal(intbv(0)[m_bits:]) for j in range(n_bits + 1)]
+    a = [Signal(modbv(0)[n_bits:]) for j in range(n_bits + 1)]
+    q = [Signal(modbv(0)[n_bits:]) for j in range(n_bits + 1)]
+    b = [Signal(intbv(0)[m_bits:]) for j in range(n_bits + 1)]
+    valid = [Signal(False) for j in range(n_bits + 1)]
+    tag = [Signal(intbv(0)[t_bits:]) for j in range(n_bits + 1)]
+    div0 = [Signal(False) for j in range(n_bits + 1)]
+
+    b_cero = Signal(False)
+
+    @always_comb
+    def detecta_div0() :
+        b_cero.next = b_i == 0
+
+    etapas = []
+    for j in range(n_bits) :
+        if j == 0 :
+            # La primera etapa toma la muestra de las entradas, con resto y cociente 0
+            etapas.append(etapa_udiv(clk_i = clk_i, rst_i = rst_i,
+                                     r_i = r[0], a_i = a_i, q_i = q[0], b_i = b_i,
+                                     valid_i = valid_i, tag_i = tag_i, div0_i = b_cero,
+                                     r_o = r[1], a_o = a[1], q_o = q[1], b_o = b[1],
+                                     valid_o = valid[1], tag_o = tag[1], div0_o = div0[1]))
+        else :
+            etapas.append(etapa_udiv(clk_i = clk_i, rst_i = rst_i,
+                                     r_i = r[j], a_i = a[j], q_i = q[j], b_i = b[j],
+                                     valid_i = valid[j], tag_i = tag[j], div0_i = div0[j],
+                                     r_o = r[j+1], a_o = a[j+1], q_o = q[j+1], b_o = b[j+1],
+                                     valid_o = valid[j+1], tag_o = tag[j+1], div0_o = div0[j+1]))
+
+    @always_comb
+    def salidas() :
+        q_o.next = q[n_bits]
+        r_o.next = r[n_bits]
+        valid_o.next = valid[n_bits]
+        tag_o.next = tag[n_bits]
+        div0_o.next = div0[n_bits]
+
+    return instances()
+
 # vim: set ts=8 sw=4 tw=0 et :
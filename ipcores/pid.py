@@ -9,7 +9,7 @@ PID
 
 from myhdl import *
 from FlipFlops import FD_RE
-from Aritmeticos import ACC_RE
+from Aritmeticos import ACC_RE, MULT_Pipe
 
 Lo = False
 Hi = True
@@ -22,9 +22,18 @@ def PID(clk_i,           # clk
         e_i,             # error de entrada
         u_o,             # correccion
         Kp, Ki, Kd,      # constantes del PID (ej: Kp = 2.34, Ki = 0.001, Kd = 0.0289)  
-        N ) :            # cantidad de bits de la parte fraccionaria 
+        N,               # cantidad de bits de la parte fraccionaria 
+        etapas_mult = 0) : # etapas de pipeline de los productos por K0, K1 y K2 (0 = combinacionales)
 
-    """PID con algoritmo "velocidad" """ 
+    """PID con algoritmo "velocidad" 
+
+    Con `etapas_mult` > 0 los productos del error por las constantes se hacen 
+    con ``MULT_Pipe``. update_i entra como valid de los multiplicadores y la 
+    correccion anterior se toma con el valid de salida, en el mismo flanco en 
+    que cambian los productos : la salida se mantiene y se actualiza 
+    `etapas_mult` clocks despues de update_i, que debe tener al menos 
+    `etapas_mult` + 1 clocks entre pulsos.
+    """ 
 
 
     K0 = int(round((Kp + Ki + Kd) / 2**-N))         # escala las constantes con resolucion 2**-N
@@ -96,18 +105,44 @@ def PID(clk_i,           # clk
                       d_i = e_n_1,
                       q_o = e_n_2)         # Error en n-2
 
+    if etapas_mult == 0 :
+
+        ce_u_n_1 = update_i
+
+        @always_comb
+        def gen_e_K() :
+            e_n_0_K0.next = e_n_0 * K0_s      
+            e_n_1_K1.next = e_n_1 * K1_s
+            e_n_2_K2.next = e_n_2 * K2_s
+
+    else :
+
+        # update_i se toma en el flanco en que se actualizan los e_n, por lo que el 
+        # valid sale un clock antes que los productos nuevos : es el clock enable 
+        # de u_n_1, que toma la correccion anterior cuando cambia delta_u
+        tag = Signal(Lo)            # el PID no usa el tag de MULT_Pipe
+        valid_K = [Signal(Lo) for i in range(3)]
+        tag_K = [Signal(Lo) for i in range(3)]
+        ce_u_n_1 = valid_K[0]
+
+        mult_K0 = MULT_Pipe(clk_i = clk_i, rst_i = rst_i, a_i = e_n_0, b_i = K0_s,
+                            valid_i = update_i, tag_i = tag, resul_o = e_n_0_K0,
+                            valid_o = valid_K[0], tag_o = tag_K[0], etapas = etapas_mult)
+
+        mult_K1 = MULT_Pipe(clk_i = clk_i, rst_i = rst_i, a_i = e_n_1, b_i = K1_s,
+                            valid_i = update_i, tag_i = tag, resul_o = e_n_1_K1,
+                            valid_o = valid_K[1], tag_o = tag_K[1], etapas = etapas_mult)
+
+        mult_K2 = MULT_Pipe(clk_i = clk_i, rst_i = rst_i, a_i = e_n_2, b_i = K2_s,
+                            valid_i = update_i, tag_i = tag, resul_o = e_n_2_K2,
+                            valid_o = valid_K[2], tag_o = tag_K[2], etapas = etapas_mult)
+
     gen_u_n_1 = FD_RE(clk_i = clk_i,
                       rst_i = rst_i,
-                      ce_i = update_i,
+                      ce_i = ce_u_n_1,
                       d_i = u_n_0,
                       q_o = u_n_1)         # Correccion anterior 
 
-    @always_comb
-    def gen_e_K() :
-        e_n_0_K0.next = e_n_0 * K0_s      
-        e_n_1_K1.next = e_n_1 * K1_s
-        e_n_2_K2.next = e_n_2 * K2_s
-
     @always_comb
     def gen_delta_u_aux() :
         delta_u_aux.next = e_n_0_K0 + e_n_2_K2
@@ -993,10 +993,22 @@ def mix_sync_2_hs(clk27_i,
 
 #############################################################################
 
+def tabla_glifos() :
+    """Tabla de bits de los caracteres de ``ROM_FONT``, para la simulacion de
+    ``char_gen_ROM``
+
+    :Retorna: tupla con el bit de la columna `col` de la fila `fila` del
+              caracter `char` en la posicion ``(char * 16 + fila) * 8 + col``
+    """
+
+    return tuple(bool((dato >> (7 - col)) & 1) for dato in ROM_FONT for col in range(8))
+
+
 def char_gen_ROM(sel_char_i, 
                  char_x_i,
                  char_y_i,
-                 bit_char_o) :
+                 bit_char_o,
+                 tabla = False) :
     """Generador de caracteres de 8x16.
 
     :: 
@@ -1022,12 +1034,24 @@ def char_gen_ROM(sel_char_i,
         - `char_y_i`   : selecciona la fila del char (4 bits mas bajos del barrido o coordenada Y) 
         - `char_x_i`   : selecciona la columna del char (3 bits mas bajos del barrido o coordenada X)   
         - `bit_char_o` : salida bit a bit de la matriz del char seleccionado    
+        - `tabla`      : (solo simulacion) obtiene el bit de una tabla precalculada
+                         (ver ``tabla_glifos``) con un solo proceso, en lugar de
+                         leer la ROM y seleccionar la columna
                                
     """
 
     n = len(sel_char_i)
     m = len(char_y_i)
 
+    if tabla :
+        BITS = tabla_glifos()
+
+        @always(sel_char_i, char_y_i, char_x_i)
+        def bit_tabla() :
+            bit_char_o.next = BITS[(((int(sel_char_i) << m) | int(char_y_i)) << 3) | int(char_x_i)]
+
+        return bit_tabla
+
     dato = Signal(intbv(0)[8:])
     address_rom = Signal(intbv(0)[n+m:])
 
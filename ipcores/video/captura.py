@@ -0,0 +1,218 @@
+# captura.py
+# ==========
+#
+# Captura de frames de video en simulacion : arma los frames en un buffer
+# NumPy a partir de las senales de sincronismo y de pixel del DUT, y los
+# guarda como imagenes PPM/PGM o PNG
+#
+# Author :
+#     Hugo Arboleas, <harboleas@citedef.gob.ar>
+#
+##############################################################################
+#
+# Copyright 2015 Hugo Arboleas
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#############################################################################
+
+import zlib
+import struct
+import numpy as np
+from myhdl import *
+
+
+def escribir_ppm(nombre, img) :
+    """
+    Guarda `img` (alto x ancho, o alto x ancho x 3, uint8) como PGM (P5) o
+    PPM (P6)
+    """
+
+    alto, ancho = img.shape[:2]
+    f = open(nombre, "wb")
+    f.write(b"%s\n%d %d\n255\n" % (b"P6" if img.ndim == 3 else b"P5", ancho, alto))
+    f.write(np.ascontiguousarray(img, dtype = np.uint8).tobytes())
+    f.close()
+
+
+def escribir_png(nombre, img) :
+    """
+    Guarda `img` (alto x ancho, o alto x ancho x 3, uint8) como PNG de
+    8 bits, escala de grises o RGB
+    """
+
+    def chunk(tipo, datos) :
+        crc = zlib.crc32(tipo + datos) & 0xFFFFFFFF
+        return struct.pack(">I", len(datos)) + tipo + datos + struct.pack(">I", crc)
+
+    img = np.ascontiguousarray(img, dtype = np.uint8)
+    alto, ancho = img.shape[:2]
+    color = 2 if img.ndim == 3 else 0
+    # Cada fila con el filtro 0 (ninguno) adelante
+    filas = np.zeros((alto, 1 + img[0].size), dtype = np.uint8)
+    filas[:, 1:] = img.reshape(alto, -1)
+
+    f = open(nombre, "wb")
+    f.write(b"\x89PNG\r\n\x1a\n")
+    f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", ancho, alto, 8, color, 0, 0, 0)))
+    f.write(chunk(b"IDAT", zlib.compress(filas.tobytes())))
+    f.write(chunk(b"IEND", b""))
+    f.close()
+
+
+def escribir_imagen(nombre, img) :
+    """Guarda `img` como PNG si `nombre` termina en .png, si no como PPM/PGM"""
+
+    if nombre.lower().endswith(".png") :
+        escribir_png(nombre, img)
+    else :
+        escribir_ppm(nombre, img)
+
+
+class Captura(object) :
+    """
+    Frames capturados de una simulacion
+
+    Parametros
+
+    * ancho, alto - Tamano de la zona activa del video
+    * frames  - Cantidad de frames a capturar (el buffer se reserva de una vez)
+    * color   - True si el pixel es RGB, False si es escala de grises
+    * roi     - (x, y, ancho, alto) de la region a capturar. Por defecto toda
+                la zona activa
+    * primero - Frames que se saltean antes del primero capturado
+    * cada    - Se captura uno de cada `cada` frames
+    * archivo - (opcional) patron del nombre de los archivos, con el numero
+                de frame, p.ej. "frame_%03d.png". Cada frame se guarda al
+                completarse
+
+    Atributos
+
+    * buffer      - array uint8 (frames, alto, ancho[, 3]) con la ROI de cada frame
+    * capturados  - Cantidad de frames completos en el buffer
+    * numeros     - Numero de frame (contado desde el primer vs) de cada captura
+
+    """
+
+    def __init__(self, ancho, alto, frames = 1, color = False, roi = None,
+                 primero = 0, cada = 1, archivo = None) :
+
+        if roi is None :
+            roi = (0, 0, ancho, alto)
+        x0, y0, w, h = roi
+        if x0 < 0 or y0 < 0 or x0 + w > ancho or y0 + h > alto :
+            raise ValueError("La ROI %s excede el frame de %dx%d" % (roi, ancho, alto))
+
+        self.roi = roi
+        self.frames = frames
+        self.primero = primero
+        self.cada = cada
+        self.archivo = archivo
+        forma = (frames, h, w, 3) if color else (frames, h, w)
+        self.buffer = np.zeros(forma, dtype = np.uint8)
+        self.capturados = 0
+        self.numeros = []
+
+    @property
+    def completa(self) :
+        """True cuando ya se capturaron todos los frames"""
+        return self.capturados == self.frames
+
+    def se_captura(self, numero) :
+        """True si el frame `numero` (desde 0) se debe capturar"""
+        return numero >= self.primero and (numero - self.primero) % self.cada == 0
+
+    def guardar(self, i, nombre) :
+        """Guarda la captura `i` como imagen (PNG o PPM segun la extension)"""
+        escribir_imagen(nombre, self.buffer[i])
+
+
+def sonda_captura(clk_i,
+                  vs_i,
+                  act_vid_i,
+                  pixel_i,
+                  captura,
+                  pix_ena_i = None,
+                  pol_vs = True) :
+    """
+    Arma en `captura` los frames que genera el DUT (solo para simulacion)
+
+    Cada frame empieza con el flanco activo de vs; los frames anteriores al
+    primer flanco se descartan. Dentro del frame cada flanco de bajada de
+    act_vid termina una linea, y los pixels se muestrean en el flanco
+    ascendente de clock con act_vid (y pix_ena si se da) en alto.
+
+    Para que la captura cueste poco en simulaciones largas, en los frames que
+    se saltean solo se esperan los flancos de vs, y en los capturados se deja
+    de muestrear al terminar la ultima linea de la ROI.
+
+    Parametros
+
+    * clk_i     - Clock del DUT
+    * vs_i      - Sincronismo vertical
+    * act_vid_i - Video activo
+    * pixel_i   - Signal con el pixel en escala de grises, o tupla (R, G, B).
+                  Se escalan a 8 bits segun su ancho
+    * captura   - Instancia de Captura
+    * pix_ena_i - (opcional) pixel enable, para clocks mas rapidos que el
+                  de pixel (p.ej. 27 MHz en ITU-656)
+    * pol_vs    - Polaridad de vs (True si el pulso es positivo)
+
+    """
+
+    x0, y0, w, h = captura.roi
+    canales = pixel_i if isinstance(pixel_i, (tuple, list)) else (pixel_i,)
+    escalas = [255.0 / (2**len(s) - 1) for s in canales]
+    ena = pix_ena_i if pix_ena_i is not None else Signal(True)
+    vs_flanco = vs_i.posedge if pol_vs else vs_i.negedge
+
+    @instance
+    def captura_frames() :
+        numero = 0
+        while not captura.completa :
+            yield vs_flanco
+            if not captura.se_captura(numero) :
+                numero += 1
+                continue
+
+            frame = captura.buffer[captura.capturados]
+            x = 0
+            y = 0
+            activo = False
+            while y < y0 + h :
+                yield clk_i.posedge
+                if act_vid_i :
+                    activo = True
+                    if ena :
+                        if y >= y0 and x0 <= x < x0 + w :
+                            if len(canales) == 1 :
+                                frame[y - y0, x - x0] = int(int(canales[0]) * escalas[0] + 0.5)
+                            else :
+                                for c in range(3) :
+                                    frame[y - y0, x - x0, c] = int(int(canales[c]) * escalas[c] + 0.5)
+                        x += 1
+                elif activo :
+                    activo = False
+                    x = 0
+                    y += 1
+
+            captura.numeros.append(numero)
+            if captura.archivo is not None :
+                captura.guardar(captura.capturados, captura.archivo % numero)
+            captura.capturados += 1
+            numero += 1
+
+    return captura_frames
+
+#  vim: set ts=8 sw=4 tw=0 et :
@@ -0,0 +1,616 @@
+# modelos.py
+# ==========
+#
+# Modelos de referencia (NumPy) de los IP cores de video, y verificadores
+# que comparan el RTL contra ellos durante la simulacion
+#
+# Author :
+#     Hugo Arboleas, <harboleas@citedef.gob.ar>
+#
+##############################################################################
+#
+# Copyright 2015 Hugo Arboleas
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#############################################################################
+
+import numpy as np
+from myhdl import *
+from vga import MODOS_VGA
+from rom_font import ROM_FONT
+
+# Timing del vga_sync (800x600 @ 72Hz) : (sync, front, activo, back), en el
+# orden en que los recorren los contadores
+VGA_H = (120, 56, 800, 64)      # pixels
+VGA_V = (6, 37, 600, 23)        # lineas
+
+
+def vga_ref(frames = 1, h = VGA_H, v = VGA_V, latencia = 0) :
+    """
+    Modelo de referencia del vga_sync
+
+    Calcula de una vez las salidas para `frames` frames completos. El
+    elemento i de cada array es el valor de la salida en el ciclo i contado
+    desde el fin del reset (contadores en 0).
+
+    Parametros
+
+    * frames - Cantidad de frames
+    * h, v   - Timing horizontal y vertical (sync, front, activo, back)
+    * latencia - Retardo en ciclos de las salidas (vga_sync_reg). Los
+                 primeros ciclos repiten el final del frame anterior
+
+    Retorna
+
+    * dict con los arrays ``hs``, ``vs``, ``act_vid`` (bool), ``x`` e ``y``
+
+    """
+
+    h_sync, h_front, h_act, h_back = h
+    v_sync, v_front, v_act, v_back = v
+    h_total = sum(h)
+    v_total = sum(v)
+
+    # Un frame como matriz (linea, pixel) y despues se repite
+    h_cont = np.arange(h_total)
+    v_cont = np.arange(v_total)[:, np.newaxis]
+
+    x = np.clip(h_cont - (h_sync + h_front), 0, h_act - 1)
+    y = np.clip(v_cont - (v_sync + v_front), 0, v_act - 1)
+    h_act_vid = (h_cont >= h_sync + h_front) & (h_cont < h_sync + h_front + h_act)
+    v_act_vid = (v_cont >= v_sync + v_front) & (v_cont < v_sync + v_front + v_act)
+
+    forma = (v_total, h_total)
+    frame = {"hs" : np.broadcast_to(h_cont < h_sync, forma),
+             "vs" : np.broadcast_to(v_cont < v_sync, forma),
+             "act_vid" : h_act_vid & v_act_vid,
+             "x" : np.broadcast_to(x, forma),
+             "y" : np.broadcast_to(y, forma)}
+
+    return dict((nombre, np.roll(np.tile(a.ravel(), frames), latencia))
+                for nombre, a in frame.items())
+
+
+def vga_timing_ref(frames = 1, modo = "640x480@60") :
+    """
+    Modelo de referencia del vga_timing
+
+    Igual que vga_ref, para un modo de MODOS_VGA (o una tupla con el mismo
+    formato). hs y vs tienen la polaridad del modo.
+
+    """
+
+    if modo in MODOS_VGA :
+        modo = MODOS_VGA[modo]
+    pix_clk, (h_act, h_front, h_sync, h_back), (v_act, v_front, v_sync, v_back), pol_h, pol_v = modo
+    h_total = h_act + h_front + h_sync + h_back
+    v_total = v_act + v_front + v_sync + v_back
+
+    h_cont = np.arange(h_total)
+    v_cont = np.arange(v_total)[:, np.newaxis]
+
+    hs = (h_cont >= h_act + h_front) & (h_cont < h_act + h_front + h_sync)
+    vs = (v_cont >= v_act + v_front) & (v_cont < v_act + v_front + v_sync)
+
+    forma = (v_total, h_total)
+    frame = {"hs" : np.broadcast_to(hs == pol_h, forma),
+             "vs" : np.broadcast_to(vs == pol_v, forma),
+             "act_vid" : (h_cont < h_act) & (v_cont < v_act),
+             "x" : np.broadcast_to(np.minimum(h_cont, h_act - 1), forma),
+             "y" : np.broadcast_to(np.minimum(v_cont, v_act - 1), forma)}
+
+    return dict((nombre, np.tile(a.ravel(), frames)) for nombre, a in frame.items())
+
+
+def cambios(ref) :
+    """
+    Ciclos en los que cambia alguna salida del modelo, junto con el ciclo
+    anterior a cada cambio. Verificar el RTL solo en estos ciclos alcanza
+    para detectar un corrimiento en el timing.
+
+    Retorna
+
+    * array ordenado de indices de ciclo
+
+    """
+
+    distinto = np.zeros(len(list(ref.values())[0]), dtype = bool)
+    for a in ref.values() :
+        distinto[1:] |= a[1:] != a[:-1]
+    idx = np.flatnonzero(distinto)
+    return np.union1d(np.union1d(idx, idx - 1), [0])
+
+
+def verifica(clk_i,
+             rst_i,
+             salidas,
+             ref,
+             ciclos,
+             errores) :
+    """
+    Compara las salidas del RTL con un modelo de referencia en ciclos
+    seleccionados (solo para simulacion)
+
+    El contador de ciclos arranca en 0 en el primer flanco de clock con el
+    reset desactivado, como los indices del modelo. Las salidas se muestrean
+    en el flanco ascendente de clock.
+
+    Parametros
+
+    * clk_i   - Clock del DUT
+    * rst_i   - Reset del DUT
+    * salidas - dict nombre -> Signal, con los mismos nombres que `ref`
+    * ref     - dict nombre -> array (por ejemplo el de vga_ref)
+    * ciclos  - Ciclos a verificar (por ejemplo los de cambios)
+    * errores - Lista donde se agregan los errores (ciclo, nombre, rtl, ref)
+
+    """
+
+    # Solo se guardan los valores de los ciclos a verificar
+    esperados = {}
+    for c in ciclos :
+        c = int(c)
+        esperados[c] = [(nombre, s, int(ref[nombre][c])) for nombre, s in salidas.items()]
+
+    cont = [0]
+
+    @always(clk_i.posedge)
+    def muestreo() :
+        if rst_i :
+            cont[0] = 0
+        else :
+            if cont[0] in esperados :
+                for nombre, s, valor in esperados[cont[0]] :
+                    if int(s) != valor :
+                        errores.append((cont[0], nombre, int(s), valor))
+            cont[0] += 1
+
+    return muestreo
+
+
+##############################################################################
+# PAL (pal_sync, 27 MHz)
+
+PAL_CLK = 27                                  # MHz
+PAL_LINEA = 64 * PAL_CLK                      # ciclos por linea
+PAL_MEDIA_LINEA = 32 * PAL_CLK
+PAL_VERT_L = int(27.3 * PAL_CLK)              # pulsos verticales
+PAL_EQU_L = int(2.3 * PAL_CLK)                # pulsos de ecualizacion
+PAL_LINEA_L = int(4.7 * PAL_CLK)              # sincronismo de linea
+PAL_CAMPO = 625 * PAL_LINEA // 2              # ciclos por campo
+PAL_FRAME = 625 * PAL_LINEA
+
+# Ciclo desde el que hs esta sincronizado con mix_sync (al final del segundo
+# pulso vertical). Antes depende de la duracion del reset.
+PAL_HS_SYNC = 2 * PAL_MEDIA_LINEA
+
+
+def pal_campo(par) :
+    """
+    Segmentos (duracion en ciclos, nivel de mix_sync) de un campo PAL como
+    los genera pal_sync. El campo par termina la linea 310 y empieza la 623
+    con media linea.
+    """
+
+    vert = [(PAL_VERT_L, False), (PAL_MEDIA_LINEA - PAL_VERT_L, True)] * 5
+    equ = [(PAL_EQU_L, False), (PAL_MEDIA_LINEA - PAL_EQU_L, True)] * 5
+    linea = [(PAL_LINEA_L, False), (PAL_LINEA - PAL_LINEA_L, True)]
+
+    if not par :
+        return vert + equ + linea * 305 + equ
+
+    # El ultimo pulso de post ecualizacion sigue con media linea en alto
+    pos_equ = equ[:-1] + [(equ[-1][0] + PAL_MEDIA_LINEA, True)]
+    media_linea = [(PAL_LINEA_L, False), (PAL_MEDIA_LINEA - PAL_LINEA_L, True)]
+    return vert + pos_equ + linea * 304 + media_linea + equ
+
+
+def pal_ref(frames = 1) :
+    """
+    Modelo de referencia del pal_sync
+
+    Genera los frames completos (dos campos entrelazados de 312.5 lineas)
+    desde el fin del reset, con np.repeat sobre la tabla de segmentos de
+    cada campo. El elemento i de cada array es el valor de la salida en el
+    ciclo i, como en vga_ref. hs solo es valido desde PAL_HS_SYNC.
+
+    Parametros
+
+    * frames - Cantidad de frames
+
+    Retorna
+
+    * dict con los arrays (bool) ``mix_sync``, ``vs``, ``hs`` y ``odd_even``
+
+    """
+
+    segmentos = pal_campo(False) + pal_campo(True)
+    duraciones = np.array([d for d, nivel in segmentos])
+    niveles = np.array([nivel for d, nivel in segmentos])
+    mix_sync = np.repeat(niveles, duraciones)
+
+    ciclo = np.arange(PAL_FRAME)
+    en_campo = ciclo % PAL_CAMPO
+    # vs baja con el primer pulso vertical y sube con el segundo de post ecualizacion
+    vs = (en_campo < PAL_VERT_L) | (en_campo >= 6 * PAL_MEDIA_LINEA + PAL_EQU_L)
+    hs = ciclo % PAL_LINEA >= PAL_LINEA_L
+    odd_even = ciclo < PAL_CAMPO
+
+    ref = dict((nombre, np.tile(a, frames)) for nombre, a in
+               (("mix_sync", mix_sync), ("vs", vs), ("hs", hs), ("odd_even", odd_even)))
+    # Despues del reset mix_sync arranca en alto, el primer pulso vertical no se ve
+    ref["mix_sync"][:PAL_VERT_L] = True
+    return ref
+
+
+def flancos(a) :
+    """
+    Flancos de una senal del modelo
+
+    Retorna
+
+    * (ciclos, valores) : arrays con el ciclo de cada cambio y el valor nuevo
+
+    """
+
+    idx = np.flatnonzero(a[1:] != a[:-1]) + 1
+    return idx, a[idx]
+
+
+def registra_flancos(clk_i,
+                     rst_i,
+                     salidas,
+                     periodo,
+                     registro) :
+    """
+    Registra los flancos de las salidas del RTL (solo para simulacion)
+
+    En lugar de muestrear en cada ciclo, espera los cambios de las salidas y
+    calcula el ciclo con el tiempo de simulacion, contado como en verifica
+    (ciclo 0 = primer flanco de clock con el reset desactivado). Las salidas
+    deben ser registradas, y cambiar solo despues del flanco de clock.
+
+    Parametros
+
+    * clk_i    - Clock del DUT
+    * rst_i    - Reset del DUT
+    * salidas  - dict nombre -> Signal
+    * periodo  - Periodo del clock, en unidades de tiempo de simulacion
+    * registro - dict donde se agrega, por nombre, la lista de (ciclo, valor)
+
+    """
+
+    nombres = list(salidas)
+    senales = tuple(salidas[n] for n in nombres)
+    for n in nombres :
+        registro.setdefault(n, [])
+
+    @instance
+    def flancos_rtl() :
+        while True :
+            yield clk_i.posedge
+            if not rst_i :
+                break
+        t0 = now()
+        previo = [int(s) for s in senales]
+        while True :
+            yield senales
+            ciclo = (now() - t0) // periodo + 1
+            for n, s, i in zip(nombres, senales, range(len(nombres))) :
+                if int(s) != previo[i] :
+                    previo[i] = int(s)
+                    registro[n].append((ciclo, int(s)))
+
+    return flancos_rtl
+
+
+def compara_flancos(registro, ref, hasta, desde = None) :
+    """
+    Compara los flancos registrados del RTL con los del modelo
+
+    Parametros
+
+    * registro - dict de registra_flancos
+    * ref      - dict nombre -> array del modelo
+    * hasta    - Ciclo hasta el que se simulo (no incluido)
+    * desde    - (opcional) dict nombre -> primer ciclo a comparar
+
+    Retorna
+
+    * lista ordenada de errores (ciclo, nombre, valor, origen), con origen
+      "rtl" para los flancos que faltan en el modelo y "ref" para los que
+      faltan en el RTL
+
+    """
+
+    desde = desde or {}
+    errores = []
+    for nombre, lista in registro.items() :
+        inicio = desde.get(nombre, 0)
+        ciclos, valores = flancos(ref[nombre][:hasta])
+        esperados = set((int(c), int(v)) for c, v in zip(ciclos, valores) if c >= inicio)
+        vistos = set((c, v) for c, v in lista if inicio <= c < hasta)
+        errores += [(c, nombre, v, "rtl") for c, v in vistos - esperados]
+        errores += [(c, nombre, v, "ref") for c, v in esperados - vistos]
+    return sorted(errores)
+
+
+##############################################################################
+# ITU-656 (625 lineas, 4:2:2, 27 MHz)
+
+ITU_LINEA = 1728                    # bytes por linea
+ITU_ACTIVO = 1440                   # bytes de video activo (720 pixels)
+ITU_BLANKING = ITU_LINEA - ITU_ACTIVO - 8
+
+# Lineas (desde 1) de comienzo del video activo de cada campo
+ITU_INI_ODD = 23
+ITU_INI_EVEN = 336
+ITU_LINEAS_CAMPO = 288
+
+
+def itu656_xy(f, v, h) :
+    """Byte XY de un codigo SAV/EAV (1 F V H P3 P2 P1 P0)"""
+    return (0x80 | f << 6 | v << 5 | h << 4 |
+            (v ^ h) << 3 | (f ^ h) << 2 | (f ^ v) << 1 | (f ^ v ^ h))
+
+
+def itu656_linea(n) :
+    """
+    (F, V, fila) de la linea `n` [1 - 625] del frame. fila es la fila de la
+    imagen de 720x576 que lleva la linea, o None durante la supresion vertical
+    """
+
+    f = 0 if n <= 312 else 1
+    if ITU_INI_ODD <= n < ITU_INI_ODD + ITU_LINEAS_CAMPO :
+        return f, 0, 2 * (n - ITU_INI_ODD)
+    if ITU_INI_EVEN <= n < ITU_INI_EVEN + ITU_LINEAS_CAMPO :
+        return f, 0, 2 * (n - ITU_INI_EVEN) + 1
+    return f, 1, None
+
+
+def itu656_lineas(Y, Cb, Cr, frames = 1) :
+    """
+    Generador de las lineas de un stream ITU-656 (PAL)
+
+    Cada linea (EAV, blanking horizontal, SAV y video activo) se arma
+    recien cuando se pide, como un array de 1728 bytes. Los frames empiezan
+    por la linea 1 (campo impar).
+
+    Parametros
+
+    * Y      - Luma, array de 576 x 720
+    * Cb, Cr - Croma, arrays de 576 x 360 (4:2:2, co-situadas con los pixels pares)
+    * frames - Cantidad de frames, None para un stream sin fin
+
+    """
+
+    blanking = np.tile(np.array([0x80, 0x10], dtype = np.uint8), ITU_ACTIVO // 2)
+    linea = np.empty(ITU_LINEA, dtype = np.uint8)
+    activo = linea[ITU_BLANKING + 8:]
+    linea[4 : ITU_BLANKING + 4] = blanking[:ITU_BLANKING]
+
+    frame = 0
+    while frames is None or frame < frames :
+        for n in range(1, 626) :
+            f, v, fila = itu656_linea(n)
+            linea[0:4] = (0xFF, 0, 0, itu656_xy(f, v, 1))
+            linea[ITU_BLANKING + 4 : ITU_BLANKING + 8] = (0xFF, 0, 0, itu656_xy(f, v, 0))
+            if fila is None :
+                activo[:] = blanking
+            else :
+                activo[0::4] = Cb[fila]
+                activo[1::2] = Y[fila]
+                activo[2::4] = Cr[fila]
+            yield linea.copy()
+        frame += 1
+
+
+def itu656_stream(Y, Cb, Cr, frames = 1) :
+    """Generador byte a byte del stream de itu656_lineas"""
+
+    for linea in itu656_lineas(Y, Cb, Cr, frames) :
+        for b in linea.tolist() :
+            yield b
+
+
+def itu656_deco_ref(datos) :
+    """
+    Decodificador de referencia de un stream ITU-656 (PAL)
+
+    Busca de una vez todos los codigos de sincronismo del stream, numera las
+    lineas desde el comienzo del campo impar (como ITU_656_deco) y extrae el
+    video activo que sigue a cada SAV de las lineas sin supresion vertical.
+
+    Parametros
+
+    * datos - array (o secuencia) de bytes del stream
+
+    Retorna
+
+    * dict con los arrays ``x``, ``y``, ``Y``, ``Cb`` y ``Cr`` de cada pixel
+      activo, en el orden del stream
+
+    """
+
+    d = np.asarray(datos, dtype = np.uint8)
+    cod = np.flatnonzero((d[:-3] == 0xFF) & (d[1:-2] == 0) & (d[2:-1] == 0))
+    xy = d[cod + 3]
+    f = (xy >> 6) & 1
+    v = (xy >> 5) & 1
+    h = (xy >> 4) & 1
+
+    eav = cod[h == 1]
+    f_eav = f[h == 1]
+    v_eav = v[h == 1]
+    sav = cod[h == 0]
+
+    # Las lineas se numeran desde 0 a partir del EAV que pasa al campo impar
+    f_previo = np.concatenate(([1], f_eav[:-1]))
+    inicio = np.flatnonzero((f_eav == 0) & (f_previo == 1))
+    n = np.arange(len(eav))
+    n_linea = n - inicio[np.maximum(np.searchsorted(inicio, n, side = "right") - 1, 0)]
+    valida = n >= inicio[0] if len(inicio) else np.zeros(len(eav), dtype = bool)
+
+    # Video activo : despues del primer SAV que sigue al EAV de cada linea activa
+    sig_sav = np.searchsorted(sav, eav)
+    activa = valida & (v_eav == 0) & (sig_sav < len(sav))
+    pos = sav[sig_sav[activa]] + 4
+    completa = pos + ITU_ACTIVO <= len(d)
+    pos = pos[completa]
+    lineas = n_linea[activa][completa]
+    impar = f_eav[activa][completa] == 0
+
+    fila = np.where(impar, 2 * (lineas - (ITU_INI_ODD - 1)), 2 * (lineas - (ITU_INI_EVEN - 1)) + 1)
+    activos = d[pos[:, np.newaxis] + np.arange(ITU_ACTIVO)]
+
+    return {"x" : np.tile(np.arange(720), len(pos)),
+            "y" : np.repeat(fila, 720),
+            "Y" : activos[:, 1::2].ravel(),
+            "Cb" : np.repeat(activos[:, 0::4], 2, axis = 1).ravel(),
+            "Cr" : np.repeat(activos[:, 2::4], 2, axis = 1).ravel()}
+
+
+def driver_stream(clk_i,
+                  data_o,
+                  stream,
+                  parar = True) :
+    """
+    Maneja `data_o` con un byte de `stream` (iterable) por ciclo de clock,
+    pidiendolo recien cuando hace falta (solo para simulacion)
+
+    Parametros
+
+    * clk_i  - Clock del DUT
+    * data_o - Entrada de datos del DUT
+    * stream - Iterable de bytes, p.ej. itu656_stream
+    * parar  - Termina la simulacion cuando se acaba el stream
+
+    """
+
+    @instance
+    def driver() :
+        for b in stream :
+            yield clk_i.posedge
+            data_o.next = b
+        yield clk_i.posedge
+        if parar :
+            raise StopSimulation
+
+    return driver
+
+
+def verifica_stream(clk_i,
+                    validos,
+                    salidas,
+                    esperado,
+                    errores) :
+    """
+    Compara las salidas del RTL con un stream de valores esperados, a medida
+    que se producen, sin guardar formas de onda (solo para simulacion)
+
+    En cada flanco ascendente de clock con todas las senales de `validos` en
+    alto, la tupla de valores de `salidas` se compara con el siguiente
+    elemento de `esperado`. Al terminar, `esperado` deberia estar agotado.
+
+    Parametros
+
+    * clk_i    - Clock del DUT
+    * validos  - Secuencia de Signals que indican una salida valida
+    * salidas  - Secuencia de Signals a comparar
+    * esperado - Iterador de tuplas, p.ej. zip de los arrays de itu656_deco_ref
+    * errores  - Lista donde se agregan los errores (indice, rtl, esperado)
+
+    """
+
+    esperado = iter(esperado)
+    indice = [0]
+
+    @always(clk_i.posedge)
+    def compara() :
+        for s in validos :
+            if not s :
+                return
+        rtl = tuple(int(s) for s in salidas)
+        ref = next(esperado, None)
+        if ref is None or rtl != tuple(int(r) for r in ref) :
+            errores.append((indice[0], rtl, ref))
+        indice[0] += 1
+
+    return compara
+
+
+##############################################################################
+# Generador de caracteres (char_gen_ROM, 8x16)
+
+CHAR_ANCHO = 8
+CHAR_ALTO = 16
+CHAR_PRIMERO = 32                   # ROM_FONT empieza por el espacio
+
+
+def glifos() :
+    """
+    Bits de los caracteres de ROM_FONT
+
+    Retorna
+
+    * array uint8 (caracter, fila, columna) de 0 y 1
+
+    """
+
+    rom = np.array(ROM_FONT, dtype = np.uint8).reshape(-1, CHAR_ALTO)
+    return np.unpackbits(rom[:, :, np.newaxis], axis = 2)
+
+
+def codigos(texto, columnas = 100, filas = 37) :
+    """
+    Codigos de caracter (indices de ROM_FONT) de una pantalla de texto
+
+    Parametros
+
+    * texto - Lista de lineas (str). Las lineas cortas se completan con
+              espacios y las largas se cortan
+    * columnas, filas - Tamano de la pantalla en caracteres
+
+    """
+
+    pantalla = np.zeros((filas, columnas), dtype = np.int32)
+    for fila, linea in enumerate(texto[:filas]) :
+        linea = linea[:columnas]
+        pantalla[fila, :len(linea)] = [ord(c) - CHAR_PRIMERO for c in linea]
+    return pantalla
+
+
+def texto_ref(pantalla, tabla = None) :
+    """
+    Renderiza una pantalla de texto como la genera char_gen_ROM con
+    sel_char = pantalla[y // 16, x // 8], char_y = y % 16 y char_x = x % 8
+
+    Parametros
+
+    * pantalla - array (filas, columnas) de codigos de caracter (ver codigos)
+    * tabla    - (opcional) resultado de glifos(), para no recalcularlo
+
+    Retorna
+
+    * array uint8 (filas * 16, columnas * 8) de 0 y 1
+
+    """
+
+    if tabla is None :
+        tabla = glifos()
+    filas, columnas = pantalla.shape
+    return tabla[pantalla].transpose(0, 2, 1, 3).reshape(filas * CHAR_ALTO, columnas * CHAR_ANCHO)
+
+#  vim: set ts=8 sw=4 tw=0 et :
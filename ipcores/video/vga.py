@@ -129,4 +129,310 @@ def vga_sync(clk50_i,
 
     return instances()
 
+############################################################################
+
+def vga_sync_reg(clk50_i,
+                 rst_i,
+                 hs_o,
+                 vs_o,
+                 act_vid_o,
+                 x_o,
+                 y_o,
+                 latencia = 0) :
+
+    """
+    VGA sync generator (800x600 @ 72Hz) con salidas registradas
+
+    Mismo timing que vga_sync, pero todas las salidas salen de registros :
+    los flags de sync y video activo del ciclo siguiente se calculan con
+    comparaciones por igualdad de los contadores contra constantes, y x e y
+    son contadores que avanzan durante la zona activa, por lo que no hay
+    comparadores de magnitud ni restadores en el camino de salida.
+
+    Inputs
+
+    * clk50_i - Pixel clock 50Mhz
+    * rst_i   - Reset
+
+    Outputs
+
+    * hs_o      - Horizontal sync
+    * vs_o      - Vertical sync
+    * act_vid_o - Active video
+    * x_o       - Coordenada X del pixel actual [0 - 799]
+    * y_o       - Coordenada Y del pixel actual [0 - 599]
+
+    Parametros
+
+    * latencia - Ciclos de clock que se retrasan todas las salidas respecto
+                 de vga_sync [0 - 64], para alinearlas con un generador de
+                 pixels que tarda esa cantidad de ciclos. Con latencia 0 las
+                 salidas son identicas a las de vga_sync.
+
+    """
+
+    ######################################
+    # Horizontal (en pixels)
+    H_SYNC = 120
+    H_FRONT = 56
+    H_ACT = 800
+    H_BACK = 64
+    H_TOTAL = H_SYNC + H_FRONT + H_ACT + H_BACK
+    ######################################
+    # Vertical (en lineas)
+    V_SYNC = 6
+    V_FRONT = 37
+    V_ACT = 600
+    V_BACK = 23
+    V_TOTAL = V_SYNC + V_FRONT + V_ACT + V_BACK
+    ####################
+
+    if not 0 <= latencia <= H_BACK :
+        raise ValueError("latencia fuera de rango [0 - %d]" % H_BACK)
+
+    # Ultimo valor del contador antes de cada cambio
+    H_INI_ACT = H_SYNC + H_FRONT - 1
+    H_FIN_ACT = H_SYNC + H_FRONT + H_ACT - 1
+    V_INI_ACT = V_SYNC + V_FRONT - 1
+    V_FIN_ACT = V_SYNC + V_FRONT + V_ACT - 1
+
+    h_cont = Signal(intbv(0, 0, H_TOTAL))     # contadores
+    v_cont = Signal(intbv(0, 0, V_TOTAL))
+    hs = Signal(True)                         # salidas del ciclo actual
+    vs = Signal(True)
+    h_act = Signal(False)
+    v_act = Signal(False)
+    act_vid = Signal(False)
+    x = Signal(intbv(0, 0, H_ACT))
+    y = Signal(intbv(0, 0, V_ACT))
+
+    # Las salidas van empaquetadas en un bus por las etapas de retardo
+    W = 3 + len(x) + len(y)
+    # Valor de las etapas despues del reset : el de los ultimos pixels del frame
+    SALIDA_RST = (H_ACT - 1) << len(y) | (V_ACT - 1)
+
+    salida = Signal(intbv(0)[W:])
+    etapas = [Signal(intbv(SALIDA_RST)[W:]) for i in range(latencia)]
+
+
+    @always(clk50_i.posedge, rst_i.posedge)
+    def contadores() :
+        if rst_i :
+            h_cont.next = 0
+            v_cont.next = 0
+            hs.next = True
+            vs.next = True
+            h_act.next = False
+            v_act.next = False
+            act_vid.next = False
+            x.next = 0
+            y.next = 0
+
+        else :
+            h_act_sig = bool(h_act)
+            v_act_sig = bool(v_act)
+
+            if h_cont == H_TOTAL - 1 :
+                h_cont.next = 0
+                hs.next = True
+                x.next = 0
+
+                if v_cont == V_TOTAL - 1 :
+                    v_cont.next = 0
+                    vs.next = True
+                    y.next = 0
+                else :
+                    v_cont.next = v_cont + 1
+                    if v_cont == V_SYNC - 1 :
+                        vs.next = False
+                    if v_cont == V_INI_ACT :
+                        v_act_sig = True
+                    elif v_cont == V_FIN_ACT :
+                        v_act_sig = False
+                    elif v_act :
+                        y.next = y + 1
+
+            else :
+                h_cont.next = h_cont + 1
+                if h_cont == H_SYNC - 1 :
+                    hs.next = False
+                if h_cont == H_INI_ACT :
+                    h_act_sig = True
+                elif h_cont == H_FIN_ACT :
+                    h_act_sig = False
+                elif h_act :
+                    x.next = x + 1
+
+            h_act.next = h_act_sig
+            v_act.next = v_act_sig
+            act_vid.next = h_act_sig and v_act_sig
+
+    @always_comb
+    def empaquetado() :
+        salida.next = concat(hs, vs, act_vid, x, y)
+
+    if latencia == 0 :
+        salida_ret = salida
+    else :
+        salida_ret = etapas[latencia - 1]
+
+        @always(clk50_i.posedge, rst_i.posedge)
+        def retardo() :
+            if rst_i :
+                for i in range(latencia) :
+                    etapas[i].next = SALIDA_RST
+            else :
+                etapas[0].next = salida
+                for i in range(1, latencia) :
+                    etapas[i].next = etapas[i - 1]
+
+    @always_comb
+    def salidas() :
+        hs_o.next = salida_ret[W - 1]
+        vs_o.next = salida_ret[W - 2]
+        act_vid_o.next = salida_ret[W - 3]
+        x_o.next = salida_ret[W - 3 : len(y)]
+        y_o.next = salida_ret[len(y) : 0]
+
+    return instances()
+
+############################################################################
+# Modos VGA estandar (VESA DMT y CEA-861)
+#
+# modo : (clock de pixel [MHz], horizontal, vertical, polaridad hs, polaridad vs)
+#
+# horizontal = (activo, front porch, sync, back porch) en pixels
+# vertical   = (activo, front porch, sync, back porch) en lineas
+# polaridad  = True si el pulso de sincronismo es positivo
+
+MODOS_VGA = {
+    "640x480@60"   : (25.175, (640, 16, 96, 48), (480, 10, 2, 33), False, False),
+    "800x600@72"   : (50.0, (800, 56, 120, 64), (600, 37, 6, 23), True, True),
+    "1024x768@60"  : (65.0, (1024, 24, 136, 160), (768, 3, 6, 29), False, False),
+    "1280x720@60"  : (74.25, (1280, 110, 40, 220), (720, 5, 5, 20), True, True),
+    "1920x1080@60" : (148.5, (1920, 88, 44, 148), (1080, 4, 5, 36), True, True)
+}
+
+
+def vga_timing(clk_i,
+               rst_i,
+               hs_o,
+               vs_o,
+               act_vid_o,
+               x_o,
+               y_o,
+               modo = "640x480@60") :
+
+    """
+    VGA timing generator con el modo elegido de una tabla
+
+    Inputs
+
+    * clk_i   - Pixel clock (el del modo, ver MODOS_VGA)
+    * rst_i   - Reset
+
+    Outputs
+
+    * hs_o      - Horizontal sync (con la polaridad del modo)
+    * vs_o      - Vertical sync (con la polaridad del modo)
+    * act_vid_o - Active video
+    * x_o       - Coordenada X del pixel actual [0 - H_ACT-1]
+    * y_o       - Coordenada Y del pixel actual [0 - V_ACT-1]
+
+    Parametros
+
+    * modo - Nombre de un modo de MODOS_VGA, o una tupla con el mismo formato
+             para un timing a medida
+
+    Cada linea empieza por la zona activa (h_cont = 0 es el pixel x = 0), y
+    sigue con el front porch, el sync y el back porch; lo mismo para las
+    lineas del frame. Los limites de cada zona se calculan al elaborar, y
+    hs, vs, la zona activa y las coordenadas son registros que cambian
+    cuando el contador llega a uno de esos limites (comparaciones por
+    igualdad con constantes). Fuera de la zona activa x e y quedan en el
+    ultimo valor activo.
+
+    """
+
+    if modo in MODOS_VGA :
+        modo = MODOS_VGA[modo]
+    pix_clk, (H_ACT, H_FRONT, H_SYNC, H_BACK), (V_ACT, V_FRONT, V_SYNC, V_BACK), POL_H, POL_V = modo
+
+    H_TOTAL = H_ACT + H_FRONT + H_SYNC + H_BACK
+    V_TOTAL = V_ACT + V_FRONT + V_SYNC + V_BACK
+
+    # Ultimo valor del contador antes de cada cambio
+    H_FIN_ACT = H_ACT - 1
+    H_INI_SYNC = H_ACT + H_FRONT - 1
+    H_FIN_SYNC = H_ACT + H_FRONT + H_SYNC - 1
+    V_FIN_ACT = V_ACT - 1
+    V_INI_SYNC = V_ACT + V_FRONT - 1
+    V_FIN_SYNC = V_ACT + V_FRONT + V_SYNC - 1
+
+    h_cont = Signal(intbv(0, 0, H_TOTAL))     # contadores
+    v_cont = Signal(intbv(0, 0, V_TOTAL))
+    h_act = Signal(True)                      # flags
+    v_act = Signal(True)
+    hs = Signal(bool(not POL_H))
+    vs = Signal(bool(not POL_V))
+    x = Signal(intbv(0, 0, H_ACT))
+    y = Signal(intbv(0, 0, V_ACT))
+
+
+    @always(clk_i.posedge, rst_i.posedge)
+    def barrido() :
+        if rst_i :
+            h_cont.next = 0
+            v_cont.next = 0
+            h_act.next = True
+            v_act.next = True
+            hs.next = not POL_H
+            vs.next = not POL_V
+            x.next = 0
+            y.next = 0
+
+        else :
+            if h_cont == H_TOTAL - 1 :
+                h_cont.next = 0
+                h_act.next = True
+                x.next = 0
+
+                if v_cont == V_TOTAL - 1 :
+                    v_cont.next = 0
+                    v_act.next = True
+                    y.next = 0
+                else :
+                    v_cont.next = v_cont + 1
+                    if v_cont == V_FIN_ACT :
+                        v_act.next = False
+                    elif v_act :
+                        y.next = y + 1
+
+                if v_cont == V_INI_SYNC :
+                    vs.next = POL_V
+                elif v_cont == V_FIN_SYNC :
+                    vs.next = not POL_V
+
+            else :
+                h_cont.next = h_cont + 1
+                if h_cont == H_FIN_ACT :
+                    h_act.next = False
+                elif h_act :
+                    x.next = x + 1
+
+            if h_cont == H_INI_SYNC :
+                hs.next = POL_H
+            elif h_cont == H_FIN_SYNC :
+                hs.next = not POL_H
+
+    @always_comb
+    def salidas() :
+        hs_o.next = hs
+        vs_o.next = vs
+        act_vid_o.next = h_act and v_act
+        x_o.next = x
+        y_o.next = y
+
+    return instances()
+
 #  vim: set ts=8 sw=4 tw=0 et :
@@ -0,0 +1,156 @@
+# test_asm.py
+# ===========
+#
+# Test para el assembler del TZR1
+#
+##############################################################################
+
+import unittest
+import os
+import shutil
+import tempfile
+import cpu
+import types
+import random
+from cpu.asm import assemble, main, tokenizar, ErrorAsm
+from cpu.iss import TZR1_ISS
+from cpu import fibo, contador
+from imagen_mem import cargar_bin
+
+DIR_CPU = os.path.dirname(cpu.__file__)
+
+def fuente(nombre) :
+    f = open(os.path.join(DIR_CPU, nombre))
+    texto = f.read()
+    f.close()
+    return texto
+
+class Test_asm(unittest.TestCase) :
+
+    def test_programas(self) :
+        """El ensamblado en memoria coincide con los .py generados"""
+        self.assertEqual(assemble(fuente("fibo.asm")), fibo.program)
+        self.assertEqual(assemble(fuente("contador.asm")), contador.program)
+
+    def test_tokens(self) :
+        """El analizador lexico es un generador de (tipo, token)"""
+        tokens = tokenizar("fin : mov [r1], r2  # fin\n")
+        self.assertTrue(isinstance(tokens, types.GeneratorType))
+        self.assertEqual(list(tokens), [("label", "fin"), ("op", "mov"), ("addr_reg", "[r1]"),
+                                        ("reg", "r2"), ("comen", "# fin"), ("fin_linea", "\n")])
+
+    def test_errores(self) :
+        """Los errores informan la linea del fuente"""
+        with self.assertRaises(ErrorAsm) as cm :
+            assemble("mov r0, 1\n\nadd r1\n")
+        self.assertEqual(cm.exception.linea, 3)
+
+        with self.assertRaises(ErrorAsm) as cm :
+            assemble("mov r0, 1\nfin : jmp inicio\n")
+        self.assertEqual(cm.exception.linea, 2)
+        self.assertTrue("inicio" in cm.exception.mensaje)
+
+    def test_main(self) :
+        """Varios archivos en un solo proceso, los errores no cortan el lote"""
+        tmp = tempfile.mkdtemp()
+        try :
+            archivos = []
+            for nombre, texto in (("a.asm", "nop\n"), ("b.asm", "mov\n"), ("c.asm", fuente("fibo.asm"))) :
+                archivos.append(os.path.join(tmp, nombre))
+                f = open(archivos[-1], "w")
+                f.write(texto)
+                f.close()
+
+            self.assertEqual(main(archivos), 1)
+            self.assertTrue(os.path.exists(os.path.join(tmp, "a.py")))
+            self.assertFalse(os.path.exists(os.path.join(tmp, "b.py")))
+            f = open(os.path.join(tmp, "c.py"))
+            self.assertEqual(f.read(), "program = " + str(fibo.program))
+            f.close()
+        finally :
+            shutil.rmtree(tmp)
+
+    def test_formatos(self) :
+        """Salidas binaria, Intel HEX y $readmemh"""
+        tmp = tempfile.mkdtemp()
+        try :
+            archivo = os.path.join(tmp, "fibo.asm")
+            f = open(archivo, "w")
+            f.write(fuente("fibo.asm"))
+            f.close()
+
+            self.assertEqual(main(["-f", "bin", "-f", "hex", "-f", "mem", archivo]), 0)
+            self.assertFalse(os.path.exists(os.path.join(tmp, "fibo.py")))
+
+            self.assertEqual(tuple(cargar_bin(os.path.join(tmp, "fibo.bin"))), fibo.program)
+
+            f = open(os.path.join(tmp, "fibo.mem"))
+            self.assertEqual(tuple(int(l, 16) for l in f), fibo.program)
+            f.close()
+
+            f = open(os.path.join(tmp, "fibo.hex"))
+            registros = [bytearray.fromhex(l.strip()[1:]) for l in f]
+            f.close()
+            for reg in registros :
+                self.assertEqual(sum(reg) & 0xFF, 0)     # checksum
+            self.assertEqual(registros[-1], bytearray([0, 0, 0, 1, 0xFF]))
+            datos = registros[0][4:-1]
+            self.assertEqual(tuple(datos[i] + (datos[i+1] << 8) for i in range(0, len(datos), 2)), fibo.program)
+        finally :
+            shutil.rmtree(tmp)
+
+    def test_peephole(self) :
+        """La optimizacion elimina instrucciones sin efecto y renumera los saltos"""
+        src = ("        mov r0, 3\n"
+               "        mov r0, r0\n"       # flags muertos (add)
+               "lazo :  add r0, 0\n"        # flags muertos (cmp)
+               "        cmp r0, 2\n"        # flags muertos (sub)
+               "        jmp sig\n"          # salto a la siguiente
+               "sig :   sub r0, 1\n"
+               "        jz fin\n"
+               "        mov r1, r1\n"       # flags vivos (jc)
+               "        jc fin\n"
+               "        jmp lazo\n"
+               "fin :   jmp fin\n")
+        self.assertEqual(assemble(src, optimizar = True),
+                         assemble("        mov r0, 3\n"
+                                  "lazo :  sub r0, 1\n"
+                                  "        jz fin\n"
+                                  "        mov r1, r1\n"
+                                  "        jc fin\n"
+                                  "        jmp lazo\n"
+                                  "fin :   jmp fin\n"))
+        # Sin nada para optimizar no cambia
+        self.assertEqual(assemble(fuente("fibo.asm"), optimizar = True), fibo.program)
+
+    def test_peephole_random(self) :
+        """Los programas optimizados dejan los mismos registros y memoria"""
+        r = random.Random(99)
+        ops = ["mov r%d, r%d", "add r%d, 0", "cmp r%d, r%d", "cmp r%d, 1", "mov r%d, 7",
+               "add r%d, r%d", "sub r%d, 3", "mov [r%d], r%d", "mov r%d, [r%d]", "nop"]
+        for j in range(50) :
+            n = 30
+            lineas = []
+            for i in range(n) :
+                if r.random() < 0.25 :
+                    salto = r.choice(("jmp", "jz", "jc"))
+                    lineas.append("l%d : %s l%d\n" % (i, salto, r.randint(i + 1, n)))
+                else :
+                    op = r.choice(ops)
+                    args = tuple(r.randrange(8) for k in range(op.count("%d")))
+                    lineas.append("l%d : %s\n" % (i, op % args))
+            lineas.append("l%d : jmp l%d\n" % (n, n))
+            src = "".join(lineas)
+
+            estados = []
+            for optimizar in (False, True) :
+                iss = TZR1_ISS(assemble(src, optimizar))
+                iss.run(200)
+                estados.append((iss.regs, iss.mem))
+            self.assertEqual(estados[0], estados[1])
+            self.assertTrue(len(assemble(src, True)) <= len(assemble(src)))
+
+if __name__ == "__main__" :
+    unittest.main()
+
+# vim: set ts=8 sw=4 tw=0 et :
@@ -0,0 +1,45 @@
+# test_cosim.py
+# =============
+#
+# Co-simulacion del TZR1 (RTL) contra el ISS
+#
+##############################################################################
+
+import unittest
+import random
+from cpu.cosim import cosim
+from cpu.iss import TZR1_ISS
+from cpu.fibo import program as fibo
+
+class Test_cosim(unittest.TestCase) :
+
+    def test_fibo(self) :
+        """El RTL y el ISS coinciden en el programa de Fibonacci"""
+        self.assertEqual(cosim(fibo, 2000, paso = 250), None)
+
+    def test_random(self) :
+        """Programas aleatorios, comparando en todos los ciclos"""
+        r = random.Random(1234)
+        for j in range(5) :
+            prog = []
+            for i in range(63) :
+                op = r.randrange(25)
+                if op in (4, 7, 8, 9) :     # call, jc, jmp, jz dentro del programa
+                    prog.append((op << 11) + r.randrange(64))
+                else :
+                    prog.append((op << 11) + r.randrange(2048))
+            prog.append(8 << 11)            # jmp 0
+            mem = bytearray(r.randrange(256) for i in range(256))
+            self.assertEqual(cosim(tuple(prog), 300, paso = 1, mem = mem), None)
+
+    def test_divergencia(self) :
+        """Se informa el primer punto de control con diferencias"""
+        prog = list(fibo)
+        prog[0] += 1                        # mov r0, 2
+        res = cosim(fibo, 1000, paso = 100, ref = TZR1_ISS(tuple(prog)))
+        self.assertEqual(res[:2], (100, "regs"))
+
+if __name__ == "__main__" :
+    unittest.main()
+
+# vim: set ts=8 sw=4 tw=0 et :
@@ -0,0 +1,210 @@
+# test_fifo.py
+# ============
+#
+# Test de las FIFO sincronica y asincronica de Memorias.py
+#
+##############################################################################
+
+import unittest
+import random
+import shutil
+import tempfile
+from collections import deque
+from myhdl import *
+from Memorias import FIFO_sinc, FIFO_asinc
+
+def fifo_random(k, semilla, sim_array = False, umbral_af = None, umbral_ae = 1) :
+    """Push y pop aleatorios, comparando con un modelo de referencia
+    (``deque``) en cada clock
+
+    :Retorna: lista de errores ``(ciclo, campo, rtl, ref)``
+    """
+
+    r = random.Random(semilla)
+    clk, rst, push, pop = [Signal(False) for i in range(4)]
+    full, empty, af, ae = [Signal(False) for i in range(4)]
+    d_i, q_o = [Signal(intbv(0)[8:]) for i in range(2)]
+    count = Signal(intbv(0, 0, k + 1))
+    errores = []
+
+    dut = FIFO_sinc(clk_i = clk, rst_i = rst, push_i = push, pop_i = pop, d_i = d_i, q_o = q_o,
+                    full_o = full, empty_o = empty, count_o = count,
+                    almost_full_o = af, almost_empty_o = ae,
+                    k = k, umbral_af = umbral_af, umbral_ae = umbral_ae, sim_array = sim_array)
+
+    af_ref = k - 1 if umbral_af is None else umbral_af
+
+    @instance
+    def estimulo() :
+        ref = deque()
+        q_ref = 0
+        for ciclo in range(2000) :
+            # Rafagas : cada 100 ciclos cambia la probabilidad de push y pop
+            if ciclo % 100 == 0 :
+                p_push = r.random()
+                p_pop = r.random()
+            push.next = r.random() < p_push
+            pop.next = r.random() < p_pop
+            rst.next = r.random() < 0.002
+            d_i.next = r.randrange(256)
+            yield delay(5)
+
+            # Modelo
+            if rst :
+                ref.clear()
+                q_ref = 0
+            else :
+                hay_pop = pop and len(ref) > 0
+                hay_push = push and len(ref) < k
+                if hay_pop :
+                    q_ref = ref.popleft()
+                if hay_push :
+                    ref.append(int(d_i))
+
+            clk.next = 1
+            yield delay(5)
+            clk.next = 0
+
+            n = len(ref)
+            for campo, rtl, esperado in (("q", int(q_o), q_ref),
+                                         ("count", int(count), n),
+                                         ("full", bool(full), n == k),
+                                         ("empty", bool(empty), n == 0),
+                                         ("af", bool(af), n >= af_ref),
+                                         ("ae", bool(ae), n <= umbral_ae)) :
+                if rtl != esperado :
+                    errores.append((ciclo, campo, rtl, esperado))
+        raise StopSimulation
+
+    Simulation(dut, estimulo).run()
+    return errores
+
+
+def fifo_asinc(k, semi_w, semi_r, palabras, semilla = None) :
+    """Pasa `palabras` datos por una ``FIFO_asinc`` con clocks de semiperiodos
+    `semi_w` y `semi_r` (en ps). Sin `semilla` escribe y lee siempre que puede,
+    con `semilla` push y pop son aleatorios.
+
+    :Retorna: ``(errores, throughput)``, con los datos leidos que no coinciden
+              con la secuencia escrita y las palabras transferidas por
+              microsegundo desde el primer dato leido
+    """
+
+    r = random.Random(semilla)
+    clk_w, rst_w, push, full = [Signal(False) for i in range(4)]
+    clk_r, rst_r, pop, empty = [Signal(False) for i in range(4)]
+    d_i, q_o = [Signal(intbv(0)[8:]) for i in range(2)]
+    errores = []
+    medida = {}
+
+    dut = FIFO_asinc(clkW_i = clk_w, rstW_i = rst_w, push_i = push, d_i = d_i, full_o = full,
+                     clkR_i = clk_r, rstR_i = rst_r, pop_i = pop, q_o = q_o, empty_o = empty,
+                     k = k)
+
+    @instance
+    def clock_w() :
+        while True :
+            yield delay(semi_w)
+            clk_w.next = not clk_w
+
+    @instance
+    def clock_r() :
+        while True :
+            yield delay(semi_r)
+            clk_r.next = not clk_r
+
+    @instance
+    def reset() :
+        rst_w.next = True
+        rst_r.next = True
+        yield delay(10 * max(semi_w, semi_r))
+        yield clk_w.negedge
+        rst_w.next = False
+        yield clk_r.negedge
+        rst_r.next = False
+
+    @instance
+    def productor() :
+        escritos = 0
+        while True :
+            yield clk_w.negedge
+            push.next = escritos < palabras and not rst_w and (semilla is None or r.random() < 0.7)
+            yield clk_w.posedge
+            if push and not full :
+                escritos += 1
+                d_i.next = escritos % 256
+
+    @instance
+    def consumidor() :
+        leidos = 0
+        pendiente = False
+        while leidos < palabras :
+            yield clk_r.negedge
+            pop.next = not rst_r and (semilla is None or r.random() < 0.7)
+            yield clk_r.posedge
+            if pendiente :                      # dato del pop anterior
+                if int(q_o) != leidos % 256 :
+                    errores.append((leidos, int(q_o)))
+                leidos += 1
+                if leidos == 1 :
+                    medida["inicio"] = now()
+            pendiente = bool(pop and not empty)
+        medida["fin"] = now()
+        raise StopSimulation
+
+    Simulation(dut, clock_w, clock_r, reset, productor, consumidor).run()
+    throughput = (palabras - 1) * 1e6 / (medida["fin"] - medida["inicio"])
+    return errores, throughput
+
+
+class Test_fifo(unittest.TestCase) :
+
+    def test_random(self) :
+        """Push y pop aleatorios contra el modelo de referencia"""
+        for k in (1, 5, 16) :
+            self.assertEqual(fifo_random(k, k), [])
+
+    def test_umbrales(self) :
+        """Umbrales de almost full y almost empty configurables"""
+        self.assertEqual(fifo_random(16, 3, umbral_af = 12, umbral_ae = 4), [])
+
+    def test_sim_array(self) :
+        """Con el RAM_DP en modo array"""
+        self.assertEqual(fifo_random(16, 16, sim_array = True), [])
+
+    def test_asinc(self) :
+        """FIFO asincronica con clocks de 27 MHz y 50 MHz : el throughput sostenido
+        es el del clock mas lento"""
+        for semi_w, semi_r in ((18519, 10000), (10000, 18519)) :
+            errores, throughput = fifo_asinc(16, semi_w, semi_r, 2000)
+            self.assertEqual(errores, [])
+            f_lento = 1e6 / (2 * max(semi_w, semi_r))       # palabras por us
+            self.assertTrue(throughput > 0.98 * f_lento, throughput)
+            self.assertTrue(throughput <= f_lento * 1.001, throughput)
+
+    def test_asinc_random(self) :
+        """Push y pop aleatorios, relacion de clocks no entera y FIFO chica"""
+        for k, semi_w, semi_r in ((2, 7000, 3000), (4, 3000, 7000), (8, 5000, 5300)) :
+            errores, throughput = fifo_asinc(k, semi_w, semi_r, 500, semilla = k)
+            self.assertEqual(errores, [])
+
+    def test_conversion(self) :
+        """Se convierten a VHDL"""
+        tmp = tempfile.mkdtemp()
+        clk, rst, push, pop = [Signal(False) for i in range(4)]
+        full, empty, af, ae = [Signal(False) for i in range(4)]
+        d_i, q_o = [Signal(intbv(0)[8:]) for i in range(2)]
+        count = Signal(intbv(0, 0, 17))
+        toVHDL.directory = tmp
+        try :
+            toVHDL(FIFO_sinc, clk, rst, push, pop, d_i, q_o, full, empty, count, af, ae, k = 16)
+            clk_r, rst_r = [Signal(False) for i in range(2)]
+            toVHDL(FIFO_asinc, clk, rst, push, d_i, full, clk_r, rst_r, pop, q_o, empty, k = 16)
+        finally :
+            toVHDL.directory = None
+            shutil.rmtree(tmp)
+
+if __name__ == "__main__" :
+    unittest.main()
+
+# vim: set ts=8 sw=4 tw=0 et :
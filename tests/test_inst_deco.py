@@ -0,0 +1,65 @@
+# test_inst_deco.py
+# =================
+#
+# Test del decodificador de instrucciones del TZR1
+#
+##############################################################################
+
+import unittest
+from myhdl import *
+from cpu.inst_deco import inst_deco
+from cpu.alu import alu_fun
+from cpu.cosim import cosim
+from cpu.fibo import program as fibo
+
+SALIDAS = ("ctrl_mux_reg_k_o", "ctrl_mux_alu_mem_o", "we_reg_file_o", "ce_status_reg_o",
+           "inc_pc_o", "wr_mem_o", "rd_mem_o", "jmp_o", "call_o", "ret_o")
+
+def salidas_deco(tabla) :
+    """Simula el decodificador para todos los opcodes y valores de status
+
+    :Retorna: lista con las salidas de control para cada (opcode, status)
+    """
+
+    ir = Signal(intbv(0)[16:])
+    status = Signal(intbv(0)[2:])
+    s = dict((nombre, Signal(False)) for nombre in SALIDAS)
+    s["alu_fun_o"] = Signal(alu_fun.ALU_OPA)
+    s["addr_a_o"] = Signal(intbv(0)[3:])
+    s["addr_b_o"] = Signal(intbv(0)[3:])
+    s["k_o"] = Signal(intbv(0)[8:])
+    s["pck_o"] = Signal(intbv(0)[11:])
+
+    dut = inst_deco(ir_i = ir, status_reg_i = status, tabla = tabla, **s)
+
+    res = []
+
+    @instance
+    def estimulo() :
+        for opcode in range(32) :
+            for st in range(4) :
+                ir.next = (opcode << 11) | 0x5A5
+                status.next = st
+                yield delay(1)
+                res.append(tuple(bool(s[nombre]) for nombre in SALIDAS) +
+                           (s["alu_fun_o"].val, int(s["k_o"]), int(s["pck_o"])))
+        raise StopSimulation
+
+    Simulation(dut, estimulo).run()
+    return res
+
+
+class Test_inst_deco(unittest.TestCase) :
+
+    def test_tabla(self) :
+        """El modo tabla coincide con la decodificacion if/elif"""
+        self.assertEqual(salidas_deco(True), salidas_deco(False))
+
+    def test_cosim(self) :
+        """El TZR1 con decodificador por tabla coincide con el ISS"""
+        self.assertEqual(cosim(fibo, 2000, paso = 250, deco_tabla = True), None)
+
+if __name__ == "__main__" :
+    unittest.main()
+
+# vim: set ts=8 sw=4 tw=0 et :
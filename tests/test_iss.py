@@ -0,0 +1,78 @@
+# test_iss.py
+# ===========
+#
+# Test para el simulador del set de instrucciones del TZR1
+#
+##############################################################################
+
+import unittest
+from cpu.iss import TZR1_ISS
+from cpu.instruction_set import *
+from cpu.fibo import program as fibo
+from cpu.contador import program as contador
+
+def inst(op, ra = 0, rb = 0, k = 0) :
+    return (op << 11) + (ra << 8) + (rb << 5) + k
+
+class Test_ISS(unittest.TestCase) :
+
+    def test_fibo(self) :
+        """Secuencia de Fibonacci (mod 256) en una corrida larga"""
+        iss = TZR1_ISS(fibo)
+        iss.run(2)                      # mov r0, 1 ; mov r1, 1
+        a, b = 1, 1
+        for i in range(20000) :
+            self.assertEqual(iss.pc, 2)
+            self.assertEqual(iss.regs[:2], [a, b])
+            iss.run(5)                  # una vuelta del lazo suma5
+            a, b = b, (a + b) & 0xFF
+        self.assertEqual(iss.ciclos, 2 + 5 * 20000)
+
+    def test_flags(self) :
+        """Carry y zero segun la ALU de 8 bits"""
+        prog = (inst(MOV_RA_K, 0, k = 200),
+                inst(ADD_RA_K, 0, k = 56),      # 256 -> r0 = 0, C = 1, Z = 0
+                inst(SUB_RA_K, 0, k = 1),       # -1  -> r0 = 255, C = 1, Z = 0
+                inst(MOV_RA_Addr_K, 1, k = 3),  # no modifica el status
+                inst(SHR_RA, 1),
+                inst(NOP))
+        iss = TZR1_ISS(prog)
+        iss.run(2)
+        self.assertEqual((iss.regs[0], iss.carry, iss.zero), (0, 1, 0))
+        iss.run(1)
+        self.assertEqual((iss.regs[0], iss.carry, iss.zero), (255, 1, 0))
+        iss.run(1)
+        self.assertEqual(iss.status, 2)
+        iss.run(1)
+        self.assertEqual((iss.regs[1], iss.carry, iss.zero), (0, 0, 1))
+
+    def test_call_ret(self) :
+        """El stack de retorno es circular de 16 posiciones"""
+        prog = tuple(inst(CALL_PCK, k = i + 1) for i in range(20)) + (inst(RET),)
+        iss = TZR1_ISS(prog)
+        iss.run(20)
+        self.assertEqual(iss.pc, 20)
+        self.assertEqual(iss.sp, 20 % 16)
+        iss.run(1)
+        self.assertEqual(iss.pc, 20)    # retorna a la instruccion siguiente al ultimo call
+        iss.run(1)
+        self.assertEqual(iss.pc, 19)
+
+    def test_mem(self) :
+        """Lectura y escritura de la memoria de datos"""
+        mem = bytearray(256)
+        iss = TZR1_ISS(contador, mem = mem)
+        self.assertEqual(iss.bus()[1:], (5, False, False))
+        iss.run(1)
+        self.assertEqual(iss.bus(), (1, 5, True, False))   # mov [1], r0
+        iss.run(1)
+        self.assertEqual(mem[1], 5)
+        self.assertEqual(iss.bus()[2:], (False, True))     # mov r1, [0]
+        mem[0] = 1
+        iss.run(1)
+        self.assertEqual(iss.regs[1], 1)
+
+if __name__ == "__main__" :
+    unittest.main()
+
+# vim: set ts=8 sw=4 tw=0 et :
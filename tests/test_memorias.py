@@ -0,0 +1,256 @@
+# test_memorias.py
+# ================
+#
+# Test de las RAM de Memorias.py con el modelo de Signals y con el de array
+#
+##############################################################################
+
+import unittest
+import random
+import os
+import shutil
+import tempfile
+from array import array
+from myhdl import *
+from Memorias import RAM_SP, RAM_DP
+from imagen_mem import escribir_bin, escribir_readmemh, cargar_bin, cargar_readmemh
+from cpu.TZR1_core import TZR1
+from cpu.iss import TZR1_ISS
+from cpu.fibo import program as fibo
+
+def traza_sp(sim_array, m, semilla) :
+    """Estimulo aleatorio sobre un RAM_SP, retorna la secuencia de d_o"""
+
+    r = random.Random(semilla)
+    clk = Signal(False)
+    ena, rst, we = [Signal(False) for i in range(3)]
+    addr = Signal(intbv(0)[4:])
+    d_i = Signal(intbv(0)[m:]) if m > 1 else Signal(False)
+    d_o = Signal(intbv(0)[m:]) if m > 1 else Signal(False)
+    traza = []
+
+    dut = RAM_SP(clk, ena, rst, we, addr, d_i, d_o, sim_array = sim_array)
+
+    @instance
+    def estimulo() :
+        for i in range(500) :
+            ena.next = r.random() < 0.9
+            rst.next = r.random() < 0.1
+            we.next = r.random() < 0.4
+            addr.next = r.randrange(16)
+            d_i.next = r.randrange(2**m)
+            yield delay(5)
+            clk.next = 1
+            yield delay(5)
+            clk.next = 0
+            traza.append(int(d_o))
+        raise StopSimulation
+
+    Simulation(dut, estimulo).run()
+    return traza
+
+
+def traza_dp(sim_array, semilla, mismo_clk) :
+    """Estimulo aleatorio sobre un RAM_DP, con los dos puertos en el mismo
+    clock (lecturas y escrituras simultaneas) o con clocks distintos"""
+
+    r = random.Random(semilla)
+    clkA = Signal(False)
+    clkB = clkA if mismo_clk else Signal(False)
+    enaA, rstA, weA, enaB, rstB, weB = [Signal(False) for i in range(6)]
+    addrA, addrB = [Signal(intbv(0)[3:]) for i in range(2)]
+    dA_i, dA_o, dB_i, dB_o = [Signal(intbv(0)[8:]) for i in range(4)]
+    traza = []
+
+    dut = RAM_DP(clkA, enaA, rstA, weA, addrA, dA_i, dA_o,
+                 clkB, enaB, rstB, weB, addrB, dB_i, dB_o, sim_array = sim_array)
+
+    @instance
+    def estimulo() :
+        for i in range(500) :
+            enaA.next = r.random() < 0.9
+            enaB.next = r.random() < 0.9
+            rstA.next = r.random() < 0.05
+            rstB.next = r.random() < 0.05
+            weA.next = r.random() < 0.5
+            weB.next = r.random() < 0.5
+            addrA.next = r.randrange(8)
+            addrB.next = r.randrange(8)
+            if mismo_clk and addrA.next == addrB.next :
+                weB.next = False            # Colision de escrituras : indefinido
+            dA_i.next = r.randrange(256)
+            dB_i.next = r.randrange(256)
+            yield delay(5)
+            clkA.next = 1
+            if not mismo_clk :
+                yield delay(2)
+                clkB.next = 1
+            yield delay(5)
+            clkA.next = 0
+            clkB.next = 0
+            traza.append((int(dA_o), int(dB_o)))
+        raise StopSimulation
+
+    Simulation(dut, estimulo).run()
+    return traza
+
+
+class Test_memorias(unittest.TestCase) :
+
+    def test_ram_sp(self) :
+        """RAM_SP : el modelo con array tiene la misma temporizacion"""
+        for m in (1, 8, 40) :
+            self.assertEqual(traza_sp(True, m, m), traza_sp(False, m, m))
+
+    def test_ram_dp(self) :
+        """RAM_DP : lectura durante escritura entre puertos y reset sincronico"""
+        for mismo_clk in (True, False) :
+            self.assertEqual(traza_dp(True, 7, mismo_clk), traza_dp(False, 7, mismo_clk))
+
+    def test_ram_grande(self) :
+        """RAM de 64Ki palabras con array : escritura y lectura en los extremos"""
+        clk, ena, rst, we = [Signal(False) for i in range(4)]
+        addr = Signal(intbv(0)[16:])
+        d_i, d_o = [Signal(intbv(0)[16:]) for i in range(2)]
+        dut = RAM_SP(clk, ena, rst, we, addr, d_i, d_o, sim_array = True)
+        leido = []
+
+        @instance
+        def estimulo() :
+            ena.next = True
+            for w, a, d in ((1, 0xFFFF, 0xABCD), (1, 0, 0x1234), (0, 0xFFFF, 0), (0, 0, 0)) :
+                we.next = w
+                addr.next = a
+                d_i.next = d
+                yield delay(5)
+                clk.next = 1
+                yield delay(5)
+                clk.next = 0
+                leido.append(int(d_o))
+            raise StopSimulation
+
+        Simulation(dut, estimulo).run()
+        self.assertEqual(leido, [0xABCD, 0x1234, 0xABCD, 0x1234])
+
+    def setUp(self) :
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self) :
+        shutil.rmtree(self.tmp)
+
+    def leer_sp(self, direcciones, **kw) :
+        """Lee las `direcciones` de un RAM_SP de 1Ki x 16 y escribe 0xBEEF en la ultima"""
+        clk, ena, rst, we = [Signal(False) for i in range(4)]
+        addr = Signal(intbv(0)[10:])
+        d_i, d_o = [Signal(intbv(0)[16:]) for i in range(2)]
+        dut = RAM_SP(clk, ena, rst, we, addr, d_i, d_o, **kw)
+        leido = []
+
+        @instance
+        def estimulo() :
+            ena.next = True
+            for a in direcciones :
+                addr.next = a
+                yield delay(5)
+                clk.next = 1
+                yield delay(5)
+                clk.next = 0
+                leido.append(int(d_o))
+            we.next = True
+            d_i.next = 0xBEEF
+            yield delay(5)
+            clk.next = 1
+            yield delay(5)
+            raise StopSimulation
+
+        Simulation(dut, estimulo).run()
+        return leido
+
+    def test_init_file(self) :
+        """Carga inicial desde binario y desde $readmemh, con los dos modelos"""
+        datos = [(i * 7919) & 0xFFFF for i in range(1000)]
+        img = os.path.join(self.tmp, "img.bin")
+        mem = os.path.join(self.tmp, "img.mem")
+        escribir_bin(datos, img)
+        escribir_readmemh(datos, mem)
+        direcciones = [0, 1, 500, 999, 1000, 1023]
+        esperado = [datos[0], datos[1], datos[500], datos[999], 0, 0]
+        for archivo in (img, mem) :
+            for sim_array in (False, True) :
+                self.assertEqual(self.leer_sp(direcciones, init_file = archivo, sim_array = sim_array),
+                                 esperado)
+
+    def test_readmemh(self) :
+        """Comentarios y directivas @addr de $readmemh"""
+        mem = os.path.join(self.tmp, "img.mem")
+        f = open(mem, "w")
+        f.write("// tabla\n0001 0002\n@10 00_ff // fin\n@1\nabcd\n")
+        f.close()
+        esperado = [1, 0xABCD] + [0] * 14 + [0xFF]
+        self.assertEqual(list(cargar_readmemh(mem)), esperado)
+
+    def test_dump_file(self) :
+        """El dump_file queda con el contenido de la RAM"""
+        img = os.path.join(self.tmp, "img.bin")
+        dump = os.path.join(self.tmp, "dump.bin")
+        escribir_bin([1, 2, 3], img)
+        self.leer_sp([1023], sim_array = True, init_file = img, dump_file = dump)
+        contenido = cargar_bin(dump)
+        self.assertEqual(len(contenido), 1024)
+        self.assertEqual(list(contenido[:4]), [1, 2, 3, 0])
+        self.assertEqual(contenido[1023], 0xBEEF)
+
+        with self.assertRaises(ValueError) :
+            self.leer_sp([0], dump_file = dump)
+
+    def test_conversion(self) :
+        """La conversion a Verilog incluye el contenido inicial"""
+        img = os.path.join(self.tmp, "img.bin")
+        escribir_bin([0x1234, 0xABCD], img)
+        clk, ena, rst, we = [Signal(False) for i in range(4)]
+        addr = Signal(intbv(0)[2:])
+        d_i, d_o = [Signal(intbv(0)[16:]) for i in range(2)]
+
+        toVerilog.directory = self.tmp
+        toVerilog.initial_values = True
+        try :
+            toVerilog(RAM_SP, clk, ena, rst, we, addr, d_i, d_o, init_file = img)
+        finally :
+            toVerilog.directory = None
+            toVerilog.initial_values = False
+
+        f = open(os.path.join(self.tmp, "RAM_SP.v"))
+        verilog = f.read()
+        f.close()
+        self.assertTrue("4660" in verilog and "43981" in verilog)     # 0x1234 y 0xABCD
+
+    def test_rom_tzr1(self) :
+        """El programa del TZR1 se carga desde un binario"""
+        img = os.path.join(self.tmp, "fibo.bin")
+        escribir_bin(fibo, img)
+        clk, rst, wr, rd = [Signal(False) for i in range(4)]
+        addr, data_i, data_o = [Signal(intbv(0)[8:]) for i in range(3)]
+        sondas = {}
+        micro = TZR1(clk, rst, addr, data_i, data_o, wr, rd, program = None, sondas = sondas,
+                     init_file = img)
+        regs = []
+
+        @instance
+        def estimulo() :
+            for i in range(100) :
+                yield delay(5)
+                clk.next = 1
+                yield delay(5)
+                clk.next = 0
+            regs.extend(int(r) for r in sondas["regs"])
+            raise StopSimulation
+
+        Simulation(micro, estimulo).run()
+        iss = TZR1_ISS(fibo)
+        iss.run(100)
+        self.assertEqual(regs, iss.regs)
+
+if __name__ == "__main__" :
+    unittest.main()
+
+# vim: set ts=8 sw=4 tw=0 et :
@@ -0,0 +1,175 @@
+# test_mult.py
+# ============
+#
+# Test de los multiplicadores de Aritmeticos.py
+#
+##############################################################################
+
+import unittest
+import random
+from myhdl import *
+from Aritmeticos import MULT_Booth, MULT_Pipe
+
+def factor(n, con_signo) :
+    """Signal de n bits con o sin signo"""
+
+    if con_signo :
+        return Signal(intbv(0, -2**(n-1), 2**(n-1)))
+    else :
+        return Signal(intbv(0)[n:])
+
+def sim_booth(n, m, signo_a, signo_b) :
+    """
+    Multiplica todos los pares de factores de n x m bits, uno a continuacion
+    del otro. Devuelve la lista de errores (a, b, resultado) y el conjunto de
+    duraciones en clocks (desde el flanco que toma ini_i hasta fin_o)
+    """
+
+    clk = Signal(False)
+    rst = Signal(False)
+    ini = Signal(False)
+    fin = Signal(False)
+    a = factor(n, signo_a)
+    b = factor(m, signo_b)
+    resul = factor(n + m, signo_a or signo_b)
+    errores = []
+    ciclos = set()
+
+    dut = MULT_Booth(clk_i = clk,
+                     rst_i = rst,
+                     ini_i = ini,
+                     a_i = a,
+                     b_i = b,
+                     fin_o = fin,
+                     resul_o = resul)
+
+    @always(delay(10))
+    def clk_gen() :
+        clk.next = not clk
+
+    @instance
+    def stimulus() :
+        rst.next = True
+        yield clk.negedge
+        rst.next = False
+        for x in range(a.min, a.max) :
+            for y in range(b.min, b.max) :
+                yield clk.negedge
+                a.next = x
+                b.next = y
+                ini.next = True
+                yield clk.posedge
+                t_ini = now()
+                yield clk.negedge
+                ini.next = False
+                yield fin.posedge
+                ciclos.add((now() - t_ini) // 20)
+                if resul != x * y :
+                    errores.append((x, y, int(resul)))
+                yield fin.negedge     # vuelve a INI
+        raise StopSimulation
+
+    Simulation(dut, clk_gen, stimulus).run(quiet = 1)
+
+    return errores, ciclos
+
+def sim_pipe(n, m, signo_a, signo_b, etapas, muestras = 300, semilla = 0) :
+    """
+    Entra un par al azar por clock (con burbujas) en MULT_Pipe. Devuelve la
+    lista de resultados (tag, resultado, latencia en clocks) y los pares
+    """
+
+    rnd = random.Random(semilla)
+    clk = Signal(False)
+    rst = Signal(False)
+    a = factor(n, signo_a)
+    b = factor(m, signo_b)
+    resul = factor(n + m, signo_a or signo_b)
+    valid_i = Signal(False)
+    valid_o = Signal(False)
+    tag_i = Signal(intbv(0)[10:])
+    tag_o = Signal(intbv(0)[10:])
+    pares = [(rnd.randrange(a.min, a.max), rnd.randrange(b.min, b.max)) for i in range(muestras)]
+    t_ent = {}
+    salidas = []
+
+    dut = MULT_Pipe(clk_i = clk,
+                    rst_i = rst,
+                    a_i = a,
+                    b_i = b,
+                    valid_i = valid_i,
+                    tag_i = tag_i,
+                    resul_o = resul,
+                    valid_o = valid_o,
+                    tag_o = tag_o,
+                    etapas = etapas)
+
+    @always(delay(10))
+    def clk_gen() :
+        clk.next = not clk
+
+    @instance
+    def stimulus() :
+        rst.next = True
+        yield clk.negedge
+        rst.next = False
+        i = 0
+        while i < muestras :
+            yield clk.negedge
+            valid_i.next = rnd.random() < 0.8
+            a.next, b.next = pares[i]
+            tag_i.next = i
+            yield clk.posedge
+            if valid_i :
+                t_ent[i] = now()
+                i += 1
+        yield clk.negedge
+        valid_i.next = False
+        for i in range(etapas + 1) :
+            yield clk.posedge
+        raise StopSimulation
+
+    @instance
+    def monitor() :
+        while True :
+            yield clk.posedge
+            if valid_o :
+                i = int(tag_o)
+                salidas.append((i, int(resul), (now() - t_ent[i]) // 20))
+
+    Simulation(dut, clk_gen, stimulus, monitor).run(quiet = 1)
+
+    return salidas, pares
+
+class Test_MULT_Booth(unittest.TestCase) :
+
+    def test_producto(self) :
+        """Todos los productos con factores con y sin signo, m par e impar"""
+
+        for n, m in ((4, 4), (3, 5), (5, 3)) :
+            for signo_a in (False, True) :
+                for signo_b in (False, True) :
+                    errores, ciclos = sim_booth(n, m, signo_a, signo_b)
+                    self.assertEqual(errores, [], (n, m, signo_a, signo_b, errores[:4]))
+                    # ceil(m/2) clocks
+                    self.assertEqual(ciclos, set([(m + 1) // 2]))
+
+class Test_MULT_Pipe(unittest.TestCase) :
+
+    def test_stream(self) :
+        """Un producto por clock, en orden, con latencia igual a etapas"""
+
+        for etapas in (1, 2, 3, 4) :
+            for signo_a, signo_b in ((False, False), (True, False), (False, True), (True, True)) :
+                salidas, pares = sim_pipe(6, 5, signo_a, signo_b, etapas)
+                self.assertEqual([i for i, r, l in salidas], range(len(pares)))
+                for i, r, l in salidas :
+                    self.assertEqual(r, pares[i][0] * pares[i][1])
+                    self.assertEqual(l, etapas)
+
+        self.assertRaises(ValueError, sim_pipe, 4, 4, False, False, 0)
+
+if __name__ == "__main__" :
+    unittest.main()
+
+# vim: set ts=8 sw=4 tw=0 et :
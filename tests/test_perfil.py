@@ -0,0 +1,133 @@
+# test_perfil.py
+# ==============
+#
+# Test del profiler del TZR1
+#
+##############################################################################
+
+import unittest
+import os
+from myhdl import *
+import cpu
+from cpu.perfil import Perfil, sonda_perfil
+from cpu.iss import TZR1_ISS
+from cpu.TZR1_core import TZR1
+from cpu.TZR1_pipe import TZR1_pipe
+from cpu.asm import assemble
+from cpu import fibo
+
+DIR_CPU = os.path.dirname(cpu.__file__)
+
+# Programa con llamadas anidadas, saltos condicionales y accesos a memoria
+PRUEBA = """
+        mov r0, 3
+lazo :  call f1
+        mov [r0], r0
+        sub r0, 1
+        jz fin
+        jmp lazo
+fin :   mov r1, [2]
+        jmp fin
+f1 :    call f2
+        ret
+f2 :    ret
+"""
+
+def perfil_rtl(nucleo, program, ciclos) :
+    """Simula `ciclos` clocks del nucleo con la sonda del profiler"""
+
+    perfil = Perfil(program)
+    mem = bytearray(256)
+
+    clk = Signal(False)
+    rst = Signal(False)
+    wr = Signal(False)
+    rd = Signal(False)
+    addr = Signal(intbv(0)[8:])
+    data_i = Signal(intbv(0)[8:])
+    data_o = Signal(intbv(0)[8:])
+    sondas = {}
+
+    micro = nucleo(clk_i = clk, rst_i = rst, addr_o = addr, data_i = data_i, data_o = data_o,
+                   write_o = wr, read_o = rd, program = program, sondas = sondas)
+
+    sonda = sonda_perfil(clk_i = clk, sondas = sondas, addr_o = addr, write_o = wr,
+                         read_o = rd, perfil = perfil)
+
+    @always(delay(2))
+    def gen_clk() :
+        clk.next = not clk
+
+    @always(clk.posedge)
+    def mem_escritura() :
+        if wr :
+            mem[int(addr)] = int(data_o)
+
+    @always(addr, clk.negedge)
+    def mem_lectura() :
+        data_i.next = mem[int(addr)]
+
+    @instance
+    def fin() :
+        yield delay(4 * ciclos)
+        raise StopSimulation
+
+    Simulation(micro, sonda, gen_clk, mem_escritura, mem_lectura, fin).run()
+
+    return perfil
+
+
+class Test_perfil(unittest.TestCase) :
+
+    def test_iss(self) :
+        """Estadisticas del ISS"""
+        prog = assemble(PRUEBA)
+        perfil = Perfil(prog)
+        iss = TZR1_ISS(prog, perfil = perfil)
+        iss.run(40)
+
+        self.assertEqual(perfil.ciclos, 40)
+        self.assertEqual(perfil.ejecuciones[:6], [1, 3, 3, 3, 3, 2])
+        self.assertEqual((perfil.tomados, perfil.no_tomados), ({4 : 1}, {4 : 2}))
+        self.assertEqual(perfil.prof_max, 2)
+        self.assertEqual(perfil.escrituras[1 : 4], [1, 1, 1])
+        self.assertEqual(perfil.lecturas[2], perfil.ejecuciones[6])
+        self.assertEqual(perfil.mezcla()["CALL_PCK"], 6)
+
+    def test_stack(self) :
+        """Se detecta el desborde del stack de retorno"""
+        prog = assemble("inicio : call inicio\n")
+        perfil = Perfil(prog, stack_size = 4)
+        TZR1_ISS(prog, stack_size = 4, perfil = perfil).run(5)
+        self.assertEqual(perfil.prof_max, 5)
+        self.assertTrue(perfil.desborde_stack())
+
+    def test_rtl(self) :
+        """La sonda del RTL registra lo mismo que el ISS"""
+        prog = assemble(PRUEBA)
+        for nucleo in (TZR1, TZR1_pipe) :
+            perfil = perfil_rtl(nucleo, prog, 100)
+            n = perfil.ciclos
+            self.assertTrue(n > 50)
+            ref = Perfil(prog)
+            TZR1_ISS(prog, perfil = ref).run(n)
+            for campo in ("ejecuciones", "tomados", "no_tomados", "prof_max", "lecturas", "escrituras") :
+                self.assertEqual(getattr(perfil, campo), getattr(ref, campo))
+
+    def test_reporte(self) :
+        """El reporte relaciona las direcciones con el fuente"""
+        perfil = Perfil(fibo.program)
+        TZR1_ISS(fibo.program, perfil = perfil).run(1000)
+        f = open(os.path.join(DIR_CPU, "fibo.asm"))
+        rep = perfil.reporte(f.read(), n = 3)
+        f.close()
+        lineas = rep.splitlines()
+        i = lineas.index("Direcciones mas ejecutadas")
+        self.assertTrue("suma5" in lineas[i + 2] and "add r0, r1" in lineas[i + 2])
+        self.assertTrue("suma5+1" in lineas[i + 3])
+        self.assertTrue("Profundidad maxima de llamadas : 0 (stack_size = 16)" in rep)
+
+if __name__ == "__main__" :
+    unittest.main()
+
+# vim: set ts=8 sw=4 tw=0 et :
@@ -0,0 +1,84 @@
+# test_pid.py
+# ===========
+#
+# Test del PID con los productos combinacionales y con MULT_Pipe
+#
+##############################################################################
+
+import unittest
+import random
+from myhdl import *
+from pid import PID
+
+def sim_pid(etapas_mult, periodo = 8, muestras = 200, semilla = 0) :
+    """
+    Simula el PID con un error al azar en cada pulso de update (cada
+    `periodo` clocks). Devuelve u_o antes del primer update y, por cada
+    update, la lista de u_o en los `periodo` clocks siguientes (despues de
+    cada flanco, desde el que toma update)
+    """
+
+    rnd = random.Random(semilla)
+    clk = Signal(False)
+    rst = Signal(False)
+    update = Signal(False)
+    e = Signal(intbv(0, -512, 512))
+    u = Signal(intbv(0, -256, 256))
+    salidas = []
+
+    dut = PID(clk_i = clk,
+              rst_i = rst,
+              update_i = update,
+              e_i = e,
+              u_o = u,
+              Kp = 2.34, Ki = 0.001, Kd = 0.0289,
+              N = 8,
+              etapas_mult = etapas_mult)
+
+    @always(delay(10))
+    def clk_gen() :
+        clk.next = not clk
+
+    @instance
+    def stimulus() :
+        rst.next = True
+        yield clk.negedge
+        rst.next = False
+        yield clk.negedge
+        salidas.append(int(u))
+        for i in range(muestras) :
+            e.next = rnd.randrange(-200, 200)
+            update.next = True
+            periodo_u = []
+            for j in range(periodo) :
+                yield clk.negedge
+                update.next = False
+                periodo_u.append(int(u))
+            salidas.append(periodo_u)
+        raise StopSimulation
+
+    Simulation(dut, clk_gen, stimulus).run(quiet = 1)
+
+    return salidas
+
+class Test_PID(unittest.TestCase) :
+
+    def test_mult_pipe(self) :
+        """Con MULT_Pipe la salida es la misma que sin pipeline, etapas clocks
+        despues de cada update, y no cambia mientras tanto"""
+
+        ref = sim_pid(0)
+        self.assertNotEqual(len(set(p[0] for p in ref[1:])), 1)
+        for etapas in (1, 2, 3) :
+            salidas = sim_pid(etapas)
+            anterior = salidas[0]
+            for periodo_ref, periodo_u in zip(ref[1:], salidas[1:]) :
+                # Latencia : se mantiene la salida anterior
+                self.assertEqual(periodo_u[:etapas], [anterior] * etapas)
+                self.assertEqual(periodo_u[etapas:], periodo_ref[etapas:])
+                anterior = periodo_u[-1]
+
+if __name__ == "__main__" :
+    unittest.main()
+
+# vim: set ts=8 sw=4 tw=0 et :
@@ -0,0 +1,63 @@
+# test_pipe.py
+# ============
+#
+# Test del TZR1 con pipeline, contra el ISS
+#
+##############################################################################
+
+import unittest
+import random
+from cpu.cosim import cosim_pipe
+from cpu.iss import TZR1_ISS
+from cpu.fibo import program as fibo
+from cpu.instruction_set import *
+
+class Test_pipe(unittest.TestCase) :
+
+    def test_fibo(self) :
+        """El pipeline y el ISS coinciden en el programa de Fibonacci"""
+        dif, cont = cosim_pipe(fibo, 2000)
+        self.assertEqual(dif, None)
+        self.assertEqual(cont["ciclos"], 2000)
+        self.assertEqual(cont["instrucciones"] + cont["burbujas"], 2000)
+
+    def test_random(self) :
+        """Programas aleatorios, comparando despues de cada instruccion"""
+        r = random.Random(4321)
+        for j in range(5) :
+            prog = []
+            for i in range(63) :
+                op = r.randrange(25)
+                if op in (4, 7, 8, 9) :     # call, jc, jmp, jz dentro del programa
+                    prog.append((op << 11) + r.randrange(64))
+                else :
+                    prog.append((op << 11) + r.randrange(2048))
+            prog.append(JMP_PCK << 11)
+            mem = bytearray(r.randrange(256) for i in range(256))
+            self.assertEqual(cosim_pipe(tuple(prog), 300, mem = mem)[0], None)
+
+    def test_cpi(self) :
+        """Sin saltos se completa una instruccion por clock, cada salto agrega una burbuja"""
+        prog = (MOV_RA_K << 11 | 1,) + (ADD_RA_RB << 11 | 1 << 8,) * 98 + (JMP_PCK << 11,)
+        dif, cont = cosim_pipe(prog, 1001)
+        self.assertEqual(dif, None)
+        # 1 ciclo de llenado, 10 vueltas de 100 instrucciones y 1 burbuja por vuelta
+        self.assertEqual(cont["instrucciones"], 990)
+        self.assertEqual(cont["burbujas"], 11)
+
+    def test_invalido(self) :
+        """Un opcode invalido detiene el micro"""
+        prog = (MOV_RA_K << 11 | 7, 31 << 11, MOV_RA_K << 11 | 8)
+        self.assertEqual(cosim_pipe(prog, 50)[0], None)
+
+    def test_divergencia(self) :
+        """Se informa el primer ciclo con diferencias"""
+        prog = list(fibo)
+        prog[0] += 1                        # mov r0, 2
+        dif, cont = cosim_pipe(fibo, 200, ref = TZR1_ISS(tuple(prog)))
+        self.assertEqual(dif[:2], (3, "regs"))
+
+if __name__ == "__main__" :
+    unittest.main()
+
+# vim: set ts=8 sw=4 tw=0 et :
@@ -26,8 +26,105 @@
 #############################################################################
 
 import unittest 
+import numpy as np
 from myhdl import *
-from udiv import udiv
+from udiv import udiv, udiv_pipe
+
+
+def vectores_udiv(n_bits, m_bits, cantidad = None, semilla = None) :
+    """
+    Vectores de prueba del divisor : todo el espacio de entradas de n x m bits
+    si `cantidad` es None, si no `cantidad` pares al azar. Devuelve los arrays
+    a, b y los resultados esperados q, r (calculados con np.divmod, 0 si b == 0)
+    """
+
+    if cantidad is None :
+        a, b = np.meshgrid(np.arange(2**n_bits), np.arange(2**m_bits), indexing = "ij")
+        a = a.ravel()
+        b = b.ravel()
+    else :
+        rnd = np.random.RandomState(semilla)
+        a = rnd.randint(0, 2**n_bits, cantidad)
+        b = rnd.randint(0, 2**m_bits, cantidad)
+
+    q, r = np.divmod(a, np.where(b == 0, 1, b))
+    q[b == 0] = 0
+    r[b == 0] = 0
+
+    return a, b, q, r
+
+
+def verifica_udiv(a, b, q, r, n_bits, m_bits, radix = 2) :
+    """
+    Simula udiv con los vectores de vectores_udiv, uno a continuacion del
+    otro : start_i se pone en alto en cuanto sube done_o. Los resultados se
+    guardan en arrays y se comparan juntos al final de la simulacion.
+    Devuelve los indices de los vectores que fallan (cociente, resto, div0 o
+    duracion distinta de ceil(n / log2(radix)) + 1 clocks desde el flanco
+    que toma start, o 0 con b == 0)
+    """
+
+    clk = Signal(False)
+    rst = Signal(False)
+    start = Signal(False)
+    done = Signal(False)
+    div0 = Signal(False)
+    a_s = Signal(intbv(0)[n_bits:])
+    b_s = Signal(intbv(0)[m_bits:])
+    q_s = Signal(intbv(0)[n_bits:])
+    r_s = Signal(intbv(0)[n_bits:])
+
+    dut = udiv(clk_i = clk, rst_i = rst, a_i = a_s, b_i = b_s, start_i = start,
+               q_o = q_s, r_o = r_s, done_o = done, div0_o = div0, radix = radix)
+
+    N = len(a)
+    q_obt = np.zeros(N, dtype = np.int64)
+    r_obt = np.zeros(N, dtype = np.int64)
+    div0_obt = np.zeros(N, dtype = bool)
+    ciclos = np.zeros(N, dtype = np.int64)
+
+    @always(delay(10))
+    def clk_gen() :
+        clk.next = not clk
+
+    @instance
+    def stimulus() :
+        rst.next = True
+        yield delay(15)
+        rst.next = False
+
+        i = 0
+        a_s.next = int(a[0])
+        b_s.next = int(b[0])
+        start.next = True
+        cuenta = 0
+        while i < N :
+            yield clk.posedge
+            yield delay(1)      # salidas del flanco ya actualizadas
+            start.next = False
+            cuenta += 1
+            if done :
+                q_obt[i] = q_s
+                r_obt[i] = r_s
+                div0_obt[i] = div0
+                ciclos[i] = cuenta - 1  # desde el flanco que toma start
+                cuenta = 0
+                i += 1
+                if i < N :
+                    a_s.next = int(a[i])
+                    b_s.next = int(b[i])
+                    start.next = True
+        raise StopSimulation
+
+    Simulation(dut, clk_gen, stimulus).run(quiet = 1)
+
+    k = {2 : 1, 4 : 2, 16 : 4}[radix]
+    ciclos_esp = np.where(b == 0, 0, (n_bits + k - 1) // k + 1)
+    cero = b == 0
+    ok = (div0_obt == cero) & (ciclos == ciclos_esp) & (cero | ((q_obt == q) & (r_obt == r)))
+
+    return np.flatnonzero(~ok)
+
 
 class Test_udiv(unittest.TestCase) :
 
@@ -151,6 +248,161 @@ class Test_udiv(unittest.TestCase) :
 
         Simulation(self.dut, self.clk_gen, stimulus).run()
 
+    def test_radix(self) :
+        """Test de division con 1, 2 y 4 bits del cociente por ciclo"""
+
+        casos = ((24, 5), (31, 1), (31, 15), (7, 9), (0, 3), (30, 7))
+
+        for radix, k in ((2, 1), (4, 2), (16, 4)) :
+            dut = udiv(clk_i = self.clk,
+                       rst_i = self.rst,
+                       start_i = self.start,
+                       a_i = self.a,
+                       b_i = self.b,
+                       done_o = self.done,
+                       div0_o = self.div0,
+                       q_o= self.q,
+                       r_o = self.r,
+                       radix = radix)
+
+            @instance
+            def stimulus() :
+                # Reset
+                yield delay(15)
+                self.rst.next = True
+                yield delay(15)
+                self.rst.next = False
+
+                n = len(self.q)
+                for a, b in casos :
+                    yield self.clk.negedge
+                    self.a.next = a
+                    self.b.next = b
+                    self.start.next = True
+                    yield self.clk.posedge
+                    t_ini = now()
+                    self.start.next = False
+                    yield self.done.posedge
+                    clocks = (now() - t_ini) / self.T_CLK
+                    self.assertEqual(self.q, a // b)
+                    self.assertEqual(self.r, a % b)
+                    # ceil(n / log2(radix)) + 1 clks
+                    self.assertEqual(clocks, (n + k - 1) // k + 1)
+
+                raise StopSimulation
+
+            Simulation(dut, self.clk_gen, stimulus).run()
+
+        self.assertRaises(ValueError, udiv, self.clk, self.rst, self.a, self.b,
+                          self.start, self.q, self.r, self.done, self.div0, radix = 8)
+
+class Test_udiv_vectores(unittest.TestCase) :
+
+    def falla(self, fallas, a, b) :
+        self.assertEqual(len(fallas), 0, "%d fallas, (a, b) = %s" %
+                         (len(fallas), list(zip(a[fallas[:8]], b[fallas[:8]]))))
+
+    def test_exhaustivo(self) :
+        """Todo el espacio de entradas de 5 x 4 bits, con 1, 2 y 4 bits por ciclo"""
+
+        a, b, q, r = vectores_udiv(5, 4)
+        for radix in (2, 4, 16) :
+            self.falla(verifica_udiv(a, b, q, r, 5, 4, radix), a, b)
+
+    def test_aleatorio(self) :
+        """Vectores al azar de 16 x 8 bits"""
+
+        a, b, q, r = vectores_udiv(16, 8, cantidad = 1000, semilla = 1)
+        for radix in (2, 4, 16) :
+            self.falla(verifica_udiv(a, b, q, r, 16, 8, radix), a, b)
+
+    def test_reporta_fallas(self) :
+        """Las fallas se reportan por indice de vector"""
+
+        a, b, q, r = vectores_udiv(5, 4)
+        q[100] += 1
+        self.assertEqual(list(verifica_udiv(a, b, q, r, 5, 4)), [100])
+
+class Test_udiv_pipe(unittest.TestCase) :
+
+    def test_stream(self) :
+        """Test del divisor con pipeline : un par por clock, tag y div0 por muestra"""
+
+        clk = Signal(False)
+        rst = Signal(False)
+        a = Signal(intbv(0)[5:])
+        b = Signal(intbv(0)[4:])
+        valid_i = Signal(False)
+        tag_i = Signal(intbv(0)[9:])
+        q = Signal(intbv(0)[5:])
+        r = Signal(intbv(0)[4:])
+        valid_o = Signal(False)
+        tag_o = Signal(intbv(0)[9:])
+        div0 = Signal(False)
+
+        dut = udiv_pipe(clk_i = clk,
+                        rst_i = rst,
+                        a_i = a,
+                        b_i = b,
+                        valid_i = valid_i,
+                        tag_i = tag_i,
+                        q_o = q,
+                        r_o = r,
+                        valid_o = valid_o,
+                        tag_o = tag_o,
+                        div0_o = div0)
+
+        n = len(a)
+        # Todo el espacio de entradas, el tag es el indice de la muestra
+        pares = [(x, y) for x in range(2**len(a)) for y in range(2**len(b))]
+        t_ent = {}
+        recibidos = []
+
+        @always(delay(10))
+        def clk_gen() :
+            clk.next = not clk
+
+        @instance
+        def stimulus() :
+            rst.next = True
+            yield delay(15)
+            rst.next = False
+            for i, (x, y) in enumerate(pares) :
+                # Una burbuja cada 7 muestras
+                if i % 7 == 6 :
+                    yield clk.negedge
+                    valid_i.next = False
+                yield clk.negedge
+                a.next = x
+                b.next = y
+                tag_i.next = i
+                valid_i.next = True
+                yield clk.posedge
+                t_ent[i] = now()
+            yield clk.negedge
+            valid_i.next = False
+            for i in range(n + 2) :
+                yield clk.posedge
+            raise StopSimulation
+
+        @instance
+        def monitor() :
+            while True :
+                yield clk.posedge
+                if valid_o :
+                    i = int(tag_o)
+                    x, y = pares[i]
+                    recibidos.append(i)
+                    # Latencia de n clocks
+                    self.assertEqual((now() - t_ent[i]) // 20, n)
+                    self.assertEqual(div0, y == 0)
+                    if y != 0 :
+                        self.assertEqual((q, r), divmod(x, y))
+
+        Simulation(dut, clk_gen, stimulus, monitor).run()
+
+        self.assertEqual(recibidos, range(len(pares)))
+
 if __name__ == "__main__" :
     unittest.main()
 
@@ -0,0 +1,460 @@
+# test_video.py
+# =============
+#
+# Test de los IP cores de video contra los modelos de referencia de
+# video/modelos.py
+#
+##############################################################################
+
+import unittest
+import os
+import itertools
+import zlib
+import shutil
+import tempfile
+import numpy as np
+from myhdl import *
+from video.vga import vga_sync, vga_sync_reg, vga_timing, MODOS_VGA
+from video.pal import pal_sync
+from video.Video import ITU_656_deco, char_gen_ROM
+from video.modelos import vga_ref, vga_timing_ref, cambios, verifica, VGA_H, VGA_V
+from video.modelos import pal_ref, flancos, registra_flancos, compara_flancos
+from video.modelos import PAL_LINEA, PAL_CAMPO, PAL_FRAME, PAL_HS_SYNC
+from video.modelos import itu656_xy, itu656_stream, itu656_deco_ref, driver_stream, verifica_stream
+from video.modelos import ITU_LINEA
+from video.modelos import glifos, codigos, texto_ref
+from rom_font import ROM_FONT
+from video.captura import Captura, sonda_captura
+
+# Timing chico para simular varios frames completos del vga_timing
+MODO_CHICO = (1.0, (8, 2, 3, 4), (5, 1, 2, 3), False, True)
+
+def sim_vga(ref, ciclos, n, modo = None, latencia = None) :
+    """Simula `n` ciclos del vga_sync (del vga_timing en `modo`, o del
+    vga_sync_reg con `latencia`) verificando contra `ref` en `ciclos`
+
+    :Retorna: lista de errores ``(ciclo, nombre, rtl, ref)``
+    """
+
+    clk, rst, hs, vs, act_vid = [Signal(False) for i in range(5)]
+    errores = []
+
+    if modo is None :
+        x = Signal(intbv(0, 0, 800))
+        y = Signal(intbv(0, 0, 600))
+        if latencia is None :
+            dut = vga_sync(clk50_i = clk, rst_i = rst, hs_o = hs, vs_o = vs,
+                           act_vid_o = act_vid, x_o = x, y_o = y)
+        else :
+            dut = vga_sync_reg(clk50_i = clk, rst_i = rst, hs_o = hs, vs_o = vs,
+                               act_vid_o = act_vid, x_o = x, y_o = y, latencia = latencia)
+    else :
+        h, v = MODOS_VGA.get(modo, modo)[1:3]
+        x = Signal(intbv(0, 0, h[0]))
+        y = Signal(intbv(0, 0, v[0]))
+        dut = vga_timing(clk_i = clk, rst_i = rst, hs_o = hs, vs_o = vs,
+                         act_vid_o = act_vid, x_o = x, y_o = y, modo = modo)
+
+    chk = verifica(clk_i = clk, rst_i = rst,
+                   salidas = {"hs" : hs, "vs" : vs, "act_vid" : act_vid, "x" : x, "y" : y},
+                   ref = ref, ciclos = ciclos, errores = errores)
+
+    @instance
+    def estimulo() :
+        rst.next = True
+        yield delay(15)
+        rst.next = False
+        for i in range(n + 1) :
+            yield delay(5)
+            clk.next = 1
+            yield delay(5)
+            clk.next = 0
+        raise StopSimulation
+
+    Simulation(dut, chk, estimulo).run()
+    return errores
+
+
+class Test_vga(unittest.TestCase) :
+
+    def test_ref(self) :
+        """El modelo tiene los pulsos y el area activa del 800x600"""
+        ref = vga_ref(2)
+        n = sum(VGA_H) * sum(VGA_V)
+        self.assertEqual(len(ref["hs"]), 2 * n)
+        self.assertEqual(ref["act_vid"].sum(), 2 * 800 * 600)
+        self.assertEqual(ref["hs"].sum(), 2 * 120 * sum(VGA_V))
+        self.assertEqual(ref["vs"].sum(), 2 * 6 * sum(VGA_H))
+        self.assertEqual(ref["x"].max(), 799)
+        self.assertEqual(ref["y"].max(), 599)
+        # Las coordenadas recorren el area activa en orden
+        act = ref["act_vid"][:n]
+        self.assertTrue((ref["x"][:n][act] == np.tile(np.arange(800), 600)).all())
+        self.assertTrue((ref["y"][:n][act] == np.repeat(np.arange(600), 800)).all())
+
+    def test_rtl(self) :
+        """El RTL coincide con el modelo en todos los cambios de las primeras lineas activas"""
+        ref = vga_ref()
+        n = sum(VGA_H) * 46
+        ciclos = cambios(ref)
+        ciclos = ciclos[ciclos < n]
+        self.assertTrue(len(ciclos) > 100)
+        self.assertEqual(sim_vga(ref, ciclos, n), [])
+
+    def test_regresion(self) :
+        """Un corrimiento del timing se detecta"""
+        ref = vga_ref(h = (119, 56, 800, 65))
+        n = sum(VGA_H) * 2
+        ciclos = cambios(ref)
+        errores = sim_vga(ref, ciclos[ciclos < n], n)
+        self.assertTrue(("hs" in [e[1] for e in errores]))
+
+
+class Test_vga_sync_reg(unittest.TestCase) :
+
+    def test_latencias(self) :
+        """Mismo timing que el modelo, retrasado `latencia` ciclos"""
+        n = sum(VGA_H) * 46
+        for latencia in (0, 1, 3) :
+            ref = vga_ref(latencia = latencia)
+            ciclos = cambios(ref)
+            self.assertEqual(sim_vga(ref, ciclos[ciclos < n], n, latencia = latencia), [])
+
+    def test_conversion(self) :
+        """Se convierte a Verilog con y sin etapas de retardo"""
+        tmp = tempfile.mkdtemp()
+        clk, rst, hs, vs, act_vid = [Signal(False) for i in range(5)]
+        x = Signal(intbv(0, 0, 800))
+        y = Signal(intbv(0, 0, 600))
+        toVerilog.directory = tmp
+        try :
+            for latencia in (0, 1, 4) :
+                toVerilog(vga_sync_reg, clk, rst, hs, vs, act_vid, x, y, latencia = latencia)
+        finally :
+            toVerilog.directory = None
+            shutil.rmtree(tmp)
+
+
+class Test_vga_timing(unittest.TestCase) :
+
+    def test_tabla(self) :
+        """Los modos de la tabla dan la frecuencia de refresco nominal"""
+        for nombre, (pix_clk, h, v, pol_h, pol_v) in MODOS_VGA.items() :
+            refresco = float(nombre.split("@")[1])
+            self.assertAlmostEqual(pix_clk * 1e6 / (sum(h) * sum(v)), refresco, delta = 0.25)
+            ref = vga_timing_ref(1, nombre)
+            self.assertEqual(ref["act_vid"].sum(), h[0] * v[0])
+            self.assertEqual((ref["hs"] == pol_h).sum(), h[2] * sum(v))
+            self.assertEqual((ref["vs"] == pol_v).sum(), v[2] * sum(h))
+
+    def test_chico(self) :
+        """Tres frames completos de un timing a medida, verificados en todos los ciclos"""
+        ref = vga_timing_ref(3, MODO_CHICO)
+        n = len(ref["hs"])
+        self.assertEqual(sim_vga(ref, range(n), n, MODO_CHICO), [])
+
+    def test_modos(self) :
+        """Las primeras lineas de cada modo de la tabla coinciden con el modelo"""
+        for nombre, (pix_clk, h, v, pol_h, pol_v) in MODOS_VGA.items() :
+            ref = vga_timing_ref(1, nombre)
+            n = sum(h) * 3
+            ciclos = cambios(ref)
+            self.assertEqual(sim_vga(ref, ciclos[ciclos < n], n, nombre), [])
+
+    def test_conversion(self) :
+        """Se convierte a Verilog"""
+        tmp = tempfile.mkdtemp()
+        clk, rst, hs, vs, act_vid = [Signal(False) for i in range(5)]
+        x = Signal(intbv(0, 0, 1920))
+        y = Signal(intbv(0, 0, 1080))
+        toVerilog.directory = tmp
+        try :
+            toVerilog(vga_timing, clk, rst, hs, vs, act_vid, x, y, modo = "1920x1080@60")
+        finally :
+            toVerilog.directory = None
+            shutil.rmtree(tmp)
+
+
+def sim_pal(n) :
+    """Simula `n` ciclos del pal_sync registrando los flancos de las salidas
+
+    :Retorna: dict nombre -> lista de flancos ``(ciclo, valor)``
+    """
+
+    clk, rst, mix_sync, vs, hs, odd_even = [Signal(False) for i in range(6)]
+    registro = {}
+
+    dut = pal_sync(clk27_i = clk, rst_i = rst, mix_sync_o = mix_sync,
+                   odd_even_o = odd_even, vs_o = vs, hs_o = hs)
+
+    chk = registra_flancos(clk_i = clk, rst_i = rst,
+                           salidas = {"mix_sync" : mix_sync, "vs" : vs, "hs" : hs, "odd_even" : odd_even},
+                           periodo = 10, registro = registro)
+
+    @instance
+    def estimulo() :
+        rst.next = True
+        yield delay(15)
+        rst.next = False
+        for i in range(n + 1) :
+            yield delay(5)
+            clk.next = 1
+            yield delay(5)
+            clk.next = 0
+        raise StopSimulation
+
+    Simulation(dut, chk, estimulo).run()
+    return registro
+
+
+class Test_pal(unittest.TestCase) :
+
+    def test_ref(self) :
+        """El modelo tiene 625 lineas entrelazadas por frame"""
+        ref = pal_ref(2)
+        self.assertEqual(len(ref["mix_sync"]), 2 * PAL_FRAME)
+        self.assertEqual(ref["odd_even"].sum(), 2 * PAL_CAMPO)
+        self.assertEqual(len(flancos(ref["hs"])[0]), 2 * 2 * 625 - 1)
+        # Dos pulsos de vs por frame : del primer pulso vertical al segundo de post ecualizacion
+        ciclos, valores = flancos(ref["vs"])
+        self.assertEqual(len(ciclos), 2 * 4)
+        self.assertEqual(list(valores[:4]), [False, True, False, True])
+        self.assertEqual(ciclos[1] - ciclos[0], 3 * PAL_LINEA + int(2.3 * 27) - int(27.3 * 27))
+        self.assertEqual(ciclos[2] - ciclos[0], PAL_CAMPO)
+        # 320 pulsos de mix_sync por campo : 5 verticales, 10 de ecualizacion
+        # y 305 lineas (304 y media en el campo par). El primero no se ve
+        bajadas = flancos(ref["mix_sync"])[0][::2]
+        self.assertEqual(len(bajadas), 2 * 2 * 320 - 1)
+
+    def test_rtl(self) :
+        """Los flancos del RTL en un frame completo (los dos campos, las medias
+        lineas del entrelazado) y el comienzo del siguiente coinciden con el modelo"""
+        n = PAL_FRAME + 40 * PAL_LINEA
+        registro = sim_pal(n)
+        # Los pulsos de vs de los dos campos y del frame siguiente
+        self.assertEqual(len([c for c, v in registro["vs"] if not v]), 3)
+        self.assertIn((PAL_FRAME, 1), registro["odd_even"])     # vuelta al campo impar
+        self.assertEqual(compara_flancos(registro, pal_ref(2), n, {"hs" : PAL_HS_SYNC}), [])
+
+    def test_regresion(self) :
+        """Un pulso de sincronismo de linea mas largo se detecta"""
+        n = 12 * PAL_LINEA
+        ref = pal_ref()
+        ref["hs"] = np.arange(PAL_FRAME) % PAL_LINEA > int(4.7 * 27)
+        errores = compara_flancos(sim_pal(n), ref, n, {"hs" : PAL_HS_SYNC})
+        self.assertTrue(len(errores) > 0)
+        self.assertEqual(set(e[1] for e in errores), set(["hs"]))
+
+
+def imagen_ycbcr(semilla) :
+    """Frame de 720x576 4:2:2 aleatorio, sin los valores reservados 0 y 255"""
+
+    r = np.random.RandomState(semilla)
+    return (r.randint(1, 255, (576, 720)).astype(np.uint8),
+            r.randint(1, 255, (576, 360)).astype(np.uint8),
+            r.randint(1, 255, (576, 360)).astype(np.uint8))
+
+
+class Test_itu656(unittest.TestCase) :
+
+    def test_xy(self) :
+        """Bits de proteccion de los codigos SAV/EAV"""
+        self.assertEqual([itu656_xy(f, v, h) for f in (0, 1) for v in (0, 1) for h in (0, 1)],
+                         [0x80, 0x9D, 0xAB, 0xB6, 0xC7, 0xDA, 0xEC, 0xF1])
+
+    def test_ref(self) :
+        """El decodificador de referencia recupera el frame generado"""
+        Y, Cb, Cr = imagen_ycbcr(1)
+        stream = itu656_stream(Y, Cb, Cr)
+        datos = np.fromiter(stream, dtype = np.uint8)
+        self.assertEqual(len(datos), 625 * ITU_LINEA)
+        ref = itu656_deco_ref(datos)
+        self.assertEqual(len(ref["x"]), 720 * 576)
+        for nombre, img in (("Y", Y), ("Cb", Cb.repeat(2, axis = 1)), ("Cr", Cr.repeat(2, axis = 1))) :
+            rec = np.zeros((576, 720), dtype = np.uint8)
+            rec[ref["y"], ref["x"]] = ref[nombre]
+            self.assertTrue((rec == img).all(), nombre)
+        # El campo impar lleva las filas pares
+        self.assertEqual(list(ref["y"][::720][:3]), [0, 2, 4])
+        self.assertEqual(ref["y"][288 * 720], 1)
+
+    def test_rtl(self) :
+        """ITU_656_deco contra la referencia en un frame completo de 720x576
+        (los dos campos y la supresion vertical), comparando a medida que decodifica"""
+        Y, Cb, Cr = imagen_ycbcr(2)
+        n = 625 * ITU_LINEA + 16      # el frame y el comienzo del siguiente
+        ref = itu656_deco_ref(np.fromiter(itu656_stream(Y, Cb, Cr), dtype = np.uint8))
+        self.assertEqual(len(ref["x"]), 720 * 576)
+        esperado = itertools.izip(ref["x"], ref["y"], ref["Y"], ref["Cb"], ref["Cr"])
+
+        clk, pix_ena, video_activo, ini_frame = [Signal(False) for i in range(4)]
+        data, Y_o, Cb_o, Cr_o = [Signal(intbv(0)[8:]) for i in range(4)]
+        x = Signal(intbv(0, 0, 1024))
+        y = Signal(intbv(0, 0, 1024))
+        errores = []
+        esperado = iter(esperado)
+
+        dut = ITU_656_deco(clk27_i = clk, data_i = data, pixel_x_o = x, pixel_y_o = y,
+                           pix_ena_o = pix_ena, video_activo_o = video_activo,
+                           Y_o = Y_o, Cb_o = Cb_o, Cr_o = Cr_o, ini_frame_o = ini_frame)
+        drv = driver_stream(clk_i = clk, data_o = data,
+                            stream = itertools.islice(itu656_stream(Y, Cb, Cr, frames = 2), n))
+        chk = verifica_stream(clk_i = clk, validos = (pix_ena, video_activo),
+                              salidas = (x, y, Y_o, Cb_o, Cr_o), esperado = esperado,
+                              errores = errores)
+
+        @always(delay(5))
+        def clk_gen() :
+            clk.next = not clk
+
+        Simulation(dut, drv, chk, clk_gen).run()
+        self.assertEqual(errores, [])
+        self.assertEqual(next(esperado, None), None)
+
+
+def sim_char_gen(puntos, tabla) :
+    """Evalua char_gen_ROM en cada ``(sel_char, char_y, char_x)`` de `puntos`
+
+    :Retorna: lista con el bit de cada punto
+    """
+
+    sel_char = Signal(intbv(0)[7:])
+    char_y = Signal(intbv(0)[4:])
+    char_x = Signal(intbv(0)[3:])
+    bit = Signal(False)
+    bits = []
+
+    dut = char_gen_ROM(sel_char_i = sel_char, char_x_i = char_x, char_y_i = char_y,
+                       bit_char_o = bit, tabla = tabla)
+
+    @instance
+    def estimulo() :
+        for c, fila, col in puntos :
+            sel_char.next = c
+            char_y.next = fila
+            char_x.next = col
+            yield delay(1)
+            bits.append(int(bit))
+        raise StopSimulation
+
+    Simulation(dut, estimulo).run()
+    return bits
+
+
+class Test_char_gen(unittest.TestCase) :
+
+    def test_tabla(self) :
+        """La tabla da el mismo bit que la ROM en todos los caracteres, filas y columnas"""
+        puntos = [(c, fila, col) for c in range(len(ROM_FONT) // 16)
+                  for fila in range(16) for col in range(8)]
+        self.assertEqual(sim_char_gen(puntos, True), sim_char_gen(puntos, False))
+
+    def test_glifos(self) :
+        """Los glifos son los bits de ROM_FONT, del mas significativo al menos"""
+        g = glifos()
+        self.assertEqual(g.shape, (95, 16, 8))
+        a = ord("A") - 32
+        for fila in range(16) :
+            self.assertEqual(int("".join(str(b) for b in g[a, fila]), 2), ROM_FONT[a * 16 + fila])
+
+    def test_pantalla(self) :
+        """Pantalla de 100x37 : el renderer coincide con char_gen_ROM en dos filas de texto"""
+        texto = ["Linea %d : %s" % (i, "".join(chr(32 + (i + j) % 95) for j in range(90)))
+                 for i in range(37)]
+        pantalla = codigos(texto)
+        img = texto_ref(pantalla)
+        self.assertEqual(img.shape, (592, 800))
+        for y0 in (0, 300) :
+            puntos = [(int(pantalla[y // 16, x // 8]), y % 16, x % 8)
+                      for y in range(y0, y0 + 16) for x in range(800)]
+            bits = sim_char_gen(puntos, True)
+            self.assertEqual(bits, list(img[y0 : y0 + 16].ravel()))
+
+
+def sim_captura(captura) :
+    """Captura frames del vga_timing en MODO_CHICO con un patron RGB que
+    depende de x, y y de la cantidad de flancos de vs"""
+
+    clk, rst, hs, vs, act_vid = [Signal(False) for i in range(5)]
+    x = Signal(intbv(0, 0, 8))
+    y = Signal(intbv(0, 0, 5))
+    r, g, b = [Signal(intbv(0)[4:]) for i in range(3)]
+    n_vs = Signal(intbv(0)[4:])
+
+    dut = vga_timing(clk_i = clk, rst_i = rst, hs_o = hs, vs_o = vs,
+                     act_vid_o = act_vid, x_o = x, y_o = y, modo = MODO_CHICO)
+
+    sink = sonda_captura(clk_i = clk, vs_i = vs, act_vid_i = act_vid,
+                         pixel_i = (r, g, b), captura = captura, pol_vs = MODO_CHICO[4])
+
+    @always(vs.posedge)
+    def cuenta_vs() :
+        n_vs.next = n_vs + 1
+
+    @always_comb
+    def patron() :
+        r.next = x
+        g.next = y
+        b.next = n_vs
+
+    @instance
+    def estimulo() :
+        rst.next = True
+        yield delay(15)
+        rst.next = False
+        while not captura.completa :
+            yield delay(5)
+            clk.next = 1
+            yield delay(5)
+            clk.next = 0
+        raise StopSimulation
+
+    Simulation(dut, sink, cuenta_vs, patron, estimulo).run()
+
+
+class Test_captura(unittest.TestCase) :
+
+    def test_frames(self) :
+        """Captura de frames salteados, con ROI, a PNG y PPM"""
+        tmp = tempfile.mkdtemp()
+        try :
+            for ext in ("png", "ppm") :
+                archivo = os.path.join(tmp, "frame_%02d." + ext)
+                captura = Captura(8, 5, frames = 3, color = True, roi = (2, 1, 5, 3),
+                                  primero = 1, cada = 2, archivo = archivo)
+                sim_captura(captura)
+
+                self.assertEqual(captura.numeros, [1, 3, 5])
+                for i, numero in enumerate(captura.numeros) :
+                    esperado = np.zeros((3, 5, 3), dtype = np.uint8)
+                    esperado[:, :, 0] = np.arange(2, 7) * 17
+                    esperado[:, :, 1] = np.arange(1, 4)[:, np.newaxis] * 17
+                    esperado[:, :, 2] = (numero + 1) * 17   # el frame 0 empieza con el primer vs
+                    self.assertTrue((captura.buffer[i] == esperado).all())
+
+                    f = open(archivo % numero, "rb")
+                    datos = f.read()
+                    f.close()
+                    if ext == "ppm" :
+                        self.assertTrue(datos.startswith(b"P6\n5 3\n255\n"))
+                        img = np.frombuffer(datos[-45:], dtype = np.uint8).reshape(3, 5, 3)
+                    else :
+                        self.assertTrue(datos.startswith(b"\x89PNG"))
+                        idat = datos.index(b"IDAT")
+                        largo = int(datos[idat - 4 : idat].encode("hex"), 16)
+                        filas = np.frombuffer(zlib.decompress(datos[idat + 4 : idat + 4 + largo]),
+                                              dtype = np.uint8).reshape(3, 16)
+                        self.assertTrue((filas[:, 0] == 0).all())
+                        img = filas[:, 1:].reshape(3, 5, 3)
+                    self.assertTrue((img == esperado).all())
+        finally :
+            shutil.rmtree(tmp)
+
+    def test_roi(self) :
+        """Una ROI fuera del frame es un error"""
+        self.assertRaises(ValueError, Captura, 8, 5, roi = (4, 0, 5, 5))
+
+if __name__ == "__main__" :
+    unittest.main()
+
+# vim: set ts=8 sw=4 tw=0 et :